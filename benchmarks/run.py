@@ -0,0 +1,270 @@
+""" Benchmarks For The Billable Hot Paths
+
+Runs the Billable checks, subscription changes and the webhook controller against
+an in-memory SQLite database and the local Stripe stand in, and reports the wall
+time, SQL queries and Stripe calls of every operation.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --iterations 200 --save
+    python -m benchmarks.run --compare
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+
+from tests.conftest import BillingApp, User, WebhookRequest
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class QueryCounter(logging.Handler):
+    """Counts the queries Orator logs while query logging is enabled."""
+
+    def __init__(self):
+        super(QueryCounter, self).__init__(logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class Benchmarks(BillingApp):
+    """Prepares the users each operation needs and measures the operation alone."""
+
+    def __init__(self):
+        self.queries = QueryCounter()
+        self.query_logger = logging.getLogger("orator.connection.queries")
+
+    def __enter__(self):
+        super(Benchmarks, self).__enter__()
+        self.query_logger.addHandler(self.queries)
+        self.query_logger.setLevel(logging.DEBUG)
+        self.query_logger.propagate = False
+        return self
+
+    def __exit__(self, *args):
+        self.query_logger.removeHandler(self.queries)
+        self.query_logger.propagate = True
+        super(Benchmarks, self).__exit__(*args)
+
+    def operations(self):
+        """The benchmarked operations.
+
+        The webhook is only measured where the Masonite controller can be imported.
+
+        Returns:
+            OrderedDict -- Operation names mapped to a (prepare, operation) pair.
+                           prepare returns the arguments given to operation.
+        """
+        operations = OrderedDict(
+            [
+                ("is_subscribed", (self.subscribed_user, lambda user: user.is_subscribed())),
+                ("on_trial", (self.subscribed_user, lambda user: user.on_trial())),
+                ("is_canceled", (self.subscribed_user, lambda user: user.is_canceled())),
+                ("subscribe", (self.customer, lambda user: user.subscribe("masonite-test", "tok_amex"))),
+                ("swap", (self.subscribed_user, lambda user: user.swap("masonite-flash"))),
+                ("cancel", (self.subscribed_user, lambda user: user.cancel())),
+            ]
+        )
+
+        if webhooks_available():
+            operations["webhook"] = (self.webhook_request, self.handle_webhook)
+
+        return operations
+
+    def measure(self, name, iterations):
+        """Runs an operation and averages its cost.
+
+        Arguments:
+            name {string} -- The operation name.
+            iterations {int} -- How many times the operation runs.
+
+        Returns:
+            dict -- The mean milliseconds, SQL queries and Stripe calls per call.
+        """
+        prepare, operation = self.operations()[name]
+        connection = self.db.connection()
+        seconds = 0
+        queries = 0
+        stripe_calls = 0
+
+        for _ in range(iterations):
+            argument = prepare()
+
+            self.queries.count = 0
+            requests = len(self.stripe.requests)
+            connection.enable_query_log()
+
+            start = time.perf_counter()
+            operation(argument)
+            seconds += time.perf_counter() - start
+
+            connection.disable_query_log()
+            queries += self.queries.count
+            stripe_calls += len(self.stripe.requests) - requests
+
+        return {
+            "ms": round(seconds * 1000 / iterations, 3),
+            "queries": round(queries / iterations, 2),
+            "stripe_calls": round(stripe_calls / iterations, 2),
+        }
+
+    def run(self, iterations=50, names=None):
+        """Measures every operation.
+
+        Keyword Arguments:
+            iterations {int} -- How many times each operation runs. (default: {50})
+            names {list|None} -- Only run these operations. (default: {None})
+
+        Returns:
+            OrderedDict -- Operation names mapped to their measurements.
+        """
+        return OrderedDict(
+            (name, self.measure(name, iterations))
+            for name in self.operations()
+            if not names or name in names
+        )
+
+    def webhook_request(self):
+        from billing.controllers.WebhookController import WebhookController
+
+        self.webhooks = WebhookController()
+        self.webhooks.model = User
+
+        user = self.subscribed_user()
+        subscription = self.stripe.driver._modify_subscription(
+            user.plan_id, cancel_at_period_end=True
+        )
+        return WebhookRequest(
+            {
+                "id": "evt_{0}".format(uuid.uuid4().hex[:14]),
+                "type": "customer.subscription.updated",
+                "data": {"object": subscription},
+            }
+        )
+
+    def handle_webhook(self, request):
+        return self.webhooks.handle(request)
+
+
+def webhooks_available():
+    """Checks whether the webhook controller and the Masonite parts it needs can be imported.
+
+    Returns:
+        bool
+    """
+    try:
+        from billing.controllers.WebhookController import WebhookController
+    except Exception:
+        return False
+
+    return True
+
+
+def compare(results, baseline):
+    """Finds the operations that make more SQL queries or Stripe calls than the baseline.
+
+    Timings depend on the machine so they are not compared, see slower.
+
+    Arguments:
+        results {dict} -- The measurements of this run.
+        baseline {dict} -- The saved measurements.
+
+    Returns:
+        list -- A description of every regression.
+    """
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        for key in ("queries", "stripe_calls"):
+            if result[key] > baseline[name][key]:
+                regressions.append(
+                    "{0} makes {1} {2} per call instead of {3}".format(
+                        name, result[key], key.replace("_", " "), baseline[name][key]
+                    )
+                )
+
+    return regressions
+
+
+def slower(results, baseline, tolerance=0.5):
+    """Finds the operations that took longer than the baseline on this machine.
+
+    Arguments:
+        results {dict} -- The measurements of this run.
+        baseline {dict} -- The saved measurements.
+
+    Keyword Arguments:
+        tolerance {float} -- How much slower than the baseline an operation may get. (default: {0.5})
+
+    Returns:
+        list -- A description of every slower operation.
+    """
+    return [
+        "{0} takes {1}ms per call instead of {2}ms".format(name, result["ms"], baseline[name]["ms"])
+        for name, result in results.items()
+        if name in baseline and result["ms"] > baseline[name]["ms"] * (1 + tolerance)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("operations", nargs="*", help="Only run these operations.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="Save the results as the baseline.")
+    parser.add_argument(
+        "--compare", action="store_true", help="Fail when the queries or Stripe calls regressed."
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="How much slower an operation may get before it is reported."
+    )
+    arguments = parser.parse_args(argv)
+
+    if not webhooks_available():
+        print("Skipping the webhook, the Masonite controller can not be imported")
+
+    with Benchmarks() as benchmarks:
+        results = benchmarks.run(arguments.iterations, arguments.operations)
+
+    print("{0:<16}{1:>12}{2:>10}{3:>14}".format("operation", "ms/call", "queries", "stripe calls"))
+    for name, result in results.items():
+        print(
+            "{0:<16}{1:>12}{2:>10}{3:>14}".format(
+                name, result["ms"], result["queries"], result["stripe_calls"]
+            )
+        )
+
+    if arguments.save:
+        with open(arguments.baseline, "w") as baseline:
+            json.dump(results, baseline, indent=4)
+            baseline.write("\n")
+
+    if arguments.compare:
+        with open(arguments.baseline) as baseline:
+            baseline = json.load(baseline)
+
+        regressions = compare(results, baseline)
+        for regression in regressions:
+            print(regression)
+
+        # Timings are only reported, they vary too much between machines to fail on
+        for note in slower(results, baseline, arguments.tolerance):
+            print("Note: {0}".format(note))
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
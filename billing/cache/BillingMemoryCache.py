@@ -0,0 +1,71 @@
+""" The In Process Billing Cache """
+
+import threading
+import time
+from collections import OrderedDict
+
+from billing.contracts import BillingCacheContract
+
+
+class BillingMemoryCache(BillingCacheContract):
+    """Least recently used cache where every entry expires after a time to live."""
+
+    def __init__(self, ttl=300, size=1024):
+        """
+        Keyword Arguments:
+            ttl {int|dict} -- Seconds an entry lives. A dictionary sets it per object type
+                                with a "default" key for the rest. (default: {300})
+            size {int} -- The maximum number of entries kept. (default: {1024})
+        """
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, object_type, key):
+        with self._lock:
+            entry = self._entries.get((object_type, key))
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[(object_type, key)]
+                return None
+
+            self._entries.move_to_end((object_type, key))
+            return value
+
+    def put(self, object_type, key, value):
+        expires_at = time.monotonic() + self._ttl_for(object_type)
+
+        with self._lock:
+            self._entries[(object_type, key)] = (expires_at, value)
+            self._entries.move_to_end((object_type, key))
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def forget(self, object_type, key):
+        with self._lock:
+            return self._entries.pop((object_type, key), None) is not None
+
+    def flush(self, object_type=None):
+        with self._lock:
+            if object_type is None:
+                self._entries.clear()
+                return
+
+            for entry in [entry for entry in self._entries if entry[0] == object_type]:
+                del self._entries[entry]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _ttl_for(self, object_type):
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(object_type, self.ttl.get("default", 300))
+
+        return self.ttl
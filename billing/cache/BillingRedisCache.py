@@ -0,0 +1,65 @@
+""" The Shared Billing Cache """
+
+import json
+
+from billing.contracts import BillingCacheContract
+
+
+class BillingRedisCache(BillingCacheContract):
+    """Cache shared between processes through Redis.
+
+    Values are stored as JSON so they should be dictionaries like Stripe objects.
+    """
+
+    def __init__(self, connection=None, ttl=300, prefix="billing", **options):
+        """
+        Keyword Arguments:
+            connection {redis.Redis|None} -- An existing Redis client. If None one is created from the options. (default: {None})
+            ttl {int|dict} -- Seconds an entry lives. A dictionary sets it per object type
+                                with a "default" key for the rest. (default: {300})
+            prefix {string} -- Prefix for every key so the cache can share a database. (default: {"billing"})
+        """
+        if connection is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError(
+                    "The redis billing cache requires the redis package. Run 'pip install redis'."
+                )
+
+            connection = redis.Redis(**options)
+
+        self.connection = connection
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, object_type, key):
+        value = self.connection.get(self._key(object_type, key))
+        if value is None:
+            return None
+
+        return json.loads(value)
+
+    def put(self, object_type, key, value):
+        self.connection.setex(
+            self._key(object_type, key), self._ttl_for(object_type), json.dumps(value)
+        )
+        return value
+
+    def forget(self, object_type, key):
+        return bool(self.connection.delete(self._key(object_type, key)))
+
+    def flush(self, object_type=None):
+        pattern = "{0}:{1}:*".format(self.prefix, object_type or "*")
+        keys = list(self.connection.scan_iter(match=pattern))
+        if keys:
+            self.connection.delete(*keys)
+
+    def _key(self, object_type, key):
+        return "{0}:{1}:{2}".format(self.prefix, object_type, key)
+
+    def _ttl_for(self, object_type):
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(object_type, self.ttl.get("default", 300))
+
+        return self.ttl
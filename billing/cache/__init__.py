@@ -0,0 +1,2 @@
+from .BillingMemoryCache import BillingMemoryCache
+from .BillingRedisCache import BillingRedisCache
@@ -0,0 +1,49 @@
+""" The Progress Of A Resumable Command """
+
+import json
+import os
+
+
+class Checkpoint:
+    """A JSON file keeping where a command stopped so the next run resumes from there.
+
+    The file is replaced in one step so an interrupted write never leaves half a checkpoint.
+    """
+
+    def __init__(self, path):
+        """
+        Arguments:
+            path {string} -- The checkpoint file. Missing directories are created on save.
+        """
+        self.path = path
+
+    def load(self):
+        """Reads the saved progress.
+
+        Returns:
+            dict|None -- None when nothing was saved.
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path) as checkpoint_file:
+            return json.load(checkpoint_file)
+
+    def save(self, progress):
+        """Saves the progress.
+
+        Arguments:
+            progress {dict} -- What the next run needs to resume.
+        """
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(self.path + ".tmp", "w") as checkpoint_file:
+            json.dump(progress, checkpoint_file)
+        os.replace(self.path + ".tmp", self.path)
+
+    def clear(self):
+        """Removes the saved progress once the command finished."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
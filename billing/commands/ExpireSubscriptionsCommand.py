@@ -0,0 +1,70 @@
+""" A ExpireSubscriptionsCommand Command """
+
+import os
+
+import pendulum
+from cleo import Command
+
+from billing import lifecycle
+from billing.commands.Checkpoint import Checkpoint
+
+
+class ExpireSubscriptionsCommand(Command):
+    """
+    Send the lifecycle events of the trials and subscriptions that ended since the last run
+
+    billing:expire
+        {--since= : Start of the window, by default where the last run stopped or a day ago}
+        {--until= : End of the window, by default now}
+        {--ahead=0 : Also send the ending events this many days ahead}
+        {--chunk=1000 : How many subscriptions are read per query}
+        {--worker=1 : Which of the workers this is, from 1}
+        {--workers=1 : How many workers share the subscriptions by identifier}
+        {--checkpoint=storage/billing_expire.json : Where the end of the last window is saved}
+    """
+
+    def handle(self):
+        worker, workers = int(self.option("worker")), int(self.option("workers"))
+        if not 1 <= worker <= workers:
+            self.error("The worker must be between 1 and {0}".format(workers))
+            return 1
+
+        checkpoint = Checkpoint(self._checkpoint_path(worker, workers))
+        until = self._date(self.option("until")) or pendulum.now()
+        since = self._date(self.option("since")) or self._load_checkpoint(checkpoint)
+        if since is None:
+            since = until.subtract(days=1)
+
+        sent = lifecycle.expire(
+            since,
+            until,
+            ahead=int(self.option("ahead")) * 24 * 60 * 60,
+            chunk_size=int(self.option("chunk")),
+            partition=(worker, workers) if workers > 1 else None,
+        )
+
+        checkpoint.save({"until": until.to_iso8601_string()})
+
+        self.info(
+            "Sent {0} lifecycle events from {1} to {2}".format(
+                sum(sent.values()), since.to_iso8601_string(), until.to_iso8601_string()
+            )
+        )
+        for name, count in sorted(sent.items()):
+            self.line("{0}: {1}".format(name, count))
+
+    def _checkpoint_path(self, worker, workers):
+        path = self.option("checkpoint")
+        if workers == 1:
+            return path
+
+        # Every worker resumes its own share
+        root, extension = os.path.splitext(path)
+        return "{0}-{1}-of-{2}{3}".format(root, worker, workers, extension)
+
+    def _date(self, value):
+        return pendulum.parse(value) if value else None
+
+    def _load_checkpoint(self, checkpoint):
+        progress = checkpoint.load()
+        return pendulum.parse(progress["until"]) if progress else None
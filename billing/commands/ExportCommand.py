@@ -0,0 +1,55 @@
+""" A ExportCommand Command """
+
+import sys
+
+from cleo import Command
+
+from billing import export
+
+
+class ExportCommand(Command):
+    """
+    Export subscriptions or charges as CSV or NDJSON
+
+    billing:export
+        {type : What to export, subscriptions or charges}
+        {--format=csv : csv or ndjson}
+        {--output=- : The file to write or - for standard output}
+        {--chunk=1000 : How many subscriptions are read per query}
+        {--customer= : Only export the charges of this customer}
+    """
+
+    def handle(self):
+        export_type = self.argument("type")
+
+        # Checked before the output file is opened so a typo does not truncate it
+        if self.option("format") not in export.FORMATS:
+            self.error(
+                "Unknown export format {0}. Use one of {1}".format(
+                    self.option("format"), ", ".join(export.FORMATS)
+                )
+            )
+            return 1
+
+        if export_type == "subscriptions":
+            rows = export.subscriptions(chunk_size=int(self.option("chunk")))
+            fields = None
+        elif export_type == "charges":
+            filters = {}
+            if self.option("customer"):
+                filters["customer"] = self.option("customer")
+            rows = export.charges(**filters)
+            fields = export.CHARGE_FIELDS
+        else:
+            self.error("Unknown export type {0}".format(export_type))
+            return 1
+
+        output = self.option("output")
+        if output == "-":
+            export.write(rows, sys.stdout, self.option("format"), fields)
+            return
+
+        with open(output, "w", newline="") as stream:
+            count = export.write(rows, stream, self.option("format"), fields)
+
+        self.info("Exported {0} {1} to {2}".format(count, export_type, output))
@@ -0,0 +1,18 @@
+""" A PruneWebhookEventsCommand Command """
+
+from cleo import Command
+
+from billing.models import WebhookEvent
+
+
+class PruneWebhookEventsCommand(Command):
+    """
+    Delete handled webhook events older than the retention period
+
+    billing:prune-webhooks
+        {--days=30 : How many days of webhook events to keep}
+    """
+
+    def handle(self):
+        deleted = WebhookEvent.prune(days=int(self.option("days")))
+        self.info("Pruned {0} webhook events".format(deleted))
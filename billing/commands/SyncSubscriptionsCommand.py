@@ -0,0 +1,139 @@
+""" A SyncSubscriptionsCommand Command """
+
+import threading
+import time
+from queue import Queue
+
+from cleo import Command
+
+from billing.commands.Checkpoint import Checkpoint
+from billing.factories import BillingFactory
+from billing.models import Subscription
+
+
+class SyncSubscriptionsCommand(Command):
+    """
+    Reconcile the subscriptions table with the subscriptions in Stripe
+
+    billing:sync
+        {--batch=500 : How many subscriptions are written per transaction}
+        {--checkpoint=storage/billing_sync.json : Where progress is saved to resume an interrupted sync}
+        {--restart : Ignore the saved checkpoint and sync from the start}
+    """
+
+    # The billable model. If None the model of the web guard is used.
+    model = None
+
+    def handle(self):
+        checkpoints = Checkpoint(self.option("checkpoint"))
+        checkpoint = None if self.option("restart") else checkpoints.load()
+        if checkpoint is None:
+            checkpoint = {"starting_after": None, "synced": 0}
+        else:
+            self.line(
+                "Resuming after {0}".format(checkpoint["starting_after"])
+            )
+
+        model = self.model or self._auth_model()
+        processor = BillingFactory.processor()
+
+        start = time.perf_counter()
+        synced = inserted = updated = skipped = 0
+
+        for batch in self._prefetch(
+            processor, checkpoint["starting_after"], int(self.option("batch"))
+        ):
+            users = {
+                user.customer_id: user.id
+                for user in model.where_in(
+                    "customer_id", list({item["customer"] for item in batch})
+                ).get()
+            }
+            rows = [
+                dict(
+                    processor.subscription_attributes(item),
+                    user_id=users[item["customer"]],
+                )
+                for item in batch
+                if item["customer"] in users
+            ]
+
+            # The batch and the primary plans of its users are written together
+            with Subscription.resolve_connection().transaction():
+                new_rows, changed = Subscription.reconcile(rows)
+                # The first subscription of a user becomes the primary one, later ones are add-ons
+                for row in new_rows:
+                    model.where("id", row["user_id"]).where_null("plan_id").update(
+                        plan_id=row["plan_id"]
+                    )
+
+            synced += len(batch)
+            inserted += len(new_rows)
+            updated += changed
+            skipped += len(batch) - len(rows)
+
+            checkpoint = {
+                "starting_after": batch[-1]["id"],
+                "synced": checkpoint["synced"] + len(batch),
+            }
+            checkpoints.save(checkpoint)
+
+            self.line(
+                "Synced {0} subscriptions ({1:.0f}/s)".format(
+                    checkpoint["synced"], synced / (time.perf_counter() - start)
+                )
+            )
+
+        checkpoints.clear()
+
+        elapsed = time.perf_counter() - start
+        self.info(
+            "Synced {0} subscriptions in {1:.1f}s ({2:.0f}/s): "
+            "{3} inserted, {4} updated, {5} without a user".format(
+                synced,
+                elapsed,
+                synced / elapsed if elapsed else 0,
+                inserted,
+                updated,
+                skipped,
+            )
+        )
+
+    def _prefetch(self, processor, starting_after, size):
+        """Yields batches of processor subscriptions while the next batch is fetched in the background.
+
+        Arguments:
+            processor {billing.contracts.BillingProcessorContract} -- The billing processor.
+            starting_after {string|None} -- Start after this subscription identifier.
+            size {int} -- How many subscriptions each batch holds.
+        """
+        batches = Queue(maxsize=2)
+
+        def fetch():
+            try:
+                batch = []
+                for item in processor.list_subscriptions(starting_after=starting_after):
+                    batch.append(item)
+                    if len(batch) == size:
+                        batches.put(batch)
+                        batch = []
+                if batch:
+                    batches.put(batch)
+                batches.put(None)
+            except Exception as e:
+                batches.put(e)
+
+        threading.Thread(target=fetch, daemon=True).start()
+
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+
+    def _auth_model(self):
+        from config.auth import AUTH
+
+        return AUTH["guards"]["web"]["model"]
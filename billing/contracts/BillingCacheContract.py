@@ -0,0 +1,51 @@
+from abc import ABC as AbstractBaseClass
+
+
+class BillingCacheContract(AbstractBaseClass):
+    def get(self, object_type, key):
+        """Gets a cached object.
+
+        Arguments:
+            object_type {string} -- The kind of object like subscription, product or coupon.
+            key {string} -- The object identifier.
+
+        Returns:
+            object|None -- The cached object or None when it is missing or expired.
+        """
+        pass
+
+    def put(self, object_type, key, value):
+        """Caches an object.
+
+        Arguments:
+            object_type {string} -- The kind of object like subscription, product or coupon.
+            key {string} -- The object identifier.
+            value {object} -- The object to cache.
+
+        Returns:
+            object -- The cached object.
+        """
+        pass
+
+    def forget(self, object_type, key):
+        """Removes a cached object.
+
+        Arguments:
+            object_type {string} -- The kind of object like subscription, product or coupon.
+            key {string} -- The object identifier.
+
+        Returns:
+            bool -- Whether the object was cached.
+        """
+        pass
+
+    def flush(self, object_type=None):
+        """Removes every cached object of a kind.
+
+        Keyword Arguments:
+            object_type {string|None} -- The kind of object to remove. If None everything is removed. (default: {None})
+
+        Returns:
+            None
+        """
+        pass
@@ -29,7 +29,7 @@ class BillingProcessorContract(AbstractBaseClass):
             coupon_id {string} -- Stripes coupon ID
 
         Returns:
-            self
+            A copy of the processor that uses the coupon.
         """
         pass
 
@@ -40,7 +40,7 @@ class BillingProcessorContract(AbstractBaseClass):
             days {int} -- Number of days to put the user on a trial. (default: {0})
 
         Returns:
-            self
+            A copy of the processor that uses the trial days.
         """
         pass
 
@@ -69,23 +69,53 @@ class BillingProcessorContract(AbstractBaseClass):
         """
         pass
 
+    def charge_batch(self, items, concurrency=8, prepare=None, key=None):
+        """Charges many amounts at the same time.
+
+        Arguments:
+            items {iterable} -- The charges as (amount, kwargs) unless prepare is given.
+
+        Keyword Arguments:
+            concurrency {int} -- How many charges run at the same time. (default: {8})
+            prepare {callable|None} -- Turns an item into its (amount, kwargs). (default: {None})
+            key {string|None} -- The batch idempotency key. (default: {None})
+
+        Returns:
+            billing.drivers.ChargeBatch
+        """
+        pass
+
+    def idempotent(self, token):
+        """Makes the mutating calls of a copy of the processor safe to retry with the same token.
+
+        Arguments:
+            token {string} -- The caller token.
+
+        Returns:
+            A copy of the processor that sends idempotency keys.
+        """
+        pass
+
     def skip_trial(self):
         """Whether the user should skip the trial and be charged right away.
 
         This updates the subscription arguments.
 
         Returns:
-            self
+            A copy of the processor that skips the trial.
         """
         pass
 
-    def swap(self, plan_id, new_plan, **kwargs):
+    def swap(self, plan_id, new_plan, item_id=None, **kwargs):
         """Swaps the old plan for a new plan.
 
         Arguments:
             plan {string} -- The old plan the user currently has.
             new_plan {string} -- The new plan the user should be switched to.
 
+        Keyword Arguments:
+            item_id {string|None} -- The subscription item to change. If None it is looked up. (default: {None})
+
         Returns:
             stripe.Subscription.modify
         """
@@ -102,6 +132,40 @@ class BillingProcessorContract(AbstractBaseClass):
         """
         pass
 
+    def plan_name(self, subscription):
+        """Gets the plan name from a subscription without retrieving the subscription again.
+
+        Arguments:
+            subscription {object} -- The processor subscription.
+
+        Returns:
+            string -- Returns the plan name.
+        """
+        pass
+
+    def subscription_attributes(self, subscription):
+        """Gets the subscription model attributes from a processor subscription.
+
+        Arguments:
+            subscription {object} -- The processor subscription.
+
+        Returns:
+            dict -- The plan, plan_id, plan_name, trial_ends_at, ends_at, item_id, price
+                    and current_period_end attributes.
+        """
+        pass
+
+    def subscription_item(self, subscription):
+        """Gets what plan changes need from a processor subscription without another request.
+
+        Arguments:
+            subscription {object} -- The processor subscription.
+
+        Returns:
+            dict -- The item_id, price and current_period_end attributes.
+        """
+        pass
+
     def card(self, customer_id, token):
         """Updates the card on file with the user.
 
@@ -114,6 +178,68 @@ class BillingProcessorContract(AbstractBaseClass):
         """
         pass
 
+    def list_subscriptions(self, starting_after=None, limit=100):
+        """Iterates every subscription in the processor.
+
+        Keyword Arguments:
+            starting_after {string|None} -- Start after this subscription identifier. (default: {None})
+            limit {int} -- How many subscriptions each page holds. (default: {100})
+
+        Returns:
+            iterator
+        """
+        pass
+
+    def list_charges(self, limit=100, **filters):
+        """Iterates the charges in the processor, newest first.
+
+        Keyword Arguments:
+            limit {int} -- How many charges each page holds. (default: {100})
+
+        Returns:
+            iterator
+        """
+        pass
+
+    def list_coupons(self, limit=100):
+        """Iterates every coupon in the processor.
+
+        Keyword Arguments:
+            limit {int} -- How many coupons each page holds. (default: {100})
+
+        Returns:
+            iterator
+        """
+        pass
+
+    def price(self, items, currency=None):
+        """Discounts many amounts at once without a processor call per coupon.
+
+        Arguments:
+            items {iterable} -- (amount, coupon) pairs.
+
+        Keyword Arguments:
+            currency {string|None} -- The charge currency. (default: {None})
+
+        Returns:
+            list -- The discounted amounts in cents.
+        """
+        pass
+
+    def forget(self, object_type, object_id=None):
+        """Removes a processor object from the read cache.
+
+        Arguments:
+            object_type {string} -- The kind of object like subscription, product or coupon.
+
+        Keyword Arguments:
+            object_id {string|None} -- The processor identifier. If None every object of the kind is removed. (default: {None})
+
+        Returns:
+            None
+        """
+        pass
+
     def _create_customer(self, description, token):
         """Creates the customer in Stripe.
 
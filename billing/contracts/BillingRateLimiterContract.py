@@ -0,0 +1,17 @@
+from abc import ABC as AbstractBaseClass
+
+
+class BillingRateLimiterContract(AbstractBaseClass):
+    def reserve(self, key, tokens=1):
+        """Takes tokens from a bucket, going into debt when it is empty.
+
+        Arguments:
+            key {string} -- The bucket, like a hash of the API key.
+
+        Keyword Arguments:
+            tokens {int} -- How many tokens the request costs. (default: {1})
+
+        Returns:
+            float -- The seconds to wait before making the request. 0 when tokens were available.
+        """
+        pass
@@ -1 +1,3 @@
 from .BillingProcessorContract import BillingProcessorContract
+from .BillingCacheContract import BillingCacheContract
+from .BillingRateLimiterContract import BillingRateLimiterContract
@@ -1,34 +1,141 @@
 """ Masonite Billing Controller For Webhooks """
 
-from billing.models import Subscription
+from billing.cache import BillingMemoryCache
+from billing.models import Billable, Subscription, WebhookEvent
 from config import auth
 import pendulum
+from orator.exceptions.query import QueryException
 from masonite.request import Request
 from masonite.helpers import config
 from config.auth import AUTH
 
 
-class WebhookController:
+class WebhookHandlers(type):
+    """
+    Collect the handle_ methods of a webhook controller once when the class is created
+    """
+
+    def __init__(cls, name, bases, attributes):
+        super(WebhookHandlers, cls).__init__(name, bases, attributes)
+        cls.handlers = {
+            attribute[len("handle_"):]: getattr(cls, attribute)
+            for attribute in dir(cls)
+            if attribute.startswith("handle_")
+        }
+
+
+class WebhookController(metaclass=WebhookHandlers):
     """
     Add webhooks to tie into stripe events
     """
 
     model = AUTH["guards"]["web"]["model"]
 
+    # Stripe event prefixes mapped to the processor cache they make stale
+    cached_objects = {
+        "customer.subscription.": "subscription",
+        "product.": "product",
+        "coupon.": "coupon",
+    }
+
+    # Event ids handled recently by this process
+    handled_events = BillingMemoryCache(ttl=24 * 60 * 60, size=10000)
+
     def handle(self, request: Request):
         """
         Entry Point for all webhooks
         """
 
-        # Turn the hook into a method call
-        handler = request.input("type").split(".")
-        handler = "handle_" + "_".join(handler)
+        # Turn the hook into a handler name
+        handler = self.handlers.get(request.input("type").replace(".", "_"))
 
-        if hasattr(self, handler):
-            return getattr(self, handler)(request.all())
+        if not self.claim_event(request.input("id"), request.input("type")):
+            return "Webhook Already Handled"
+
+        self.forget_cached_object(request.input("type"), request.all())
+
+        if handler:
+            try:
+                return handler(self, request.all())
+            except Exception:
+                # Let the retried delivery handle the event again
+                self.release_event(request.input("id"))
+                raise
 
         return "Webhook Not Supported"
 
+    def claim_event(self, event_id, event_type):
+        """
+        Record the event id and return False when the event was already delivered
+        """
+        if not event_id:
+            return True
+
+        if self.handled_events.get("webhook_event", event_id):
+            return False
+
+        try:
+            WebhookEvent.create(event_id=event_id, type=event_type)
+        except QueryException:
+            # Only a recorded event id is a duplicate. Any other database error fails the
+            # delivery so Stripe sends the event again.
+            if not WebhookEvent.where("event_id", event_id).exists():
+                raise
+
+            self.handled_events.put("webhook_event", event_id, True)
+            return False
+
+        self.handled_events.put("webhook_event", event_id, True)
+        return True
+
+    def release_event(self, event_id):
+        """
+        Forget an event that could not be handled
+        """
+        if not event_id:
+            return
+
+        self.handled_events.forget("webhook_event", event_id)
+        WebhookEvent.where("event_id", event_id).delete()
+
+    def forget_cached_object(self, event_type, payload):
+        """
+        Remove the object an event changed from the processor read cache
+        """
+        for prefix, object_type in self.cached_objects.items():
+            if event_type.startswith(prefix):
+                Billable._processor.forget(object_type, payload["data"]["object"]["id"])
+
+    def handle_customer_subscription_created(self, payload):
+        """
+        Event for subscription has started
+        """
+        return self.sync_subscription(payload["data"]["object"])
+
+    def handle_customer_subscription_updated(self, payload):
+        """
+        Event for subscription has changed plan, trial, cancellation or status
+        """
+        return self.sync_subscription(payload["data"]["object"])
+
+    def handle_customer_subscription_trial_will_end(self, payload):
+        """
+        Event for subscription trial ends in three days
+        """
+        return self.sync_subscription(payload["data"]["object"])
+
+    def handle_invoice_paid(self, payload):
+        """
+        Event for subscription invoice has been paid
+        """
+        return self.sync_invoice_subscription(payload["data"]["object"])
+
+    def handle_invoice_payment_failed(self, payload):
+        """
+        Event for subscription invoice payment has failed
+        """
+        return self.sync_invoice_subscription(payload["data"]["object"])
+
     def handle_customer_subscription_deleted(self, payload):
         """
         Event for subscription has ended
@@ -46,3 +153,43 @@ class WebhookController:
                 return "Webhook Handled"
 
         return "User or Subscription does not exist"
+
+    def sync_subscription(self, subscription_info):
+        """
+        Update or create the local subscription from the Stripe subscription
+        """
+        user = self.model.where("customer_id", subscription_info["customer"]).first()
+
+        if not user:
+            return "User or Subscription does not exist"
+
+        attributes = Billable._processor.subscription_attributes(subscription_info)
+        subscription = Subscription.where("plan_id", subscription_info["id"]).first()
+
+        if subscription:
+            subscription.fill(attributes)
+            subscription.save()
+        else:
+            # An add-on next to an active subscription keeps the primary plan of the user
+            user._record_primary(subscription_info["id"])
+            Subscription.store(dict(attributes, user_id=user.id))
+
+        return "Webhook Handled"
+
+    def sync_invoice_subscription(self, invoice):
+        """
+        Update the local subscription an invoice was billed for from its Stripe status
+
+        Invoice events can arrive late or out of order, so the subscription is read again
+        instead of changing the local one after the event.
+        """
+        if not invoice.get("subscription"):
+            return "User or Subscription does not exist"
+
+        if not Subscription.where("plan_id", invoice["subscription"]).exists():
+            return "User or Subscription does not exist"
+
+        Billable._processor.forget("subscription", invoice["subscription"])
+        return self.sync_subscription(
+            Billable._processor._get_subscription(invoice["subscription"])
+        )
@@ -0,0 +1,181 @@
+""" Billing Discounts
+
+Exact integer cent discounts for one off charges. Percentages are worked out with
+decimals and rounded half up to the cent, like Stripe rounds invoice discounts, so
+a discounted amount is always a whole number of cents.
+
+    from billing import discounts
+
+    discounts.apply(1499, discounts.Coupon("10-percent-off", percent_off=10))  # 1349
+    discounts.price([(1499, "10-percent-off"), (1000, 100)], catalog.get)  # [1349, 900]
+"""
+
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal
+
+import pendulum
+
+from billing.exceptions import CouponNotValid
+
+_Coupon = namedtuple(
+    "Coupon", ["id", "percent_off", "amount_off", "currency", "redeem_by", "valid"]
+)
+
+
+class Coupon(_Coupon):
+    """The parts of a processor coupon a discount needs."""
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        id,
+        percent_off=None,
+        amount_off=None,
+        currency=None,
+        redeem_by=None,
+        valid=True,
+    ):
+        return super().__new__(
+            cls, id, percent_off, amount_off, currency, redeem_by, valid
+        )
+
+    @classmethod
+    def from_processor(cls, coupon):
+        """Makes a coupon from a processor coupon.
+
+        Arguments:
+            coupon {dict} -- The Stripe coupon.
+
+        Returns:
+            Coupon
+        """
+        valid = coupon.get("valid")
+        return cls(
+            coupon["id"],
+            percent_off=coupon.get("percent_off"),
+            amount_off=coupon.get("amount_off"),
+            currency=coupon.get("currency"),
+            redeem_by=coupon.get("redeem_by"),
+            valid=True if valid is None else valid,
+        )
+
+    def usable(self, now=None):
+        """Checks the coupon can still be redeemed.
+
+        Keyword Arguments:
+            now {int|None} -- The current timestamp. If None the system time is used. (default: {None})
+
+        Returns:
+            bool
+        """
+        if not self.valid:
+            return False
+
+        if self.redeem_by is None:
+            return True
+
+        return self.redeem_by > (pendulum.now().int_timestamp if now is None else now)
+
+
+def discount(amount, coupon, currency=None, now=None):
+    """Works out the cents a coupon takes off an amount.
+
+    Arguments:
+        amount {int} -- The amount in cents.
+        coupon {Coupon|int|float|None} -- The coupon.
+            - Coupon - its percent_off or amount_off
+            - integer - the cents taken off
+            - float - the fraction taken off, like .10 for ten percent
+
+    Keyword Arguments:
+        currency {string|None} -- The charge currency, checked against amount_off coupons. (default: {None})
+        now {int|None} -- The current timestamp. If None the system time is used. (default: {None})
+
+    Raises:
+        CouponNotValid -- Raised when the coupon expired, was deleted or is for another currency.
+
+    Returns:
+        int -- The cents taken off, never more than the amount.
+    """
+    if coupon is None:
+        return 0
+
+    if isinstance(coupon, Coupon):
+        if not coupon.usable(now):
+            raise CouponNotValid("The {0} coupon is no longer valid".format(coupon.id))
+
+        if coupon.percent_off:
+            cents = _percentage(amount, Decimal(str(coupon.percent_off)))
+        else:
+            if (
+                currency
+                and coupon.currency
+                and coupon.currency.lower() != currency.lower()
+            ):
+                raise CouponNotValid(
+                    "The {0} coupon is for {1} charges".format(
+                        coupon.id, coupon.currency
+                    )
+                )
+            cents = coupon.amount_off or 0
+    elif isinstance(coupon, float):
+        cents = _percentage(amount, Decimal(str(coupon)) * 100)
+    else:
+        cents = int(coupon)
+
+    return min(max(cents, 0), amount)
+
+
+def apply(amount, coupon, currency=None, now=None):
+    """Takes a coupon off an amount.
+
+    See discount for the arguments.
+
+    Returns:
+        int -- The discounted amount in cents.
+    """
+    return amount - discount(amount, coupon, currency=currency, now=now)
+
+
+def price(items, lookup, currency=None, now=None):
+    """Discounts many amounts in one pass.
+
+    Every coupon identifier is looked up once however many items use it.
+
+    Arguments:
+        items {iterable} -- (amount, coupon) pairs where the coupon is an identifier,
+                            a Coupon, cents, a fraction or None.
+        lookup {callable} -- Turns a coupon identifier into a Coupon.
+
+    Keyword Arguments:
+        currency {string|None} -- The charge currency. (default: {None})
+        now {int|None} -- The current timestamp. If None the system time is used. (default: {None})
+
+    Raises:
+        CouponNotValid -- Raised when a coupon can not be used.
+
+    Returns:
+        list -- The discounted amounts in cents, in the order of the items.
+    """
+    if now is None:
+        now = pendulum.now().int_timestamp
+
+    coupons = {}
+    amounts = []
+
+    for amount, coupon in items:
+        if isinstance(coupon, str):
+            if coupon not in coupons:
+                coupons[coupon] = lookup(coupon)
+            coupon = coupons[coupon]
+
+        amounts.append(apply(amount, coupon, currency=currency, now=now))
+
+    return amounts
+
+
+def _percentage(amount, percent):
+    return int(
+        (Decimal(amount) * percent / 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    )
@@ -0,0 +1,133 @@
+""" The Asynchronous Stripe Billing Driver """
+
+import asyncio
+import functools
+
+from .BillingStripeDriver import BillingStripeDriver
+
+
+class AsyncBillingStripeDriver:
+    """Awaitable version of the Stripe driver.
+
+    The Stripe SDK only makes blocking requests so every call runs on an executor
+    and the event loop stays free while Stripe responds.
+    """
+
+    def __init__(self, driver=None, executor=None):
+        """
+        Keyword Arguments:
+            driver {billing.drivers.BillingStripeDriver|None} -- The driver making the Stripe calls.
+                                    If None a new one is made. (default: {None})
+            executor {concurrent.futures.Executor|None} -- Where the blocking calls run.
+                                    If None the event loop default executor is used. (default: {None})
+        """
+        self._driver = driver or BillingStripeDriver()
+        self._executor = executor
+
+    async def subscribe(self, plan, token, customer=None, **kwargs):
+        """See billing.drivers.BillingStripeDriver.subscribe"""
+        return await self._run(
+            self._driver.subscribe, plan, token, customer=customer, **kwargs
+        )
+
+    def coupon(self, coupon_id):
+        """See billing.drivers.BillingStripeDriver.coupon"""
+        return AsyncBillingStripeDriver(self._driver.coupon(coupon_id), self._executor)
+
+    def trial(self, days=0):
+        """See billing.drivers.BillingStripeDriver.trial"""
+        return AsyncBillingStripeDriver(self._driver.trial(days), self._executor)
+
+    def skip_trial(self):
+        """See billing.drivers.BillingStripeDriver.skip_trial"""
+        return AsyncBillingStripeDriver(self._driver.skip_trial(), self._executor)
+
+    def idempotent(self, token):
+        """See billing.drivers.BillingStripeDriver.idempotent"""
+        return AsyncBillingStripeDriver(self._driver.idempotent(token), self._executor)
+
+    async def on_trial(self, plan_id=None):
+        """See billing.drivers.BillingStripeDriver.on_trial"""
+        return await self._run(self._driver.on_trial, plan_id)
+
+    async def is_subscribed(self, plan_id, plan_name=None):
+        """See billing.drivers.BillingStripeDriver.is_subscribed"""
+        return await self._run(self._driver.is_subscribed, plan_id, plan_name)
+
+    async def is_canceled(self, plan_id):
+        """See billing.drivers.BillingStripeDriver.is_canceled"""
+        return await self._run(self._driver.is_canceled, plan_id)
+
+    async def cancel(self, plan_id, now=False):
+        """See billing.drivers.BillingStripeDriver.cancel"""
+        return await self._run(self._driver.cancel, plan_id, now=now)
+
+    async def create_customer(self, description, token):
+        """See billing.drivers.BillingStripeDriver.create_customer"""
+        return await self._run(self._driver.create_customer, description, token)
+
+    async def charge(self, amount, **kwargs):
+        """See billing.drivers.BillingStripeDriver.charge"""
+        return await self._run(self._driver.charge, amount, **kwargs)
+
+    async def card(self, customer_id, token):
+        """See billing.drivers.BillingStripeDriver.card"""
+        return await self._run(self._driver.card, customer_id, token)
+
+    async def swap(self, plan, new_plan, item_id=None, **kwargs):
+        """See billing.drivers.BillingStripeDriver.swap"""
+        return await self._run(
+            self._driver.swap, plan, new_plan, item_id=item_id, **kwargs
+        )
+
+    async def resume(self, plan_id):
+        """See billing.drivers.BillingStripeDriver.resume"""
+        return await self._run(self._driver.resume, plan_id)
+
+    async def plan(self, plan_id):
+        """See billing.drivers.BillingStripeDriver.plan"""
+        return await self._run(self._driver.plan, plan_id)
+
+    async def plans(self, plan_ids):
+        """Gets the plan names of many subscriptions at the same time.
+
+        Arguments:
+            plan_ids {list} -- The Stripe subscription identifiers.
+
+        Returns:
+            list -- The plan names in the same order.
+        """
+        return await asyncio.gather(*[self.plan(plan_id) for plan_id in plan_ids])
+
+    def plan_name(self, subscription):
+        """See billing.drivers.BillingStripeDriver.plan_name"""
+        return self._driver.plan_name(subscription)
+
+    def subscription_attributes(self, subscription):
+        """See billing.drivers.BillingStripeDriver.subscription_attributes"""
+        return self._driver.subscription_attributes(subscription)
+
+    def subscription_item(self, subscription):
+        """See billing.drivers.BillingStripeDriver.subscription_item"""
+        return self._driver.subscription_item(subscription)
+
+    def forget(self, object_type, object_id=None):
+        """See billing.drivers.BillingStripeDriver.forget"""
+        return self._driver.forget(object_type, object_id)
+
+    async def _create_customer(self, description, token):
+        """See billing.drivers.BillingStripeDriver._create_customer"""
+        return await self._run(self._driver._create_customer, description, token)
+
+    def _run(self, method, *args, **kwargs):
+        """Runs a blocking driver method on the executor.
+
+        Arguments:
+            method {callable} -- The driver method.
+
+        Returns:
+            asyncio.Future
+        """
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(method, *args, **kwargs)
+        )
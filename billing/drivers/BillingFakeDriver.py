@@ -0,0 +1,527 @@
+""" The In Memory Billing Driver """
+
+import copy
+import threading
+import time
+import uuid
+from collections import Counter
+
+from billing import discounts, stripe_objects
+from billing.exceptions import PlanNotFound
+
+from .ChargeBatch import ChargeBatch
+
+PERIOD = 30 * 24 * 60 * 60
+
+
+class BillingFakeDriver:
+    """Billing driver keeping customers, subscriptions and charges in memory.
+
+    Objects are dictionaries shaped like the Stripe objects so the driver can stand in
+    for BillingStripeDriver in tests and benchmarks without network access.
+    """
+
+    def __init__(self, plans=None, coupons=None, clock=None, latency=0, currency="usd"):
+        """
+        Keyword Arguments:
+            plans {dict|None} -- Plan identifiers mapped to the name, amount and trial_period_days.
+                                    (default: {None})
+            coupons {dict|None} -- Coupon identifiers mapped to percent_off or amount_off. (default: {None})
+            clock {callable|None} -- Returns the current timestamp. If None the system time is used. (default: {None})
+            latency {int|float} -- Seconds every call waits to simulate a round trip. (default: {0})
+            currency {string} -- The currency used when a charge has none. (default: {"usd"})
+        """
+        self.clock = clock or time.time
+        self.latency = latency
+        self.currency = currency
+        self.calls = Counter()
+        self.plans = {}
+        self.coupons = {}
+        self.customers = {}
+        self.subscriptions = {}
+        self.charges = []
+        self._offset = 0
+        self._subscription_args = {}
+        self._idempotency_token = None
+        self._lock = threading.RLock()
+
+        for plan_id, plan in (plans or {}).items():
+            self.add_plan(plan_id, **plan)
+
+        for coupon_id, coupon in (coupons or {}).items():
+            self.add_coupon(coupon_id, **coupon)
+
+    def add_plan(self, plan_id, name, amount=0, trial_period_days=None):
+        """Adds a plan customers can subscribe to.
+
+        Arguments:
+            plan_id {string} -- The plan identifier.
+            name {string} -- The product name of the plan.
+
+        Keyword Arguments:
+            amount {int} -- The price in cents. (default: {0})
+            trial_period_days {int|None} -- The trial days of the plan. (default: {None})
+
+        Returns:
+            dict -- The plan.
+        """
+        self.plans[plan_id] = {
+            "id": plan_id,
+            "object": "plan",
+            "amount": amount,
+            "currency": self.currency,
+            "trial_period_days": trial_period_days,
+            "product": {
+                "id": "prod_{0}".format(plan_id),
+                "object": "product",
+                "name": name,
+            },
+        }
+        return self.plans[plan_id]
+
+    def add_coupon(
+        self, coupon_id, percent_off=None, amount_off=None, redeem_by=None, valid=True
+    ):
+        """Adds a coupon.
+
+        Arguments:
+            coupon_id {string} -- The coupon identifier.
+
+        Keyword Arguments:
+            percent_off {int|float|None} -- The percentage taken off. (default: {None})
+            amount_off {int|None} -- The cents taken off. (default: {None})
+            redeem_by {int|None} -- The timestamp the coupon expires at. (default: {None})
+            valid {bool} -- Whether the coupon can still be redeemed. (default: {True})
+
+        Returns:
+            dict -- The coupon.
+        """
+        self.coupons[coupon_id] = {
+            "id": coupon_id,
+            "object": "coupon",
+            "percent_off": percent_off,
+            "amount_off": amount_off,
+            "currency": self.currency if amount_off else None,
+            "redeem_by": redeem_by,
+            "valid": valid,
+        }
+        return self.coupons[coupon_id]
+
+    def now(self):
+        """Gets the current timestamp of the driver clock.
+
+        Returns:
+            int
+        """
+        return int(self.clock() + self._offset)
+
+    def travel(self, days=0, seconds=0):
+        """Moves the driver clock forward.
+
+        Keyword Arguments:
+            days {int} -- Days to move forward. (default: {0})
+            seconds {int} -- Seconds to move forward. (default: {0})
+
+        Returns:
+            self
+        """
+        self._offset += days * 24 * 60 * 60 + seconds
+        return self
+
+    def subscribe(self, plan, token, customer=None, **kwargs):
+        """See billing.drivers.BillingStripeDriver.subscribe"""
+        self._call("subscribe")
+
+        if not customer:
+            customer = self._create_customer("description", token)
+
+        if not isinstance(customer, str):
+            customer = customer["id"]
+
+        if plan not in self.plans:
+            raise PlanNotFound("The {0} plan was not found in Stripe".format(plan))
+
+        if customer not in self.customers:
+            return False
+
+        arguments = dict(self._subscription_args, **kwargs)
+        return self._new_subscription(customer, plan, **arguments)
+
+    def coupon(self, coupon_id):
+        """See billing.drivers.BillingStripeDriver.coupon"""
+        return self._with_arguments(coupon=coupon_id)
+
+    def trial(self, days=0):
+        """See billing.drivers.BillingStripeDriver.trial"""
+        return self._with_arguments(trial_period_days=days)
+
+    def skip_trial(self):
+        """See billing.drivers.BillingStripeDriver.skip_trial"""
+        return self._with_arguments(trial_period_days=0)
+
+    def idempotent(self, token):
+        """See billing.drivers.BillingStripeDriver.idempotent"""
+        driver = copy.copy(self)
+        driver._idempotency_token = token
+        return driver
+
+    def on_trial(self, plan_id=None):
+        """See billing.drivers.BillingStripeDriver.on_trial"""
+        if plan_id:
+            subscription = self._get_subscription(plan_id)
+            return bool(subscription) and subscription["status"] == "trialing"
+
+        return None
+
+    def is_subscribed(self, plan_id, plan_name=None):
+        """See billing.drivers.BillingStripeDriver.is_subscribed"""
+        subscription = self._get_subscription(plan_id)
+
+        if not subscription:
+            return False
+
+        if not plan_name:
+            return subscription["status"] in ("active", "trialing")
+
+        return subscription["plan"]["id"] == plan_name
+
+    def is_canceled(self, plan_id):
+        """See billing.drivers.BillingStripeDriver.is_canceled"""
+        subscription = self._get_subscription(plan_id)
+
+        return (
+            bool(subscription)
+            and subscription["cancel_at_period_end"] is True
+            and subscription["status"] == "active"
+        )
+
+    def cancel(self, plan_id, now=False):
+        """See billing.drivers.BillingStripeDriver.cancel"""
+        self._call("cancel")
+
+        if now:
+            return self._delete_subscription(plan_id) or False
+
+        return self._modify_subscription(plan_id, cancel_at_period_end=True) or False
+
+    def create_customer(self, description, token):
+        """See billing.drivers.BillingStripeDriver.create_customer"""
+        return self._create_customer(description, token)
+
+    def charge(self, amount, **kwargs):
+        """See billing.drivers.BillingStripeDriver.charge"""
+        return self._create_charge(amount, **kwargs)["status"] == "succeeded"
+
+    def charge_batch(self, items, concurrency=8, prepare=None, key=None):
+        """See billing.drivers.BillingStripeDriver.charge_batch"""
+        return ChargeBatch(
+            self._create_charge,
+            items,
+            prepare=prepare,
+            concurrency=concurrency,
+            key=key,
+        )
+
+    def card(self, customer_id, token):
+        """See billing.drivers.BillingStripeDriver.card"""
+        self._call("card")
+
+        self._modify_customer(customer_id, source=token)
+        return True
+
+    def swap(self, plan, new_plan, item_id=None, **kwargs):
+        """See billing.drivers.BillingStripeDriver.swap"""
+        self._call("swap")
+
+        if new_plan not in self.plans:
+            raise PlanNotFound("The {0} plan was not found in Stripe".format(new_plan))
+
+        return self._modify_subscription(plan, plan=new_plan)
+
+    def resume(self, plan_id):
+        """See billing.drivers.BillingStripeDriver.resume"""
+        self._call("resume")
+
+        self._modify_subscription(plan_id, cancel_at_period_end=False)
+        return True
+
+    def plan(self, plan_id):
+        """See billing.drivers.BillingStripeDriver.plan"""
+        return self.plan_name(self._get_subscription(plan_id))
+
+    def plan_name(self, subscription):
+        """See billing.drivers.BillingStripeDriver.plan_name"""
+        product = subscription["plan"]["product"]
+
+        if isinstance(product, str):
+            product = self._find_product(product)
+
+        return product["name"]
+
+    def subscription_attributes(self, subscription):
+        """See billing.drivers.BillingStripeDriver.subscription_attributes"""
+        return stripe_objects.subscription_attributes(
+            subscription, self.plan_name(subscription)
+        )
+
+    def subscription_item(self, subscription):
+        """See billing.drivers.BillingStripeDriver.subscription_item"""
+        return stripe_objects.subscription_item(subscription)
+
+    def sync_plans(self):
+        """See billing.drivers.BillingStripeDriver.sync_plans"""
+        self._call("sync_plans")
+
+        return {
+            plan_id: plan["product"]["name"] for plan_id, plan in self.plans.items()
+        }
+
+    def list_subscriptions(self, starting_after=None, limit=100):
+        """See billing.drivers.BillingStripeDriver.list_subscriptions"""
+        subscription_ids = list(self.subscriptions)
+        if starting_after in subscription_ids:
+            subscription_ids = subscription_ids[subscription_ids.index(starting_after) + 1:]
+
+        for index, subscription_id in enumerate(subscription_ids):
+            if index % limit == 0:
+                self._call("list_subscriptions")
+            yield self._find_subscription(subscription_id)
+
+    def list_charges(self, limit=100, **filters):
+        """See billing.drivers.BillingStripeDriver.list_charges"""
+        charges = [
+            charge
+            for charge in reversed(self.charges)
+            if not filters.get("customer") or charge.get("customer") == filters["customer"]
+        ]
+
+        for index, charge in enumerate(charges):
+            if index % limit == 0:
+                self._call("list_charges")
+            yield charge
+
+    def list_coupons(self, limit=100):
+        """See billing.drivers.BillingStripeDriver.list_coupons"""
+        for index, coupon in enumerate(list(self.coupons.values())):
+            if index % limit == 0:
+                self._call("list_coupons")
+            yield coupon
+
+    def price(self, items, currency=None):
+        """See billing.drivers.BillingStripeDriver.price"""
+        return discounts.price(
+            items,
+            self._find_coupon,
+            currency=currency or self.currency,
+            now=self.now(),
+        )
+
+    def forget(self, object_type, object_id=None):
+        """See billing.drivers.BillingStripeDriver.forget"""
+        pass
+
+    def _apply_coupon(self, amount, coupon=None, currency=None):
+        """See billing.drivers.BillingStripeDriver._apply_coupon"""
+        if coupon is None:
+            coupon = self._subscription_args.get("coupon")
+
+        if isinstance(coupon, str):
+            coupon = self._find_coupon(coupon)
+
+        return discounts.apply(
+            amount, coupon, currency=currency or self.currency, now=self.now()
+        )
+
+    def _create_customer(self, description, token):
+        """See billing.drivers.BillingStripeDriver._create_customer"""
+        self._call("create_customer")
+
+        return self._new_customer(description=description, source=token)
+
+    def _create_charge(self, amount, **kwargs):
+        """See billing.drivers.BillingStripeDriver._create_charge"""
+        self._call("charge")
+
+        amount = self._apply_coupon(
+            amount, kwargs.pop("coupon", None), kwargs.get("currency")
+        )
+        return self._new_charge(amount, **kwargs)
+
+    def _get_subscription(self, plan_id):
+        """Gets the subscription with its status at the driver clock.
+
+        Arguments:
+            plan_id {string} -- The subscription identifier.
+
+        Returns:
+            dict|None
+        """
+        self._call("retrieve_subscription")
+
+        return self._find_subscription(plan_id)
+
+    def _with_arguments(self, **arguments):
+        """Copies the driver with more subscription arguments while sharing its data.
+
+        Returns:
+            BillingFakeDriver
+        """
+        driver = copy.copy(self)
+        driver._subscription_args = dict(self._subscription_args, **arguments)
+        return driver
+
+    def _call(self, operation):
+        """Counts a call and waits for the simulated latency.
+
+        Arguments:
+            operation {string} -- The name of the call.
+        """
+        # Batches call from many threads at once
+        with self._lock:
+            self.calls[operation] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _new_customer(self, **attributes):
+        with self._lock:
+            customer = dict(
+                attributes, id="cus_{0}".format(uuid.uuid4().hex[:14]), object="customer"
+            )
+            self.customers[customer["id"]] = customer
+            return customer
+
+    def _modify_customer(self, customer_id, **attributes):
+        with self._lock:
+            if customer_id not in self.customers:
+                return None
+
+            self.customers[customer_id].update(attributes)
+            return self.customers[customer_id]
+
+    def _find_product(self, product_id):
+        for plan in self.plans.values():
+            if plan["product"]["id"] == product_id:
+                return plan["product"]
+
+        return None
+
+    def _find_coupon(self, coupon_id):
+        return discounts.Coupon.from_processor(self.coupons[coupon_id])
+
+    def _new_subscription(self, customer, plan, trial_period_days=None, coupon=None, **kwargs):
+        now = self.now()
+
+        if trial_period_days is None:
+            trial_period_days = self.plans[plan]["trial_period_days"]
+
+        subscription_id = "sub_{0}".format(uuid.uuid4().hex[:14])
+        subscription = {
+            "id": subscription_id,
+            "object": "subscription",
+            "customer": customer,
+            "plan": copy.deepcopy(self.plans[plan]),
+            "items": {
+                "object": "list",
+                "data": [
+                    {
+                        "id": "si_{0}".format(uuid.uuid4().hex[:14]),
+                        "object": "subscription_item",
+                        "plan": copy.deepcopy(self.plans[plan]),
+                        "subscription": subscription_id,
+                    }
+                ],
+            },
+            "discount": {"coupon": self.coupons.get(coupon)} if coupon else None,
+            "cancel_at_period_end": False,
+            "canceled_at": None,
+            "ended_at": None,
+            "start_date": now,
+            "current_period_start": now,
+            "current_period_end": now + PERIOD,
+            "trial_start": now if trial_period_days else None,
+            "trial_end": now + trial_period_days * 24 * 60 * 60
+            if trial_period_days
+            else None,
+            "status": None,
+        }
+
+        with self._lock:
+            self.subscriptions[subscription_id] = subscription
+
+        return self._find_subscription(subscription_id)
+
+    def _find_subscription(self, subscription_id):
+        with self._lock:
+            subscription = self.subscriptions.get(subscription_id)
+            if not subscription:
+                return None
+
+            now = self.now()
+
+            # Roll the billing period forward like Stripe does on renewal
+            while (
+                not subscription["ended_at"]
+                and subscription["current_period_end"] <= now
+            ):
+                if subscription["cancel_at_period_end"]:
+                    subscription["ended_at"] = subscription["current_period_end"]
+                    break
+
+                subscription["current_period_start"] = subscription["current_period_end"]
+                subscription["current_period_end"] += PERIOD
+
+            if subscription["ended_at"]:
+                subscription["status"] = "canceled"
+            elif subscription["trial_end"] and subscription["trial_end"] > now:
+                subscription["status"] = "trialing"
+            else:
+                subscription["status"] = "active"
+
+            return copy.deepcopy(subscription)
+
+    def _modify_subscription(self, subscription_id, plan=None, cancel_at_period_end=None):
+        with self._lock:
+            if subscription_id not in self.subscriptions:
+                return None
+
+            subscription = self.subscriptions[subscription_id]
+
+            if plan:
+                subscription["plan"] = copy.deepcopy(self.plans[plan])
+                subscription["items"]["data"][0]["plan"] = copy.deepcopy(self.plans[plan])
+
+            if cancel_at_period_end is not None:
+                subscription["cancel_at_period_end"] = cancel_at_period_end
+                subscription["canceled_at"] = self.now() if cancel_at_period_end else None
+
+            return self._find_subscription(subscription_id)
+
+    def _delete_subscription(self, subscription_id):
+        with self._lock:
+            if subscription_id not in self.subscriptions:
+                return None
+
+            subscription = self.subscriptions[subscription_id]
+            subscription["ended_at"] = subscription["canceled_at"] = self.now()
+            return self._find_subscription(subscription_id)
+
+    def _new_charge(self, amount, **kwargs):
+        source = kwargs.get("source")
+        charge = dict(
+            kwargs,
+            id="ch_{0}".format(uuid.uuid4().hex[:14]),
+            object="charge",
+            amount=amount,
+            currency=kwargs.get("currency") or self.currency,
+            created=self.now(),
+            # Stripe test tokens that are declined
+            status="failed"
+            if source in ("tok_chargeDeclined", "tok_visa_chargeDeclined")
+            else "succeeded",
+        )
+
+        with self._lock:
+            self.charges.append(charge)
+
+        return charge
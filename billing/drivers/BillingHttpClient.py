@@ -0,0 +1,232 @@
+""" The Pooled Stripe HTTP Client """
+
+import hashlib
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from stripe.http_client import RequestsClient
+
+from billing import instrumentation
+
+
+class BillingHttpClient(RequestsClient):
+    """Stripe HTTP client sharing one pool of keep-alive connections between threads.
+
+    Requests wait on an optional token bucket per API key and rate limited (429),
+    conflicting and failed requests are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        keep_alive=True,
+        connect_timeout=5,
+        read_timeout=30,
+        max_retries=0,
+        rate_limiter=None,
+        backoff_base=0.5,
+        backoff_max=8,
+        **kwargs
+    ):
+        """
+        Keyword Arguments:
+            pool_size {int} -- The number of connections kept open to Stripe. (default: {10})
+            keep_alive {bool} -- Whether connections are reused between requests. (default: {True})
+            connect_timeout {int|float} -- Seconds to wait for a connection. (default: {5})
+            read_timeout {int|float} -- Seconds to wait for a response. (default: {30})
+            max_retries {int} -- How many times a failed request is retried. (default: {0})
+            rate_limiter {billing.contracts.BillingRateLimiterContract|None} -- Limits the requests per API key.
+                                    If None requests are not limited. (default: {None})
+            backoff_base {int|float} -- Seconds the first retry waits at most. (default: {0.5})
+            backoff_max {int|float} -- Seconds any retry waits at most. (default: {8})
+        """
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0
+        )
+        session = requests.Session()
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._requests = 0
+        self._rate_limited = 0
+        self._retries = 0
+        self._throttled = 0.0
+
+        super(BillingHttpClient, self).__init__(
+            timeout=(connect_timeout, read_timeout), session=session, **kwargs
+        )
+
+    def request(self, method, url, headers, post_data=None):
+        if self.rate_limiter is not None:
+            self._wait_for_rate_limit(headers)
+
+        with self._lock:
+            self._active += 1
+            self._requests += 1
+
+        if not instrumentation.observing():
+            try:
+                response = super(BillingHttpClient, self).request(
+                    method, url, headers, post_data
+                )
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+            return self._count_rate_limited(response)
+
+        operation = self._operation(method, url)
+        start = time.perf_counter()
+        try:
+            response = super(BillingHttpClient, self).request(
+                method, url, headers, post_data
+            )
+        except Exception as e:
+            instrumentation.emit(
+                "stripe", operation, time.perf_counter() - start, e.__class__.__name__
+            )
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        instrumentation.emit(
+            "stripe",
+            operation,
+            time.perf_counter() - start,
+            "ok" if response[1] < 400 else "http_{0}".format(response[1]),
+        )
+        return self._count_rate_limited(response)
+
+    def stats(self):
+        """Gets the usage of the connection pool.
+
+        Returns:
+            dict -- The pool size, requests in flight, requests made, open and idle connections,
+                    rate limited responses, retries and seconds spent throttled.
+        """
+        connections = 0
+        idle = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            connections += pool.num_connections
+            if pool.pool is not None:
+                idle += len([conn for conn in list(pool.pool.queue) if conn])
+
+        return {
+            "pool_size": self.pool_size,
+            "active": self._active,
+            "requests": self._requests,
+            "connections": connections,
+            "idle": idle,
+            "rate_limited": self._rate_limited,
+            "retries": self._retries,
+            "throttled_seconds": round(self._throttled, 3),
+        }
+
+    def _wait_for_rate_limit(self, headers):
+        """Waits until the bucket of the request API key has a token.
+
+        Arguments:
+            headers {dict} -- The request headers holding the API key.
+        """
+        # The bucket is named after a hash so the secret never leaves the process
+        api_key = headers.get("Authorization", "")
+        wait = self.rate_limiter.reserve(
+            hashlib.sha1(api_key.encode()).hexdigest()[:16]
+        )
+
+        if wait > 0:
+            self._record_throttle("rate_limit", wait)
+            time.sleep(wait)
+
+    def _count_rate_limited(self, response):
+        if response[1] == 429:
+            with self._lock:
+                self._rate_limited += 1
+        return response
+
+    def _record_throttle(self, operation, seconds):
+        """Records time a request is held back.
+
+        Arguments:
+            operation {string} -- rate_limit or backoff.
+            seconds {float} -- How long the request waits.
+        """
+        with self._lock:
+            self._throttled += seconds
+
+        if instrumentation.observing():
+            instrumentation.emit("throttle", operation, seconds)
+
+    def _should_retry(self, response, api_connection_error, num_retries):
+        # Stripe asks to slow down with 429 which the SDK does not retry on its own
+        if (
+            response is not None
+            and response[1] == 429
+            and num_retries < self._max_network_retries()
+        ):
+            return True
+
+        return super(BillingHttpClient, self)._should_retry(
+            response, api_connection_error, num_retries
+        )
+
+    def _sleep_time_seconds(self, num_retries, response=None):
+        """Exponential backoff with full jitter so retrying workers spread out."""
+        seconds = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (num_retries - 1))
+        )
+
+        # Never retry sooner than Stripe asked to
+        retry_after = self._retry_after_header(response) or 0
+        if retry_after <= self.MAX_RETRY_AFTER:
+            seconds = max(retry_after, seconds)
+
+        with self._lock:
+            self._retries += 1
+
+        self._record_throttle("backoff", seconds)
+        return seconds
+
+    @staticmethod
+    def _operation(method, url):
+        """Names a Stripe request after the SDK call that makes it.
+
+        Arguments:
+            method {string} -- The HTTP method.
+            url {string} -- The request url like https://api.stripe.com/v1/subscriptions/sub_1.
+
+        Returns:
+            string -- The call name like Subscription.retrieve.
+        """
+        parts = urlsplit(url).path.strip("/").split("/")[1:] or [""]
+        resource = parts[0][:-1] if parts[0].endswith("s") else parts[0]
+        name = "".join(word.capitalize() for word in resource.split("_"))
+
+        if len(parts) > 2:
+            return "{0}.{1}".format(name, parts[2])
+        if len(parts) == 2:
+            actions = {"get": "retrieve", "post": "modify", "delete": "delete"}
+        else:
+            actions = {"get": "list", "post": "create"}
+
+        return "{0}.{1}".format(name, actions.get(method.lower(), method.lower()))
+
+    def _max_network_retries(self):
+        return self.max_retries
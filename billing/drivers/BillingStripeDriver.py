@@ -1,22 +1,61 @@
 """ The Stripe Billing Driver """
 
-import pendulum
+import copy
+import hashlib
+
 import stripe
 from stripe.error import InvalidRequestError
 
+from billing import discounts, stripe_objects
 from billing.exceptions import PlanNotFound
 
-try:
-    from config import billing
-
-    stripe.api_key = billing.DRIVERS["stripe"]["secret"]
-except ImportError:
-    raise ImportError("Billing configuration found")
+from .ChargeBatch import ChargeBatch
+from .CouponCatalog import CouponCatalog
 
 
 class BillingStripeDriver:
+    def __init__(self, cache=False, http_client=None):
+        """
+        Keyword Arguments:
+            cache {billing.contracts.BillingCacheContract|None|bool} -- The cache for Stripe reads.
+                                    If False it is made from the billing configuration. (default: {False})
+            http_client {stripe.http_client.HTTPClient|None} -- The client making Stripe requests.
+                                    If None the pooled client shared by every driver is used. (default: {None})
+        """
+        try:
+            from config import billing
+        except ImportError:
+            raise ImportError("No billing configuration found")
+
+        options = billing.DRIVERS["stripe"]
+
+        if cache is False:
+            from billing.factories import BillingCacheFactory
+
+            cache = BillingCacheFactory.make(options.get("cache"))
+
+        if http_client is None:
+            from billing.factories import BillingHttpClientFactory
+
+            http_client = BillingHttpClientFactory.shared(options)
 
-    _subscription_args = {}
+        if options["secret"]:
+            stripe.api_key = options["secret"]
+
+        self.currency = options["currency"]
+        self._cache = cache
+        self.http_client = http_client
+        self._subscription_args = {}
+        self._idempotency_token = None
+        self.coupons = CouponCatalog(
+            self.list_coupons,
+            stripe.Coupon.retrieve,
+            ttl=options.get("coupons", {}).get("ttl", 3600),
+        )
+
+        # Every Stripe resource call goes through the default client
+        if stripe.default_http_client is not http_client:
+            stripe.default_http_client = http_client
 
     def subscribe(self, plan, token, customer=None, **kwargs):
         """Subscribe user to a billing plan.
@@ -32,6 +71,7 @@ class BillingStripeDriver:
 
         Raises:
             PlanNotFound -- Raised when the plan is not found.
+            stripe.error.StripeError -- Raised when Stripe fails for any other reason.
 
         Returns:
             billing.models.Subscription - The subscription billing model.
@@ -49,8 +89,7 @@ class BillingStripeDriver:
                 raise PlanNotFound("The {0} plan was not found in Stripe".format(plan))
             if "No such customer" in str(e):
                 return False
-
-        return None
+            raise
 
     def coupon(self, coupon_id):
         """Sets the coupon that should be used on inside the subscription arguments.
@@ -59,11 +98,9 @@ class BillingStripeDriver:
             coupon_id {string} -- Stripes coupon ID
 
         Returns:
-            self
+            BillingStripeDriver -- A copy of the driver that uses the coupon.
         """
-        self._subscription_args.update({"coupon": coupon_id})
-
-        return self
+        return self._with_arguments(coupon=coupon_id)
 
     def trial(self, days=0):
         """Sets the trial days in the subscription args.
@@ -72,10 +109,27 @@ class BillingStripeDriver:
             days {int} -- Number of days to put the user on a trial. (default: {0})
 
         Returns:
-            self
+            BillingStripeDriver -- A copy of the driver that uses the trial days.
         """
-        self._subscription_args.update({"trial_period_days": days})
-        return self
+        return self._with_arguments(trial_period_days=days)
+
+    def idempotent(self, token):
+        """Makes the mutating calls of a copy of the driver safe to retry.
+
+        Every create, update and cancel made through the copy sends an idempotency key
+        derived from the operation, its customer or subscription, its arguments and the
+        token, so Stripe runs a repeated call once and answers it with the first result.
+        Use a token per logical operation like a form submission or a job identifier.
+
+        Arguments:
+            token {string} -- The caller token.
+
+        Returns:
+            BillingStripeDriver -- A copy of the driver that sends idempotency keys.
+        """
+        driver = copy.copy(self)
+        driver._idempotency_token = token
+        return driver
 
     def on_trial(self, plan_id=None):
         """Checks if the user in on a trial
@@ -158,20 +212,21 @@ class BillingStripeDriver:
             now {bool} -- Whether the user should be canceled now or at the end of the billing period. (default: {False})
 
         Returns:
-            False|stripe.subscription.retrieve
+            False|stripe.Subscription -- The canceled subscription with its current_period_end.
         """
-        subscription = stripe.Subscription.retrieve(plan_id)
+        self.forget("subscription", plan_id)
 
+        # One request either way, the response has what the subscription model needs
         if now:
-            canceled = subscription.delete()
+            canceled = stripe.Subscription.delete(plan_id)
         else:
-            subscription.cancel_at_period_end = True
-            subscription.save()
-            canceled = subscription
+            canceled = stripe.Subscription.modify(
+                plan_id,
+                cancel_at_period_end=True,
+                idempotency_key=self._idempotency_key("cancel", plan_id),
+            )
 
-        if canceled:
-            return subscription
-        return False
+        return canceled or False
 
     def create_customer(self, description, token):
         """Created the customer in Stripe.
@@ -191,10 +246,9 @@ class BillingStripeDriver:
         This updates the subscription arguments.
 
         Returns:
-            self
+            BillingStripeDriver -- A copy of the driver that skips the trial.
         """
-        self._subscription_args.update({"trial_period_days": 0})
-        return self
+        return self._with_arguments(trial_period_days=0)
 
     def charge(self, amount, **kwargs):
         """Charges the user a specific amount of money
@@ -205,18 +259,36 @@ class BillingStripeDriver:
         Returns:
             bool -- Whether the charge succeeded.
         """
-        if not kwargs.get("currency"):
-            kwargs.update({"currency": billing.DRIVERS["stripe"]["currency"]})
-
-        amount = self._apply_coupon(amount)
-
-        charge = stripe.Charge.create(amount=amount, **kwargs)
+        charge = self._create_charge(amount, **kwargs)
 
         if charge["status"] == "succeeded":
             return True
         else:
             return False
 
+    def charge_batch(self, items, concurrency=8, prepare=None, key=None):
+        """Charges many amounts at the same time.
+
+        Arguments:
+            items {iterable} -- The charges as (amount, kwargs) unless prepare is given.
+
+        Keyword Arguments:
+            concurrency {int} -- How many charges run at the same time. (default: {8})
+            prepare {callable|None} -- Turns an item into its (amount, kwargs). (default: {None})
+            key {string|None} -- The batch idempotency key. If None a random one is used. (default: {None})
+
+        Returns:
+            billing.drivers.ChargeBatch -- Yields a ChargeResult per charge as it finishes.
+        """
+        return ChargeBatch(
+            self._create_charge,
+            items,
+            prepare=prepare,
+            concurrency=concurrency,
+            key=key,
+            declined=(stripe.error.CardError,),
+        )
+
     def card(self, customer_id, token):
         """Updates the card on file with the user.
 
@@ -228,26 +300,37 @@ class BillingStripeDriver:
             True
         """
         stripe.Customer.modify(
-            customer_id, source=token,
+            customer_id,
+            source=token,
+            idempotency_key=self._idempotency_key("card", customer_id, token=token),
         )
 
         return True
 
-    def swap(self, plan, new_plan, **kwargs):
+    def swap(self, plan, new_plan, item_id=None, **kwargs):
         """Swaps the old plan for a new plan.
 
         Arguments:
             plan {string} -- The old plan the user currently has.
             new_plan {string} -- The new plan the user should be switched to.
 
+        Keyword Arguments:
+            item_id {string|None} -- The subscription item to change, like the item_id of the
+                                     subscription model. If None the subscription is retrieved
+                                     to find it. (default: {None})
+
         Returns:
             stripe.Subscription.modify
         """
-        subscription = stripe.Subscription.retrieve(plan)
+        if item_id is None:
+            item_id = self.subscription_item(stripe.Subscription.retrieve(plan))["item_id"]
+
+        self.forget("subscription", plan)
         subscription = stripe.Subscription.modify(
             plan,
             cancel_at_period_end=True,
-            items=[{"id": subscription["items"]["data"][0].id, "plan": new_plan, }],
+            items=[{"id": item_id, "plan": new_plan, }],
+            idempotency_key=self._idempotency_key("swap", plan, new_plan),
         )
         return subscription
 
@@ -260,11 +343,12 @@ class BillingStripeDriver:
         Returns:
             True
         """
-        subscription = stripe.Subscription.retrieve(plan_id)
+        self.forget("subscription", plan_id)
+        # Clearing cancel_at_period_end needs no subscription item
         stripe.Subscription.modify(
             plan_id,
             cancel_at_period_end=False,
-            items=[{"id": subscription["items"]["data"][0].id}],
+            idempotency_key=self._idempotency_key("resume", plan_id),
         )
         return True
 
@@ -277,35 +361,187 @@ class BillingStripeDriver:
         Returns:
             string -- Returns the plan name.
         """
-        subscription = self._get_subscription(plan_id)
-        product = stripe.Product.retrieve(subscription["plan"]["product"])
+        return self.plan_name(self._get_subscription(plan_id))
+
+    def plan_name(self, subscription):
+        """Gets the plan name from a subscription without retrieving the subscription again.
+
+        The product is read from the subscription when it was expanded, else from the plan catalog.
+
+        Arguments:
+            subscription {stripe.Subscription} -- The Stripe subscription.
+
+        Returns:
+            string -- Returns the plan name.
+        """
+        product = subscription["plan"]["product"]
+
+        if isinstance(product, str):
+            product = self._remember("product", product, stripe.Product.retrieve)
+        elif self._cache is not None:
+            self._cache.put("product", product["id"], product)
+
         return product["name"]
 
-    def _apply_coupon(self, amount):
+    def subscription_attributes(self, subscription):
+        """Gets the subscription model attributes from a Stripe subscription.
+
+        Arguments:
+            subscription {stripe.Subscription} -- The Stripe subscription.
+
+        Returns:
+            dict -- See billing.stripe_objects.subscription_attributes
+        """
+        return stripe_objects.subscription_attributes(
+            subscription, self.plan_name(subscription)
+        )
+
+    def subscription_item(self, subscription):
+        """Gets what plan changes need from a Stripe subscription without another request.
+
+        Arguments:
+            subscription {stripe.Subscription} -- The Stripe subscription.
+
+        Returns:
+            dict -- See billing.stripe_objects.subscription_item
+        """
+        return stripe_objects.subscription_item(subscription)
+
+    def sync_plans(self):
+        """Loads every plan with its product into the plan catalog.
+
+        Returns:
+            dict -- The plan identifiers mapped to the plan names.
+        """
+        plans = {}
+
+        for plan in stripe.Plan.list(limit=100, expand=["data.product"]).auto_paging_iter():
+            if self._cache is not None:
+                self._cache.put("product", plan["product"]["id"], plan["product"])
+            plans[plan["id"]] = plan["product"]["name"]
+
+        return plans
+
+    def list_subscriptions(self, starting_after=None, limit=100):
+        """Iterates every subscription in Stripe, fetching the pages as they are needed.
+
+        Keyword Arguments:
+            starting_after {string|None} -- Start after this subscription identifier. (default: {None})
+            limit {int} -- How many subscriptions each page holds. At most 100. (default: {100})
+
+        Returns:
+            iterator -- The Stripe subscriptions with their plan product expanded.
+        """
+        arguments = {"status": "all", "limit": limit, "expand": ["data.plan.product"]}
+        if starting_after:
+            arguments["starting_after"] = starting_after
+
+        return stripe.Subscription.list(**arguments).auto_paging_iter()
+
+    def list_charges(self, limit=100, **filters):
+        """Iterates the charges in Stripe, newest first, fetching the pages as they are needed.
+
+        Keyword Arguments:
+            limit {int} -- How many charges each page holds. At most 100. (default: {100})
+            filters -- Stripe list filters like customer or created.
+
+        Returns:
+            iterator -- The Stripe charges.
+        """
+        return stripe.Charge.list(limit=limit, **filters).auto_paging_iter()
+
+    def list_coupons(self, limit=100):
+        """Iterates every coupon in Stripe, fetching one page at a time.
+
+        Keyword Arguments:
+            limit {int} -- How many coupons each page holds. At most 100. (default: {100})
+
+        Returns:
+            iterator -- The Stripe coupons.
+        """
+        return stripe.Coupon.list(limit=limit).auto_paging_iter()
+
+    def price(self, items, currency=None):
+        """Discounts many amounts at once with the local coupon catalog.
+
+        Arguments:
+            items {iterable} -- (amount, coupon) pairs. The coupon is a Stripe coupon identifier,
+                                cents, a fraction or None.
+
+        Keyword Arguments:
+            currency {string|None} -- The charge currency. If None the configured one is used. (default: {None})
+
+        Raises:
+            billing.exceptions.CouponNotValid -- Raised when a coupon expired or can not be used.
+
+        Returns:
+            list -- The discounted amounts in cents.
+        """
+        return discounts.price(
+            items, self.coupons.get, currency=currency or self.currency
+        )
+
+    def pool_stats(self):
+        """Gets the usage of the Stripe connection pool.
+
+        Returns:
+            dict
+        """
+        if hasattr(self.http_client, "stats"):
+            return self.http_client.stats()
+
+        return {}
+
+    def forget(self, object_type, object_id=None):
+        """Removes a Stripe object from the read cache.
+
+        Arguments:
+            object_type {string} -- The kind of object like subscription, product or coupon.
+
+        Keyword Arguments:
+            object_id {string|None} -- The Stripe identifier. If None every object of the kind is removed. (default: {None})
+
+        Returns:
+            None
+        """
+        if object_type == "coupon":
+            self.coupons.forget(object_id)
+
+        if self._cache is None:
+            return
+
+        if object_id is None:
+            self._cache.flush(object_type)
+        else:
+            self._cache.forget(object_type, object_id)
+
+    def _apply_coupon(self, amount, coupon=None, currency=None):
         """Applies the coupon code to the subscription.
 
         Arguments:
-            amount {string|int|float} -- If the coupon amount or identifier.
-                - string - Lookup in the processor for the coupon information
+            amount {int} -- The amount in cents.
+
+        Keyword Arguments:
+            coupon {string|int|float|None} -- The coupon amount or identifier. If None the
+                                              coupon of the driver is used. (default: {None})
+                - string - Lookup in the local coupon catalog
                 - integer - deduct directly from the amount
                 - float - deduct the percentage amount
+            currency {string|None} -- The charge currency. (default: {None})
+
+        Raises:
+            billing.exceptions.CouponNotValid -- Raised when the coupon expired or can not be used.
 
         Returns:
             int - Returns the amount that was just charged.
         """
-        if "coupon" in self._subscription_args:
-            if type(self._subscription_args["coupon"]) == str:
-                coupon = stripe.Coupon.retrieve(self._subscription_args["coupon"])
-                if coupon["percent_off"]:
-                    return abs((amount * (coupon["percent_off"] / 100)) - amount)
+        if coupon is None:
+            coupon = self._subscription_args.get("coupon")
 
-                return amount - coupon["amount_off"]
-            elif type(self._subscription_args["coupon"]) == int:
-                return amount - self._subscription_args["coupon"]
-            elif type(self._subscription_args["coupon"]) == float:
-                return abs((amount * (self._subscription_args["coupon"])) - amount)
+        if isinstance(coupon, str):
+            coupon = self.coupons.get(coupon)
 
-        return amount
+        return discounts.apply(amount, coupon, currency=currency or self.currency)
 
     def _create_customer(self, description, token):
         """Creates the customer in Stripe.
@@ -317,10 +553,46 @@ class BillingStripeDriver:
         Returns:
             stripe.Customer.create
         """
+        # A token from Stripe.js is used once so it identifies the request on its own
         return stripe.Customer.create(
-            description=description, source=token  # obtained with Stripe.js
+            description=description,
+            source=token,
+            idempotency_key=self._idempotency_key(
+                "create_customer", description, token=token
+            ),
         )
 
+    def _create_charge(self, amount, **kwargs):
+        """Creates the charge in Stripe after applying the coupon.
+
+        Arguments:
+            amount {int} -- The amount to charge the customer in cents.
+
+        Keyword Arguments:
+            coupon {string|int|float} -- A coupon for this charge instead of the driver coupon.
+            kwargs -- The other Stripe charge arguments.
+
+        Returns:
+            stripe.Charge
+        """
+        if not kwargs.get("currency"):
+            kwargs.update({"currency": self.currency})
+
+        amount = self._apply_coupon(
+            amount, kwargs.pop("coupon", None), kwargs["currency"]
+        )
+
+        if not kwargs.get("idempotency_key"):
+            source = kwargs.get("source")
+            kwargs["idempotency_key"] = self._idempotency_key(
+                "charge",
+                amount,
+                *sorted(kwargs.items()),
+                token=source if str(source).startswith("tok_") else None
+            )
+
+        return stripe.Charge.create(amount=amount, **kwargs)
+
     def _create_subscription(self, customer, **kwargs):
         """Creates the subscription.
 
@@ -336,10 +608,21 @@ class BillingStripeDriver:
         for key, value in self._subscription_args.items():
             kwargs[key] = value
 
+        # Expand the product so the plan name needs no extra calls
+        kwargs.setdefault("expand", ["plan.product"])
+
         subscription = stripe.Subscription.create(
-            customer=customer, cancel_at_period_end=False, **kwargs
+            customer=customer,
+            cancel_at_period_end=False,
+            idempotency_key=self._idempotency_key(
+                "subscribe", customer, *sorted(kwargs.items())
+            ),
+            **kwargs
         )
-        self._subscription_args = {}
+
+        if self._cache is not None:
+            self._cache.put("subscription", subscription["id"], subscription)
+
         return subscription
 
     def _get_subscription(self, plan_id):
@@ -351,4 +634,61 @@ class BillingStripeDriver:
         Returns:
             stripe.Subscription.retrieve
         """
-        return stripe.Subscription.retrieve(plan_id)
+        return self._remember("subscription", plan_id, stripe.Subscription.retrieve)
+
+    def _with_arguments(self, **arguments):
+        """Copies the driver with more subscription arguments.
+
+        The driver itself is never changed so it can be shared between threads.
+
+        Returns:
+            BillingStripeDriver
+        """
+        driver = copy.copy(self)
+        driver._subscription_args = dict(self._subscription_args, **arguments)
+        return driver
+
+    def _idempotency_key(self, operation, *parts, token=None):
+        """Derives the idempotency key of a mutating call.
+
+        Arguments:
+            operation {string} -- The call like charge or swap.
+            parts -- The customer or subscription and the arguments of the call.
+
+        Keyword Arguments:
+            token {string|None} -- A single use token of the call used when the driver has no token. (default: {None})
+
+        Returns:
+            string|None -- None when there is no token so Stripe makes a key per request.
+        """
+        token = self._idempotency_token or token
+        if not token:
+            return None
+
+        digest = hashlib.sha256(
+            "\x1f".join(str(part) for part in (operation,) + parts + (token,)).encode()
+        ).hexdigest()
+        return "billing-{0}-{1}".format(operation, digest[:40])
+
+    def _remember(self, object_type, object_id, retrieve):
+        """Gets a Stripe object from the read cache or retrieves and caches it.
+
+        Arguments:
+            object_type {string} -- The kind of object like subscription, product or coupon.
+            object_id {string} -- The Stripe identifier.
+            retrieve {callable} -- The Stripe retrieve method for the object.
+
+        Returns:
+            stripe.StripeObject
+        """
+        if self._cache is None:
+            return retrieve(object_id)
+
+        cached = self._cache.get(object_type, object_id)
+        if cached is not None:
+            if not isinstance(cached, stripe.stripe_object.StripeObject):
+                # Shared caches hand back plain dictionaries
+                cached = stripe.util.convert_to_stripe_object(cached)
+            return cached
+
+        return self._cache.put(object_type, object_id, retrieve(object_id))
@@ -0,0 +1,122 @@
+""" Concurrent Batches Of One Off Charges """
+
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+ChargeResult = namedtuple(
+    "ChargeResult", ["index", "item", "amount", "charged", "charge_id", "error"]
+)
+
+
+class ChargeBatch:
+    """Runs many charges on a bounded thread pool and yields every result as it finishes.
+
+    Every charge gets an idempotency key made of the batch key and its position so a
+    batch that is run again with the same key does not charge anyone twice. A failed
+    charge is reported in its result and the batch continues.
+    """
+
+    def __init__(
+        self, charge, items, prepare=None, concurrency=8, key=None, declined=()
+    ):
+        """
+        Arguments:
+            charge {callable} -- Creates one charge from an amount and keyword arguments
+                                 and returns the processor charge.
+            items {iterable} -- The charges to make, as (amount, kwargs) unless prepare is given.
+
+        Keyword Arguments:
+            prepare {callable|None} -- Turns an item into its (amount, kwargs). (default: {None})
+            concurrency {int} -- How many charges run at the same time. (default: {8})
+            key {string|None} -- The batch idempotency key. If None a random one is used. (default: {None})
+            declined {tuple} -- The exceptions raised when the processor declines a charge. (default: {()})
+        """
+        self.charge = charge
+        self.items = items
+        self.prepare = prepare or (lambda item: item)
+        self.concurrency = concurrency
+        self.key = key or uuid.uuid4().hex
+        self.declined = declined
+
+        self._lock = threading.Lock()
+        self._summary = {
+            "total": 0,
+            "succeeded": 0,
+            "declined": 0,
+            "failed": 0,
+            "amount": 0,
+        }
+
+    def __iter__(self):
+        items = enumerate(self.items)
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                # Only keep a few charges queued so huge batches are read lazily
+                for index, item in items:
+                    pending.add(executor.submit(self._run, index, item))
+                    if len(pending) >= self.concurrency * 2:
+                        break
+
+                if not pending:
+                    return
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def run(self):
+        """Runs the whole batch.
+
+        Returns:
+            dict -- The summary.
+        """
+        for _ in self:
+            pass
+
+        return self.summary()
+
+    def summary(self):
+        """Counts the charges finished so far.
+
+        Returns:
+            dict -- The total, succeeded, declined and failed charges and the amount charged.
+        """
+        with self._lock:
+            return dict(self._summary)
+
+    def _run(self, index, item):
+        amount = None
+        try:
+            amount, kwargs = self.prepare(item)
+            kwargs = dict(kwargs)
+            kwargs.setdefault(
+                "idempotency_key", "charge-{0}-{1}".format(self.key, index)
+            )
+
+            charge = self.charge(amount, **kwargs)
+            result = ChargeResult(
+                index,
+                item,
+                charge["amount"],
+                charge["status"] == "succeeded",
+                charge["id"],
+                None,
+            )
+        except Exception as e:
+            result = ChargeResult(index, item, amount, False, None, e)
+
+        with self._lock:
+            self._summary["total"] += 1
+            if result.charged:
+                self._summary["succeeded"] += 1
+                self._summary["amount"] += result.amount
+            elif result.error is None or isinstance(result.error, self.declined):
+                self._summary["declined"] += 1
+            else:
+                self._summary["failed"] += 1
+
+        return result
@@ -0,0 +1,105 @@
+""" A Local Catalog Of Processor Coupons """
+
+import threading
+import time
+
+from billing.discounts import Coupon
+
+
+class CouponCatalog:
+    """Keeps every processor coupon in memory so discounts need no processor reads.
+
+    The whole catalog is listed at once and listed again when it is older than its
+    time to live. A coupon created since then is retrieved on its own and added.
+    """
+
+    def __init__(self, fetch, retrieve, ttl=3600, clock=None):
+        """
+        Arguments:
+            fetch {callable} -- Iterates every processor coupon.
+            retrieve {callable} -- Gets one processor coupon by its identifier.
+
+        Keyword Arguments:
+            ttl {int} -- Seconds before the catalog is listed again. (default: {3600})
+            clock {callable|None} -- Returns the current monotonic time. (default: {None})
+        """
+        self.fetch = fetch
+        self.retrieve = retrieve
+        self.ttl = ttl
+        self.clock = clock or time.monotonic
+        self._coupons = {}
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def get(self, coupon_id):
+        """Gets a coupon, syncing the catalog when it is stale.
+
+        Arguments:
+            coupon_id {string} -- The coupon identifier.
+
+        Returns:
+            billing.discounts.Coupon
+        """
+        coupons = self.all()
+        if coupon_id in coupons:
+            return coupons[coupon_id]
+
+        coupon = Coupon.from_processor(self.retrieve(coupon_id))
+        with self._lock:
+            self._coupons = dict(self._coupons, **{coupon_id: coupon})
+
+        return coupon
+
+    def all(self):
+        """Gets every coupon, syncing the catalog when it is stale.
+
+        Returns:
+            dict -- Coupon identifiers mapped to billing.discounts.Coupon.
+        """
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self._sync()
+
+        return self._coupons
+
+    def sync(self):
+        """Lists every coupon again.
+
+        Returns:
+            int -- The number of coupons.
+        """
+        with self._lock:
+            self._sync()
+
+        return len(self._coupons)
+
+    def forget(self, coupon_id=None):
+        """Drops a changed coupon so it is retrieved again.
+
+        Keyword Arguments:
+            coupon_id {string|None} -- The coupon identifier. If None the whole catalog is
+                                        listed again on next use. (default: {None})
+        """
+        with self._lock:
+            if coupon_id is None:
+                self._synced_at = None
+            else:
+                self._coupons = {
+                    key: coupon
+                    for key, coupon in self._coupons.items()
+                    if key != coupon_id
+                }
+
+    def __len__(self):
+        return len(self._coupons)
+
+    def _stale(self):
+        return self._synced_at is None or self.clock() - self._synced_at >= self.ttl
+
+    def _sync(self):
+        # Readers keep the old dictionary until the new one is complete
+        self._coupons = {
+            coupon["id"]: Coupon.from_processor(coupon) for coupon in self.fetch()
+        }
+        self._synced_at = self.clock()
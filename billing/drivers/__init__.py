@@ -1 +1,6 @@
+from .ChargeBatch import ChargeBatch, ChargeResult
 from .BillingStripeDriver import BillingStripeDriver
+from .AsyncBillingStripeDriver import AsyncBillingStripeDriver
+from .BillingFakeDriver import BillingFakeDriver
+from .BillingHttpClient import BillingHttpClient
+from .CouponCatalog import CouponCatalog
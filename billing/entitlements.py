@@ -0,0 +1,281 @@
+""" Billing Entitlements
+
+Signed, expiring snapshots of the subscriptions of a user. Keep the token in the session or
+a cookie and hand it back to the user so subscription checks run in memory instead
+of reading the subscriptions table on every request.
+
+    token = user.entitlement_token()
+    request.cookie("billing_entitlement", token)
+
+    # On the next request
+    if not user.use_entitlement(request.get_cookie("billing_entitlement")):
+        request.cookie("billing_entitlement", user.entitlement_token())
+    user.is_subscribed("masonite-test")
+
+Every token carries the version of its user, a random value kept in the entitlement
+cache. Saving a subscription replaces the version so tokens issued before the change
+stop being accepted. Tokens whose version is not in the cache anymore, like after a
+restart or an eviction, are refused and issued again.
+
+The memory cache only sees the subscriptions saved by its own process. Use the redis
+cache when several processes serve requests so a webhook handled by one of them
+revokes the tokens accepted by the others.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import uuid
+from collections import namedtuple
+
+import pendulum
+
+from billing.factories import BillingCacheFactory
+
+_EntitledSubscription = namedtuple(
+    "EntitledSubscription",
+    ["plan", "plan_name", "status", "trial_ends_at", "ends_at"],
+)
+
+_Entitlement = namedtuple(
+    "Entitlement", ["user_id", "subscriptions", "version", "expires_at"]
+)
+
+
+class EntitledSubscription(_EntitledSubscription):
+    """A subscription snapshot answering the same checks as a Subscription.
+
+    Dates are timestamps.
+    """
+
+    __slots__ = ()
+
+    def is_active(self, plan=None, now=None):
+        """See billing.models.Subscription.is_active"""
+        if not self.ends_at or self.ends_at > _now(now):
+            return not plan or self.plan == plan
+
+        return False
+
+    def is_on_trial(self, plan=None, now=None):
+        """See billing.models.Subscription.is_on_trial"""
+        if self.trial_ends_at and self.trial_ends_at > _now(now):
+            return not plan or self.plan == plan
+
+        return False
+
+    def is_canceled(self, now=None):
+        """See billing.models.Subscription.is_canceled"""
+        return bool(self.ends_at and self.ends_at > _now(now))
+
+    def has_ended(self, plan=None, now=None):
+        """See billing.models.Subscription.has_ended"""
+        if self.ends_at and self.ends_at <= _now(now):
+            return not plan or self.plan == plan
+
+        return False
+
+
+class Entitlement(_Entitlement):
+    """A verified token holding an EntitledSubscription per plan, the primary one first."""
+
+    __slots__ = ()
+
+    def expired(self, now=None):
+        """Whether the token has to be issued again.
+
+        Keyword Arguments:
+            now {int|None} -- The current timestamp. If None the system time is used. (default: {None})
+
+        Returns:
+            bool
+        """
+        return self.expires_at <= _now(now)
+
+
+class Entitlements:
+    """Issues and verifies entitlement tokens and keeps the version of every user."""
+
+    def __init__(self, secret, ttl=3600, cache=None):
+        """
+        Arguments:
+            secret {string|None} -- The key signing the tokens. If None tokens can not be issued.
+
+        Keyword Arguments:
+            ttl {int} -- Seconds a token is accepted. (default: {3600})
+            cache {dict|billing.contracts.BillingCacheContract|None} -- Where the user versions are kept.
+                                    Entries should live at least as long as a token. (default: {None})
+        """
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.ttl = ttl
+        self.versions = BillingCacheFactory.make(
+            cache if cache is not None else {"ttl": max(ttl, 86400), "size": 100000}
+        )
+
+    @classmethod
+    def from_config(cls, options=None):
+        """Makes the entitlements from the ENTITLEMENTS billing configuration.
+
+        Keyword Arguments:
+            options {dict|None} -- The settings with the secret, ttl and cache. (default: {None})
+
+        Returns:
+            Entitlements
+        """
+        options = options or {}
+        return cls(
+            options.get("secret"),
+            ttl=options.get("ttl", 3600),
+            cache=options.get("cache"),
+        )
+
+    def issue(self, user_id, subscriptions, now=None):
+        """Signs a snapshot of the subscriptions of a user.
+
+        Arguments:
+            user_id {int} -- The user identifier.
+            subscriptions {iterable} -- The billing.models.Subscription of every plan, the primary one first,
+                                        like a billing.models.SubscriptionSet.
+
+        Keyword Arguments:
+            now {int|None} -- The current timestamp. If None the system time is used. (default: {None})
+
+        Raises:
+            ValueError -- Raised when no secret is configured.
+
+        Returns:
+            string -- The token.
+        """
+        if not self.secret:
+            raise ValueError("Set a secret in the billing ENTITLEMENTS configuration")
+
+        now = _now(now)
+        entitled = []
+
+        for subscription in subscriptions:
+            trial_ends_at = _timestamp(subscription.trial_ends_at)
+            ends_at = _timestamp(subscription.ends_at)
+            entitled.append(
+                [
+                    subscription.plan,
+                    subscription.plan_name,
+                    _status(trial_ends_at, ends_at, now),
+                    trial_ends_at,
+                    ends_at,
+                ]
+            )
+
+        version = self.version(user_id)
+        if version is None:
+            version = self.versions.put("entitlement", user_id, _new_version())
+
+        fields = [user_id, entitled]
+        fields += [version, now + self.ttl]
+        payload = _encode(json.dumps(fields, separators=(",", ":")).encode())
+
+        return "{0}.{1}".format(payload, self._sign(payload))
+
+    def verify(self, token, user_id=None, now=None):
+        """Checks the signature, expiry and version of a token.
+
+        Arguments:
+            token {string|None} -- The token.
+
+        Keyword Arguments:
+            user_id {int|None} -- The user the token should belong to. (default: {None})
+            now {int|None} -- The current timestamp. If None the system time is used. (default: {None})
+
+        Returns:
+            Entitlement|None -- None when the token is missing, forged, expired or revoked.
+        """
+        if not token or not self.secret or token.count(".") != 1:
+            return None
+
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(self._sign(payload), signature):
+            return None
+
+        try:
+            owner, subscriptions, version, expires_at = json.loads(
+                _decode(payload).decode()
+            )
+            entitlement = Entitlement(
+                owner,
+                tuple(EntitledSubscription(*fields) for fields in subscriptions),
+                version,
+                expires_at,
+            )
+        except (TypeError, ValueError):
+            return None
+
+        if user_id is not None and entitlement.user_id != user_id:
+            return None
+
+        # A version missing from the cache may have been revoked, so it never matches
+        version = self.version(entitlement.user_id)
+        if entitlement.expired(now) or version is None or entitlement.version != version:
+            return None
+
+        return entitlement
+
+    def revoke(self, user_id):
+        """Replaces the version of a user so the tokens issued so far are refused.
+
+        Arguments:
+            user_id {int} -- The user identifier.
+
+        Returns:
+            string -- The new version.
+        """
+        return self.versions.put("entitlement", user_id, _new_version())
+
+    def version(self, user_id):
+        """Gets the current token version of a user.
+
+        Arguments:
+            user_id {int} -- The user identifier.
+
+        Returns:
+            string|None -- None when no token was issued since the version was revoked,
+                           evicted or the process started.
+        """
+        return self.versions.get("entitlement", user_id)
+
+    def _sign(self, payload):
+        # Half of the SHA-256 digest keeps the token short and is still 128 bits
+        return _encode(
+            hmac.new(self.secret, payload.encode(), hashlib.sha256).digest()[:16]
+        )
+
+
+def _new_version():
+    # Random so a version issued before a restart or an eviction is never issued again
+    return uuid.uuid4().hex[:16]
+
+
+def _now(now=None):
+    return pendulum.now().int_timestamp if now is None else now
+
+
+def _timestamp(date):
+    return None if date is None else date.int_timestamp
+
+
+def _status(trial_ends_at, ends_at, now):
+    if ends_at and ends_at <= now:
+        return "ended"
+    if ends_at:
+        return "canceled"
+    if trial_ends_at and trial_ends_at > now:
+        return "trialing"
+
+    return "active"
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
@@ -1,2 +1,6 @@
 class PlanNotFound(Exception):
     pass
+
+
+class CouponNotValid(Exception):
+    pass
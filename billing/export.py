@@ -0,0 +1,137 @@
+""" Billing Exports
+
+Generators reading the subscriptions table in chunks and the Stripe charges page by
+page, and writers streaming them as CSV or NDJSON, so an export uses the same memory
+for ten rows and ten million.
+
+    from billing import export
+
+    with open("subscriptions.csv", "w", newline="") as stream:
+        export.write(export.subscriptions(), stream, "csv")
+"""
+
+import csv
+import itertools
+import json
+
+import pendulum
+
+from billing.factories import BillingFactory
+
+CHARGE_FIELDS = [
+    "id",
+    "customer",
+    "amount",
+    "amount_refunded",
+    "currency",
+    "status",
+    "paid",
+    "refunded",
+    "description",
+    "created",
+]
+
+FORMATS = ("csv", "ndjson")
+
+
+def subscriptions(chunk_size=1000, after_id=0):
+    """Iterates the rows of the subscriptions table in identifier order.
+
+    Every chunk is read with a keyset query, so reading later chunks is as fast as the first.
+
+    Keyword Arguments:
+        chunk_size {int} -- How many rows are read per query. (default: {1000})
+        after_id {int} -- Start after this subscription identifier. (default: {0})
+
+    Returns:
+        iterator -- The rows as dictionaries.
+    """
+    from billing.models import Subscription
+
+    connection = Subscription.resolve_connection()
+    table = Subscription().get_table()
+
+    while True:
+        # Plain rows instead of models keep every chunk small
+        rows = (
+            connection.table(table)
+            .where("id", ">", after_id)
+            .order_by("id")
+            .limit(chunk_size)
+            .get()
+        )
+
+        for row in rows:
+            yield dict(row)
+
+        if len(rows) < chunk_size:
+            return
+
+        after_id = rows[-1]["id"]
+
+
+def charges(processor=None, **filters):
+    """Iterates the processor charges, newest first, fetching one page at a time.
+
+    Keyword Arguments:
+        processor {billing.contracts.BillingProcessorContract|None} -- Where the charges are read.
+                                If None the configured processor is used. (default: {None})
+        filters -- Processor list filters like customer or created.
+
+    Returns:
+        iterator -- The charges as flat dictionaries of CHARGE_FIELDS.
+    """
+    processor = processor or BillingFactory.processor()
+
+    for charge in processor.list_charges(**filters):
+        row = {field: charge.get(field) for field in CHARGE_FIELDS}
+        row["created"] = pendulum.from_timestamp(row["created"]).to_iso8601_string()
+        yield row
+
+
+def write(rows, stream, format="csv", fields=None):
+    """Writes rows to a stream one at a time.
+
+    Arguments:
+        rows {iterable} -- Dictionaries to write.
+        stream {file} -- A text stream like an open file or sys.stdout.
+
+    Keyword Arguments:
+        format {string} -- csv or ndjson. (default: {"csv"})
+        fields {list|None} -- The CSV columns. If None the keys of the first row are used. (default: {None})
+
+    Raises:
+        ValueError -- Raised when the format is not supported.
+
+    Returns:
+        int -- The number of rows written.
+    """
+    if format not in FORMATS:
+        raise ValueError(
+            "Unsupported export format {0}. Use one of {1}".format(
+                format, ", ".join(FORMATS)
+            )
+        )
+
+    rows = iter(rows)
+    count = 0
+
+    if format == "csv":
+        first = next(rows, None)
+        if first is None:
+            return 0
+
+        writer = csv.DictWriter(stream, fields or list(first), extrasaction="ignore")
+        writer.writeheader()
+        rows = itertools.chain([first], rows)
+
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, default=str))
+            stream.write("\n")
+            count += 1
+
+    return count
@@ -0,0 +1,32 @@
+from billing.cache import BillingMemoryCache, BillingRedisCache
+
+
+class BillingCacheFactory:
+    @staticmethod
+    def make(options=None):
+        """Makes the cache used for processor reads.
+
+        Keyword Arguments:
+            options {dict|object|None} -- The cache settings from the billing configuration.
+                                            An object that is not a dictionary is used as the cache itself. (default: {None})
+
+        Returns:
+            billing.contracts.BillingCacheContract|None -- None when caching is disabled.
+        """
+        if options is None:
+            return BillingMemoryCache()
+
+        if not isinstance(options, dict):
+            return options
+
+        options = dict(options)
+        driver = options.pop("driver", "memory")
+
+        if driver == "memory":
+            return BillingMemoryCache(**options)
+        if driver == "redis":
+            return BillingRedisCache(**options)
+        if not driver:
+            return None
+
+        raise ValueError("The {0} billing cache driver is not supported".format(driver))
@@ -1,8 +1,111 @@
-from billing.drivers import BillingStripeDriver
+import threading
 
 
 class BillingFactory:
+
+    _processors = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def make(driver):
         if driver == "stripe":
+            # Imported here so the Stripe SDK only loads when billing is used
+            from billing.drivers import BillingStripeDriver
+
             return BillingStripeDriver()
+
+        if driver == "fake":
+            from billing.drivers import BillingFakeDriver
+
+            return BillingFakeDriver()
+
+    @staticmethod
+    def make_async(driver, processor=None):
+        if driver in ("stripe", "fake"):
+            from billing.drivers import AsyncBillingStripeDriver
+
+            return AsyncBillingStripeDriver(processor)
+
+    @classmethod
+    def processor(cls):
+        """Gets the processor of the configured driver, making it on first use.
+
+        Returns:
+            billing.contracts.BillingProcessorContract
+        """
+        if "sync" not in cls._processors:
+            with cls._lock:
+                if "sync" not in cls._processors:
+                    cls._processors["sync"] = cls.make(cls._driver())
+
+        return cls._processors["sync"]
+
+    @classmethod
+    def async_processor(cls):
+        """Gets the asynchronous processor of the configured driver, making it on first use.
+
+        Returns:
+            billing.drivers.AsyncBillingStripeDriver
+        """
+        if "async" not in cls._processors:
+            processor = cls.processor()
+            with cls._lock:
+                if "async" not in cls._processors:
+                    cls._processors["async"] = cls.make_async(cls._driver(), processor)
+
+        return cls._processors["async"]
+
+    @classmethod
+    def entitlements(cls):
+        """Gets the entitlements made from the billing configuration, making them on first use.
+
+        Returns:
+            billing.entitlements.Entitlements
+        """
+        if "entitlements" not in cls._processors:
+            with cls._lock:
+                if "entitlements" not in cls._processors:
+                    from billing.entitlements import Entitlements
+
+                    cls._processors["entitlements"] = Entitlements.from_config(
+                        cls._config("ENTITLEMENTS")
+                    )
+
+        return cls._processors["entitlements"]
+
+    @classmethod
+    def use(cls, processor=None):
+        """Replaces the processor every Billable uses, like a fake driver in tests.
+
+        Keyword Arguments:
+            processor {billing.contracts.BillingProcessorContract|None} -- The processor.
+                                    If None the configured driver is made again on next use. (default: {None})
+        """
+        with cls._lock:
+            # The entitlement versions outlive the processor so revoked tokens stay revoked
+            processors = {
+                key: value
+                for key, value in cls._processors.items()
+                if key == "entitlements"
+            }
+            if processor is not None:
+                processors["sync"] = processor
+            cls._processors = processors
+
+    @staticmethod
+    def _driver():
+        try:
+            from config import billing
+        except ImportError:
+            raise ImportError("No configuration file found")
+
+        return billing.DRIVER
+
+    @staticmethod
+    def _config(name):
+        try:
+            from config import billing
+        except ImportError:
+            raise ImportError("No configuration file found")
+
+        return getattr(billing, name, None)
@@ -0,0 +1,47 @@
+import threading
+
+
+class BillingHttpClientFactory:
+
+    _client = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def make(options=None):
+        """Makes a pooled Stripe HTTP client.
+
+        Keyword Arguments:
+            options {dict|None} -- The Stripe driver settings from the billing configuration,
+                                    with the http and rate_limit settings. (default: {None})
+
+        Returns:
+            billing.drivers.BillingHttpClient
+        """
+        from billing.drivers.BillingHttpClient import BillingHttpClient
+        from billing.factories import BillingRateLimiterFactory
+
+        options = options or {}
+        return BillingHttpClient(
+            rate_limiter=BillingRateLimiterFactory.make(options.get("rate_limit")),
+            **options.get("http", {})
+        )
+
+    @classmethod
+    def shared(cls, options=None):
+        """Gets the client every Stripe driver of the process uses, making it on first use.
+
+        Stripe sends every request through one global client, so drivers share a single
+        connection pool and rate limit instead of replacing each other's.
+
+        Keyword Arguments:
+            options {dict|None} -- The Stripe driver settings used when the client is made. (default: {None})
+
+        Returns:
+            billing.drivers.BillingHttpClient
+        """
+        if cls._client is None:
+            with cls._lock:
+                if cls._client is None:
+                    cls._client = cls.make(options)
+
+        return cls._client
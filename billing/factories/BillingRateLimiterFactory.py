@@ -0,0 +1,34 @@
+from billing.limiters import BillingMemoryRateLimiter, BillingRedisRateLimiter
+
+
+class BillingRateLimiterFactory:
+    @staticmethod
+    def make(options=None):
+        """Makes the rate limiter every Stripe request waits on.
+
+        Keyword Arguments:
+            options {dict|object|None} -- The rate limit settings from the billing configuration.
+                                            An object that is not a dictionary is used as the limiter itself. (default: {None})
+
+        Returns:
+            billing.contracts.BillingRateLimiterContract|None -- None when requests are not limited.
+        """
+        if options is None:
+            return None
+
+        if not isinstance(options, dict):
+            return options
+
+        options = dict(options)
+        driver = options.pop("driver", "memory")
+
+        if driver == "memory":
+            return BillingMemoryRateLimiter(**options)
+        if driver == "redis":
+            return BillingRedisRateLimiter(**options)
+        if not driver:
+            return None
+
+        raise ValueError(
+            "The {0} billing rate limit driver is not supported".format(driver)
+        )
@@ -1 +1,4 @@
+from .BillingCacheFactory import BillingCacheFactory
+from .BillingHttpClientFactory import BillingHttpClientFactory
+from .BillingRateLimiterFactory import BillingRateLimiterFactory
 from .BillingFactory import BillingFactory
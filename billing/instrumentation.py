@@ -0,0 +1,205 @@
+""" Billing Instrumentation
+
+Observers registered with observe are called with a BillingEvent after every Stripe
+request, every subscriptions table query made by a Billable user and every time a
+Stripe request is held back by the rate limiter or a retry backoff. Nothing is timed
+while no observer is registered.
+
+    from billing.instrumentation import PrometheusExporter, observe
+
+    exporter = observe(PrometheusExporter())
+    ...
+    exporter.render()
+"""
+
+import functools
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+BillingEvent = namedtuple(
+    "BillingEvent", ["kind", "operation", "method", "seconds", "outcome"]
+)
+BillingEvent.__doc__ = """A finished Stripe request, subscription query or throttle wait.
+
+kind is "stripe", "query" or "throttle", operation names the call like Subscription.retrieve
+or subscriptions.select, or for a throttle wait rate_limit or backoff. method is the Billable
+method that made it and outcome is "ok" or the error that happened. The seconds of a throttle
+wait are how long the request was held back.
+"""
+
+_observers = []
+_context = threading.local()
+
+
+def observe(observer):
+    """Registers an observer.
+
+    Arguments:
+        observer {callable} -- Called with every BillingEvent.
+
+    Returns:
+        callable -- The observer.
+    """
+    if observer not in _observers:
+        _observers.append(observer)
+    return observer
+
+
+def unobserve(observer):
+    """Removes an observer.
+
+    Arguments:
+        observer {callable} -- The registered observer.
+    """
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def observing():
+    """Whether any observer is registered.
+
+    Returns:
+        bool
+    """
+    return bool(_observers)
+
+
+def emit(kind, operation, seconds, outcome="ok"):
+    """Sends an event to the observers.
+
+    Arguments:
+        kind {string} -- "stripe", "query" or "throttle".
+        operation {string} -- The name of the call.
+        seconds {float} -- How long the call took.
+
+    Keyword Arguments:
+        outcome {string} -- "ok" or the error that happened. (default: {"ok"})
+    """
+    event = BillingEvent(
+        kind, operation, getattr(_context, "method", None), seconds, outcome
+    )
+
+    for observer in list(_observers):
+        try:
+            observer(event)
+        except Exception:
+            # A broken observer must not break billing
+            pass
+
+
+@contextmanager
+def timed(kind, operation):
+    """Times the block and emits an event with its outcome.
+
+    Arguments:
+        kind {string} -- "stripe", "query" or "throttle".
+        operation {string} -- The name of the call.
+    """
+    if not _observers:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        emit(kind, operation, time.perf_counter() - start, e.__class__.__name__)
+        raise
+
+    emit(kind, operation, time.perf_counter() - start)
+
+
+def billable_method(method):
+    """Tags the events emitted during a Billable method with its name.
+
+    Only the outermost method is used so the checks subscribe makes are reported as subscribe.
+
+    Arguments:
+        method {function} -- The Billable method.
+
+    Returns:
+        function
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not _observers or getattr(_context, "method", None):
+            return method(*args, **kwargs)
+
+        _context.method = method.__name__
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _context.method = None
+
+    return wrapper
+
+
+class PrometheusExporter:
+    """Observer keeping a latency histogram of the billing events in the Prometheus text format."""
+
+    buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name="billing_operation_seconds", buckets=None):
+        """
+        Keyword Arguments:
+            name {string} -- The metric name. (default: {"billing_operation_seconds"})
+            buckets {tuple|None} -- The histogram bucket upper bounds in seconds. (default: {None})
+        """
+        self.name = name
+        self.buckets = tuple(sorted(buckets or self.buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        labels = (event.kind, event.operation, event.method or "", event.outcome)
+
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+
+            for index, bound in enumerate(self.buckets):
+                if event.seconds <= bound:
+                    series[0][index] += 1
+            series[1] += event.seconds
+            series[2] += 1
+
+    def render(self):
+        """Renders the histogram.
+
+        Returns:
+            string -- The metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP {0} Time spent in Stripe requests, subscription queries and throttle waits.".format(
+                self.name
+            ),
+            "# TYPE {0} histogram".format(self.name),
+        ]
+
+        with self._lock:
+            for labels, (buckets, total, count) in sorted(self._series.items()):
+                label = 'kind="{0}",operation="{1}",method="{2}",outcome="{3}"'.format(
+                    *labels
+                )
+                for bound, bucket in zip(self.buckets, buckets):
+                    lines.append(
+                        '{0}_bucket{{{1},le="{2}"}} {3}'.format(
+                            self.name, label, bound, bucket
+                        )
+                    )
+                lines.append(
+                    '{0}_bucket{{{1},le="+Inf"}} {2}'.format(self.name, label, count)
+                )
+                lines.append("{0}_sum{{{1}}} {2}".format(self.name, label, total))
+                lines.append("{0}_count{{{1}}} {2}".format(self.name, label, count))
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Clears the recorded events."""
+        with self._lock:
+            self._series = {}
@@ -0,0 +1,175 @@
+""" Subscription Lifecycle
+
+Finds the trials and subscriptions that ended, or are about to end, within a window of
+time and sends a LifecycleEvent for each to the registered listeners, like to downgrade
+access or send a reminder. The subscriptions table is read in chunks along its
+(ends_at, id) and (trial_ends_at, id) indexes, so each chunk is one short range query.
+
+    from billing import lifecycle
+
+    @lifecycle.listen
+    def downgrade(event):
+        if event.name == lifecycle.SUBSCRIPTION_ENDED:
+            ...
+
+    lifecycle.expire(since, pendulum.now(), ahead=3 * 24 * 60 * 60)
+
+The billing:expire command runs expire on a schedule, each run starting where the last
+one stopped. Listeners should be idempotent since a window is sent again when a run fails.
+"""
+
+from collections import namedtuple
+
+TRIAL_ENDING = "trial_ending"
+TRIAL_ENDED = "trial_ended"
+SUBSCRIPTION_ENDING = "subscription_ending"
+SUBSCRIPTION_ENDED = "subscription_ended"
+
+# The column each transition is read from, with the events sent before and after it
+TRANSITIONS = (
+    ("trial_ends_at", TRIAL_ENDING, TRIAL_ENDED),
+    ("ends_at", SUBSCRIPTION_ENDING, SUBSCRIPTION_ENDED),
+)
+
+LifecycleEvent = namedtuple(
+    "LifecycleEvent", ["name", "subscription_id", "user_id", "plan", "at"]
+)
+LifecycleEvent.__doc__ = """A trial or subscription that ended or is about to end.
+
+name is one of the TRIAL_ and SUBSCRIPTION_ constants and at is when the trial or the
+subscription ends.
+"""
+
+_listeners = []
+
+
+def listen(listener):
+    """Registers a listener.
+
+    Arguments:
+        listener {callable} -- Called with every LifecycleEvent.
+
+    Returns:
+        callable -- The listener.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+def unlisten(listener):
+    """Removes a listener.
+
+    Arguments:
+        listener {callable} -- The registered listener.
+    """
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def expire(since, until, ahead=None, chunk_size=1000, partition=None):
+    """Sends an event to the listeners for every transition within a window.
+
+    Unlike instrumentation observers, a failing listener stops the scan so the window
+    can be sent again.
+
+    Arguments:
+        since {pendulum.DateTime} -- The start of the window, included.
+        until {pendulum.DateTime} -- The end of the window, excluded.
+
+    Keyword Arguments:
+        ahead {int|None} -- Also send the _ENDING events for the window moved this many seconds
+                            ahead, like to remind users a few days before. (default: {None})
+        chunk_size {int} -- How many subscriptions are read per query. (default: {1000})
+        partition {tuple|None} -- A (worker, workers) pair to only read the subscriptions of
+                                  one of several workers, the worker counted from 1. (default: {None})
+
+    Returns:
+        dict -- The event names mapped to how many were sent.
+    """
+    sent = {}
+
+    for event in transitions(
+        since, until, ahead=ahead, chunk_size=chunk_size, partition=partition
+    ):
+        for listener in list(_listeners):
+            listener(event)
+        sent[event.name] = sent.get(event.name, 0) + 1
+
+    return sent
+
+
+def transitions(since, until, ahead=None, chunk_size=1000, partition=None):
+    """Iterates the transitions within a window, trials first.
+
+    See expire for the arguments.
+
+    Returns:
+        iterator -- The LifecycleEvent of every transition.
+    """
+    for column, ending, ended in TRANSITIONS:
+        windows = [(ended, since, until)]
+        if ahead:
+            windows.append(
+                (ending, since.add(seconds=ahead), until.add(seconds=ahead))
+            )
+
+        for name, start, end in windows:
+            for row, at in scan(
+                column, start, end, chunk_size=chunk_size, partition=partition
+            ):
+                yield LifecycleEvent(name, row["id"], row["user_id"], row["plan"], at)
+
+
+def scan(column, start, end, chunk_size=1000, partition=None):
+    """Iterates the subscriptions whose date column is within a range, in (column, id) order.
+
+    Every chunk continues after the last (column, id) pair read, so reading later
+    chunks is as fast as the first.
+
+    Arguments:
+        column {string} -- ends_at or trial_ends_at.
+        start {pendulum.DateTime} -- The start of the range, included.
+        end {pendulum.DateTime} -- The end of the range, excluded.
+
+    Keyword Arguments:
+        chunk_size {int} -- How many rows are read per query. (default: {1000})
+        partition {tuple|None} -- A (worker, workers) pair to only read the subscriptions whose
+                                  identifier modulo workers is worker - 1. (default: {None})
+
+    Returns:
+        iterator -- (row, date) pairs where the row is a dictionary and the date a pendulum.DateTime.
+    """
+    from billing.models import Subscription
+
+    model = Subscription()
+    connection = Subscription.resolve_connection()
+    table = model.get_table()
+    after = None
+
+    while True:
+        query = (
+            connection.table(table)
+            .select("id", "user_id", "plan", column)
+            .where(column, ">=", model.from_datetime(start))
+            .where(column, "<", model.from_datetime(end))
+        )
+        if partition is not None:
+            # Unlike identifier ranges the split does not depend on the rows stored when a worker runs
+            worker, workers = partition
+            query = query.where_raw("id % ? = ?", [workers, worker - 1])
+        if after is not None:
+            # Rows are read from the last date on, skipping the ids already read at that date
+            query = query.where(column, ">=", after[0]).where(
+                query.new_query().where(column, ">", after[0]).or_where("id", ">", after[1])
+            )
+
+        rows = query.order_by(column).order_by("id").limit(chunk_size).get()
+
+        for row in rows:
+            yield dict(row), model.as_datetime(row[column])
+
+        if len(rows) < chunk_size:
+            return
+
+        after = (rows[-1][column], rows[-1]["id"])
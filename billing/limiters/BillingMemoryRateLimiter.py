@@ -0,0 +1,36 @@
+""" The Process Billing Rate Limiter """
+
+import threading
+import time
+
+from billing.contracts import BillingRateLimiterContract
+
+
+class BillingMemoryRateLimiter(BillingRateLimiterContract):
+    """Token bucket shared by the threads of one process."""
+
+    def __init__(self, rate=25, burst=None, clock=time.monotonic):
+        """
+        Keyword Arguments:
+            rate {int|float} -- The tokens added to a bucket per second. (default: {25})
+            burst {int|None} -- The most tokens a bucket holds. If None it is the rate. (default: {None})
+            clock {callable} -- Returns the current time in seconds. (default: {time.monotonic})
+        """
+        self.rate = rate
+        self.burst = burst or rate
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key, tokens=1):
+        with self._lock:
+            now = self.clock()
+            available, updated_at = self._buckets.get(key, (self.burst, now))
+            available = (
+                min(self.burst, available + (now - updated_at) * self.rate) - tokens
+            )
+            self._buckets[key] = (available, now)
+
+        if available >= 0:
+            return 0
+        return -available / self.rate
@@ -0,0 +1,57 @@
+""" The Shared Billing Rate Limiter """
+
+from billing.contracts import BillingRateLimiterContract
+
+# Refills and takes from the bucket atomically using the Redis clock so every host agrees
+RESERVE = """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local available = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+available = math.min(burst, available + (now - updated_at) * rate) - tonumber(ARGV[3])
+redis.call("HMSET", KEYS[1], "tokens", available, "updated_at", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+if available >= 0 then
+    return "0"
+end
+return tostring(-available / rate)
+"""
+
+
+class BillingRedisRateLimiter(BillingRateLimiterContract):
+    """Token bucket shared between processes and hosts through Redis."""
+
+    def __init__(self, connection=None, rate=25, burst=None, prefix="billing", **options):
+        """
+        Keyword Arguments:
+            connection {redis.Redis|None} -- An existing Redis client. If None one is created from the options. (default: {None})
+            rate {int|float} -- The tokens added to a bucket per second. (default: {25})
+            burst {int|None} -- The most tokens a bucket holds. If None it is the rate. (default: {None})
+            prefix {string} -- Prefix for every key so the limiter can share a database. (default: {"billing"})
+        """
+        if connection is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError(
+                    "The redis billing rate limiter requires the redis package. Run 'pip install redis'."
+                )
+
+            connection = redis.Redis(**options)
+
+        self.connection = connection
+        self.rate = rate
+        self.burst = burst or rate
+        self.prefix = prefix
+        self._reserve = connection.register_script(RESERVE)
+
+    def reserve(self, key, tokens=1):
+        wait = self._reserve(
+            keys=["{0}:rate_limit:{1}".format(self.prefix, key)],
+            args=[self.rate, self.burst, tokens],
+        )
+        return float(wait)
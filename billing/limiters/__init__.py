@@ -0,0 +1,2 @@
+from .BillingMemoryRateLimiter import BillingMemoryRateLimiter
+from .BillingRedisRateLimiter import BillingRedisRateLimiter
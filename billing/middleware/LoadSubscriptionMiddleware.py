@@ -0,0 +1,44 @@
+""" Loads The Subscription Of The Authenticated User """
+
+from masonite.request import Request
+
+from billing.factories import BillingFactory
+from billing.models.Subscription import NO_SUBSCRIPTION
+
+
+class LoadSubscriptionMiddleware:
+    """Loads the subscription of the authenticated user once per request.
+
+    The subscription is kept on the user, so controllers, templates and the route guards
+    check it without more queries, and its state is set on request.subscription. When
+    entitlement tokens are configured a valid token cookie replaces the query.
+
+    Use it on the routes that check subscriptions as billing, after auth and before the
+    subscribed and on_trial guards, like .middleware('auth', 'billing', 'subscribed').
+    """
+
+    cookie = "billing_entitlement"
+
+    def __init__(self, request: Request):
+        self.request = request
+
+    def before(self):
+        # The request object is reused so clear the state of the previous request
+        self.request.subscription = NO_SUBSCRIPTION
+
+        user = self.request.user()
+        if user is None or not hasattr(user, "preload_subscription"):
+            return
+
+        token = user.preload_subscription(
+            self.request.get_cookie(self.cookie, decrypt=False)
+        )
+        if token:
+            self.request.cookie(
+                self.cookie,
+                token,
+                encrypt=False,
+                expires="{0} seconds".format(BillingFactory.entitlements().ttl),
+            )
+
+        self.request.subscription = user.subscription_state()
@@ -0,0 +1,13 @@
+""" Route Guard For Users On Trial """
+
+from .SubscribedMiddleware import SubscribedMiddleware
+
+
+class OnTrialMiddleware(SubscribedMiddleware):
+    """Lets a request through when the user is on the trial of one of the plans.
+
+    Use it on a route as on_trial or on_trial:plan-one,plan-two.
+    """
+
+    def allows(self, user, plan):
+        return user.on_trial(plan)
@@ -0,0 +1,39 @@
+""" Route Guard For Subscribed Users """
+
+from masonite.request import Request
+
+
+class SubscribedMiddleware:
+    """Lets a request through when the user is subscribed to one of the plans.
+
+    Use it on a route as subscribed or subscribed:plan-one,plan-two. Other users are
+    redirected to redirect_url or answered with 402 Payment Required when it is None.
+    """
+
+    redirect_url = None
+
+    def __init__(self, request: Request):
+        self.request = request
+
+    def before(self, *plans):
+        user = self.request.user()
+
+        if user is not None and any(self.allows(user, plan) for plan in plans or [None]):
+            return
+
+        if self.redirect_url:
+            self.request.redirect(self.redirect_url)
+        else:
+            self.request.status(402)
+
+    def allows(self, user, plan):
+        """Whether the user may see the route.
+
+        Arguments:
+            user {billing.models.Billable} -- The authenticated user.
+            plan {string|None} -- A plan given to the middleware or None for any plan.
+
+        Returns:
+            bool
+        """
+        return user.is_subscribed(plan)
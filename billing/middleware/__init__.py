@@ -0,0 +1,3 @@
+from .LoadSubscriptionMiddleware import LoadSubscriptionMiddleware
+from .SubscribedMiddleware import SubscribedMiddleware
+from .OnTrialMiddleware import OnTrialMiddleware
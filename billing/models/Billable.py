@@ -1,23 +1,39 @@
 """ The Billing Model """
 
+import asyncio
+import functools
+import types
+
 import pendulum
 from billing.factories import BillingFactory
+from billing.instrumentation import billable_method, timed
 
 
 from .Subscription import Subscription
+from .SubscriptionSet import SubscriptionSet
+
+
+class LazyProcessor:
+    """Resolves the configured processor the first time a user needs it."""
 
-try:
-    from config import billing
+    def __init__(self, resolve):
+        self.resolve = resolve
 
-    PROCESSOR = BillingFactory.make(billing.DRIVER)
-except ImportError:
-    raise ImportError("No configuration file found")
+    def __get__(self, instance, owner):
+        return self.resolve()
 
 
 class Billable:
 
-    _processor = PROCESSOR
+    _processor = LazyProcessor(BillingFactory.processor)
+    _async_processor = LazyProcessor(BillingFactory.async_processor)
+    _entitlements = LazyProcessor(BillingFactory.entitlements)
 
+    _subscriptions = None
+    _subscription_loaded = False
+    _entitlement = None
+
+    @billable_method
     def subscribe(self, processor_plan, token):
         """Subscribe user to a billing plan.
 
@@ -43,11 +59,34 @@ class Billable:
             processor_plan, token, customer=customer_id
         )
 
-        self.plan_id = subscription["id"]
-        self.save()
+        self._record_subscription(processor_plan, subscription)
+
+        return True
+
+    async def asubscribe(self, processor_plan, token):
+        """Subscribe user to a billing plan without blocking the event loop.
+
+        Arguments:
+            processor_plan {string} -- The plan inside the processor (Stripe, Braintree etc)
+            token {string} -- The authentication token from a form submission
 
-        # TODO add to subscription model
-        self._save_subscription_model(processor_plan, subscription)
+        Returns:
+            bool
+        """
+        # One at a time since both read and write this model instance from executor threads
+        if not self.customer_id:
+            await self.acreate_customer("Customer {0}".format(self.email), token)
+
+        subscribed = await self.ais_subscribed(processor_plan)
+
+        if subscribed:
+            return True
+
+        subscription = await self._async_processor.subscribe(
+            processor_plan, token, customer=self.customer_id
+        )
+
+        await self._run_async(self._record_subscription, processor_plan, subscription)
 
         return True
 
@@ -61,10 +100,9 @@ class Billable:
                 - float - deduct the percentage amount
 
         Returns:
-            self
+            billing.models.BillableBuilder -- The user with the coupon applied to the next calls made through it.
         """
-        self._processor.coupon(coupon_id)
-        return self
+        return BillableBuilder(self).coupon(coupon_id)
 
     def trial(self, days=False):
         """Put user on trial.
@@ -73,79 +111,108 @@ class Billable:
             days {bool} -- Specify the days the user should be put on trial. (default: {False})
 
         Returns:
-            self
+            billing.models.BillableBuilder -- The user with the trial applied to the next calls made through it.
         """
-        self._processor.trial(days)
-        return self
+        return BillableBuilder(self).trial(days)
+
+    def idempotent(self, token):
+        """Makes the processor calls of the user safe to retry.
+
+        Calls repeated with the same token, like after a timeout, are run once by the processor.
+
+        Arguments:
+            token {string} -- Identifies the operation like a form submission or a job.
 
+        Returns:
+            billing.models.BillableBuilder -- The user with the token applied to the next calls made through it.
+        """
+        return BillableBuilder(self).idempotent(token)
+
+    @billable_method
     def on_trial(self, plan_id=None):
         """Check if a user is on trial.
 
+        Keyword Arguments:
+            plan_id {string} -- The plan identifier. If None any trial counts. (default: {None})
+
+        Returns:
+            bool
+        """
+        return self._checked_subscriptions().is_on_trial(plan_id)
+
+    async def aon_trial(self, plan_id=None):
+        """Check if a user is on trial without blocking the event loop.
+
         Keyword Arguments:
             plan_id {string} -- The plan identifier (default: {None})
 
         Returns:
             bool
         """
-        subscription = self._get_subscription()
+        await self._run_async(self._get_subscription)
+        return self.on_trial(plan_id)
 
-        if not subscription:
-            return False
+    @billable_method
+    def cancel(self, now=False, plan=None):
+        """Cancel a subscription.
 
-        if not plan_id:
-            if subscription.trial_ends_at and subscription.trial_ends_at.is_future():
-                return True
+        Keyword Arguments:
+            now {bool} -- Whether the user should be cancelled now or when the pay period ends. (default: {False})
+            plan {string|None} -- The plan of the subscription to cancel. If None the primary subscription is cancelled. (default: {None})
 
-        if (
-            subscription.plan == plan_id
-            and subscription.trial_ends_at
-            and subscription.trial_ends_at.is_future()
-        ):
-            return True
+        Returns:
+            bool -- Whether or not the user has been successfully cancelled.
+        """
+        subscription_id = self._subscription_id(plan)
+        if not subscription_id:
+            return False
 
+        cancel = self._processor.cancel(subscription_id, now=now)
+        self.forget_subscription()
+
+        if cancel:
+            return self._record_cancel(cancel, now, self._get_subscriptions().get(plan))
         return False
 
-    def cancel(self, now=False):
-        """Cancel a subscription.
+    async def acancel(self, now=False, plan=None):
+        """Cancel a subscription without blocking the event loop.
 
         Keyword Arguments:
             now {bool} -- Whether the user should be cancelled now or when the pay period ends. (default: {False})
+            plan {string|None} -- The plan of the subscription to cancel. If None the primary subscription is cancelled. (default: {None})
 
         Returns:
             bool -- Whether or not the user has been successfully cancelled.
         """
-        cancel = self._processor.cancel(self.plan_id, now=now)
+        subscription_id = await self._run_async(self._subscription_id, plan)
+        if not subscription_id:
+            return False
+
+        # A token issued before the change must not answer the checks after it
+        self.forget_subscription()
+
+        # The local subscriptions are loaded while the processor cancels
+        cancel, subscriptions = await asyncio.gather(
+            self._async_processor.cancel(subscription_id, now=now),
+            self._run_async(self._get_subscriptions, True),
+        )
 
         if cancel:
-            if now:
-                # delete it now
-                subscription = self._get_subscription()
-                subscription.ends_at = pendulum.now().to_datetime_string()
-                subscription.trial_ends_at = None
-                subscription.save()
-                return True
-            else:
-                # update the ended at date
-                subscription = self._get_subscription()
-                subscription.ends_at = pendulum.from_timestamp(
-                    cancel["current_period_end"]
-                ).to_datetime_string()
-                subscription.save()
-                return True
+            return await self._run_async(
+                self._record_cancel, cancel, now, subscriptions.get(plan)
+            )
         return False
 
+    @billable_method
     def plan(self):
         """Gets the users plan name.
 
         Returns:
             string|None -- Returns the plan name or None of the plan does not exist.
         """
-        subscription = self._get_subscription()
-        if subscription:
-            return subscription.plan_name
-
-        return None
+        return self._checked_subscriptions().plan_name
 
+    @billable_method
     def create_customer(self, description, token):
         """Creates a new customer.
 
@@ -161,6 +228,21 @@ class Billable:
         self.save()
         return self.customer_id
 
+    async def acreate_customer(self, description, token):
+        """Creates a new customer without blocking the event loop.
+
+        Arguments:
+            description {string} -- Description of the customer like email or ID.
+            token {string} -- The token gotten from a form submission. This is processor specific.
+
+        Returns:
+            string -- Returns the customer id.
+        """
+        customer = await self._async_processor._create_customer(description, token)
+        self.customer_id = customer["id"]
+        await self._run_async(self.save)
+        return self.customer_id
+
     def quantity(self, quantity):
         """Set a quantity amount for a subscription.
 
@@ -173,6 +255,7 @@ class Billable:
         self._quantity = quantity
         return self
 
+    @billable_method
     def charge(self, amount, **kwargs):
         """Charge a one time charge for a user.
 
@@ -182,22 +265,47 @@ class Billable:
         Returns:
             processor.charge -- The processor charge method.
         """
-        if not kwargs.get("token"):
-            kwargs.update({"customer": self.customer_id})
-        else:
-            kwargs.update({"source": kwargs.get("token")})
-            del kwargs["token"]
+        return self._processor.charge(amount, **self._charge_arguments(kwargs))
 
-        if not kwargs.get("description"):
-            kwargs.update({"description": "Charge For {0}".format(self.email)})
+    async def acharge(self, amount, **kwargs):
+        """Charge a one time charge for a user without blocking the event loop.
+
+        Arguments:
+            amount {int} -- The integer in cents.
+
+        Returns:
+            processor.charge -- The processor charge method.
+        """
+        return await self._async_processor.charge(
+            amount, **self._charge_arguments(kwargs)
+        )
+
+    @classmethod
+    def charge_many(cls, charges, concurrency=8, key=None):
+        """Charges many users one time amounts at the same time.
+
+        Arguments:
+            charges {iterable} -- (user, amount, kwargs) tuples. kwargs are the charge arguments or None.
+
+        Keyword Arguments:
+            concurrency {int} -- How many charges run at the same time. (default: {8})
+            key {string|None} -- The batch idempotency key. Run a batch again with the same key
+                                 to retry it without charging anyone twice. (default: {None})
 
-        return self._processor.charge(amount, **kwargs)
+        Returns:
+            billing.drivers.ChargeBatch -- Yields a ChargeResult per charge as it finishes,
+                                           with the (user, amount, kwargs) tuple as its item.
+        """
+        return cls._processor.charge_batch(
+            charges, concurrency=concurrency, prepare=cls._prepare_charge, key=key
+        )
 
     def on_grace_period(self):
         """Check if a user is on a grace period
         """
         pass
 
+    @billable_method
     def is_subscribed(self, plan_name=None):
         """Check if a user is subscribed.
 
@@ -208,23 +316,23 @@ class Billable:
         Returns:
             bool -- Whether the user is subscribed or not.
         """
-        # If the subscription exists
-        if self._get_subscription():
-            # If the subscription does not expire OR the subscription ends at a time in the future
-            if not self._get_subscription().ends_at or (
-                self._get_subscription().ends_at
-                and self._get_subscription().ends_at.is_future()
-            ):
-                # If the plan name equals the plan name specified
-                if plan_name and self._get_subscription().plan == plan_name:
-                    return True
-
-                # if the plan name was left out
-                if not plan_name:
-                    return True
+        # If a subscription does not expire OR ends at a time in the future
+        return self._checked_subscriptions().is_active(plan_name)
 
-        return False
+    async def ais_subscribed(self, plan_name=None):
+        """Check if a user is subscribed without blocking the event loop.
+
+        Keyword Arguments:
+            plan_name {string} -- The plan name or None. If it is None this will check if the user is subscribed.
+                                    If a string exists it will check if a user is subscribed to that plan. (default: {None})
+
+        Returns:
+            bool -- Whether the user is subscribed or not.
+        """
+        await self._run_async(self._get_subscription)
+        return self.is_subscribed(plan_name)
 
+    @billable_method
     def was_subscribed(self, plan=None):
         """Checks if the user was subscribed at one point but is no longer
 
@@ -235,75 +343,90 @@ class Billable:
         Returns:
             bool -- Whether the user was subscribed at one point but is not currently subscribed.
         """
-        subscription = self._get_subscription()
+        return self._checked_subscriptions().has_ended(plan)
 
-        if subscription and subscription.ends_at and subscription.ends_at.is_past():
-            if plan and subscription.plan == plan:
-                return True
-            elif not plan:
-                return True
+    @billable_method
+    def is_canceled(self, plan=None):
+        """Check if the user was subscribed but cancelled their subscription. This is useful if the user is on a grace period.
 
-        return False
+        Keyword Arguments:
+            plan {string|None} -- The plan of the subscription. If None the primary subscription is checked. (default: {None})
 
-    def is_canceled(self):
-        """Check if the user was subscribed but cancelled their subscription. This is useful if the user is on a grace period.
+        Returns:
+            bool
+        """
+        return self._checked_subscriptions().is_canceled(plan)
+
+    async def ais_canceled(self, plan=None):
+        """Check if the user cancelled their subscription without blocking the event loop.
+
+        Keyword Arguments:
+            plan {string|None} -- The plan of the subscription. If None the primary subscription is checked. (default: {None})
 
         Returns:
             bool
         """
-        subscription = self._get_subscription()
+        await self._run_async(self._get_subscription)
+        return self.is_canceled(plan)
 
-        if subscription and subscription.ends_at and subscription.ends_at.is_future():
-            return True
+    @billable_method
+    def swap(self, new_plan, plan=None, **kwargs):
+        """Change the current plan to a new plan.
 
+        Arguments:
+            new_plan {string} -- The new plan to swap to.
+
+        Keyword Arguments:
+            plan {string|None} -- The plan of the subscription to change. If None the primary subscription is changed. (default: {None})
+
+        Returns:
+            bool
+        """
+        # The stored subscription item lets the processor swap in a single call
+        subscription = self._get_subscriptions(True).get(plan)
         if not subscription:
             return False
 
-        if (
-            not subscription.trial_ends_at
-            and subscription.ends_at
-            and subscription.ends_at.is_future()
-        ):
-            return True
+        swapped_subscription = self._processor.swap(
+            subscription.plan_id, new_plan, item_id=subscription.item_id, **kwargs
+        )
+        self.forget_subscription()
 
-        return False
+        return self._record_swap(swapped_subscription, subscription)
 
-    def swap(self, new_plan, **kwargs):
-        """Change the current plan to a new plan.
+    async def aswap(self, new_plan, plan=None, **kwargs):
+        """Change the current plan to a new plan without blocking the event loop.
 
         Arguments:
             new_plan {string} -- The new plan to swap to.
 
+        Keyword Arguments:
+            plan {string|None} -- The plan of the subscription to change. If None the primary subscription is changed. (default: {None})
+
         Returns:
             bool
         """
-        trial_ends_at = None
-        ends_at = None
-        swapped_subscription = self._processor.swap(self.plan_id, new_plan, **kwargs)
-
-        # if swapped_subscription['plan']['trial_end']:
-        #     trial_ends_at = pendulum.from_timestamp(
-        #         swapped_subscription['plan']['trial_end'])
+        subscriptions = await self._run_async(self._get_subscriptions, True)
+        subscription = subscriptions.get(plan)
+        if not subscription:
+            return False
 
-        # if swapped_subscription['current_period_end']:
-        #     ends_at = pendulum.from_timestamp(
-        #         swapped_subscription['current_period_end'])
+        swapped_subscription = await self._async_processor.swap(
+            subscription.plan_id, new_plan, item_id=subscription.item_id, **kwargs
+        )
+        self.forget_subscription()
 
-        subscription = self._get_subscription()
-        subscription.plan = swapped_subscription["plan"]["id"]
-        subscription.plan_name = swapped_subscription["plan"]["id"]
-        subscription.trial_ends_at = trial_ends_at
-        subscription.ends_at = ends_at
-        return subscription.save()
+        return await self._run_async(
+            self._record_swap, swapped_subscription, subscription
+        )
 
     def skip_trial(self):
         """Skip any trial that the plan may have and charge the user.
 
         Returns:
-            self
+            billing.models.BillableBuilder -- The user without a trial on the next calls made through it.
         """
-        self._processor.skip_trial()
-        return self
+        return BillableBuilder(self).skip_trial()
 
     def prorate(self, bool):
         """
@@ -312,18 +435,55 @@ class Billable:
         """
         pass
 
-    def resume(self):
+    @billable_method
+    def resume(self, plan=None):
         """Resume a cancelled subscription
 
+        Keyword Arguments:
+            plan {string|None} -- The plan of the subscription to resume. If None the primary subscription is resumed. (default: {None})
+
         Returns:
             processor.resume -- Returns the processor resume method.
         """
-        plan = self._processor.resume(self.plan_id)
-        subscription = self._get_subscription()
+        subscription_id = self._subscription_id(plan)
+        if not subscription_id:
+            return False
+
+        resumed = self._processor.resume(subscription_id)
+        self.forget_subscription()
+        subscription = self._get_subscriptions().get(plan)
         subscription.ends_at = None
-        subscription.save()
-        return plan
+        with timed("query", "subscriptions.update"):
+            subscription.save()
+        return resumed
+
+    async def aresume(self, plan=None):
+        """Resume a cancelled subscription without blocking the event loop.
+
+        Keyword Arguments:
+            plan {string|None} -- The plan of the subscription to resume. If None the primary subscription is resumed. (default: {None})
+
+        Returns:
+            processor.resume -- Returns the processor resume method.
+        """
+        subscription_id = await self._run_async(self._subscription_id, plan)
+        if not subscription_id:
+            return False
+
+        # A token issued before the change must not answer the checks after it
+        self.forget_subscription()
 
+        # The local subscriptions are loaded while the processor resumes
+        resumed, subscriptions = await asyncio.gather(
+            self._async_processor.resume(subscription_id),
+            self._run_async(self._get_subscriptions, True),
+        )
+        subscription = subscriptions.get(plan)
+        subscription.ends_at = None
+        await self._run_async(subscription.save)
+        return resumed
+
+    @billable_method
     def card(self, token):
         """Change the card or token used to charge the user.
 
@@ -335,13 +495,394 @@ class Billable:
         """
         return self._processor.card(self.customer_id, token)
 
-    def _get_subscription(self):
-        """Gets the subscription from the subcriptions table.
+    async def acard(self, token):
+        """Change the card or token used to charge the user without blocking the event loop.
+
+        Arguments:
+            token {string} -- The processor authentication token. Usually submitted from a form.
+
+        Returns:
+            processor.card -- Returns the processor card method.
+        """
+        return await self._async_processor.card(self.customer_id, token)
+
+    @classmethod
+    @billable_method
+    def subscription_map(cls, user_ids, chunk_size=500):
+        """Gets the subscription state of many users with two queries per chunk of users.
+
+        The primary plan of every user is read too so the states follow the same rules as
+        the instance methods.
+
+        Arguments:
+            user_ids {list} -- The user identifiers to look up.
+
+        Keyword Arguments:
+            chunk_size {int} -- How many users are looked up per query. (default: {500})
+
+        Returns:
+            dict -- The user identifiers mapped to a billing.models.SubscriptionState.
+        """
+        user_ids = list(user_ids)
+        subscriptions = cls._load_subscriptions(user_ids, chunk_size)
+
+        primary_ids = {}
+        for index in range(0, len(user_ids), chunk_size):
+            with timed("query", "users.select_many"):
+                users = cls.where_in("id", user_ids[index:index + chunk_size]).get(
+                    ["id", "plan_id"]
+                )
+            for user in users:
+                primary_ids[user.id] = user.plan_id
+
+        return {
+            user_id: SubscriptionSet.of(
+                subscriptions.get(user_id, ()), primary_ids.get(user_id)
+            ).state()
+            for user_id in user_ids
+        }
+
+    @classmethod
+    @billable_method
+    def subscribed_many(cls, users, plan=None, chunk_size=500):
+        """Checks if many users are subscribed with one query per chunk of users.
+
+        The loaded subscriptions are kept on each user so further checks on them do not query again.
+
+        Arguments:
+            users {list} -- The billable users to check.
+
+        Keyword Arguments:
+            plan {string|None} -- The plan the users should be subscribed to. (default: {None})
+            chunk_size {int} -- How many users are looked up per query. (default: {500})
+
+        Returns:
+            dict -- The user identifiers mapped to whether the user is subscribed.
+        """
+        subscriptions = cls._load_subscriptions([user.id for user in users], chunk_size)
+
+        subscribed = {}
+        for user in users:
+            user._load_subscription(
+                SubscriptionSet.of(subscriptions.get(user.id, ()), user._primary_id())
+            )
+            subscribed[user.id] = user.is_subscribed(plan)
+
+        return subscribed
+
+    def forget_subscription(self):
+        """Clears the subscriptions loaded for this user so the next check reads them again.
+
+        Returns:
+            self
+        """
+        self._remember(_subscriptions=None, _subscription_loaded=False, _entitlement=None)
+        return self
+
+    def entitlement_token(self):
+        """Signs a snapshot of the subscriptions to keep in the session or a cookie.
+
+        Raises:
+            ValueError -- Raised when no entitlement secret is configured.
+
+        Returns:
+            string -- The token.
+        """
+        return self._entitlements.issue(self.id, self._get_subscriptions())
+
+    def use_entitlement(self, token):
+        """Answers the subscription checks of this user from a token instead of the database.
+
+        Arguments:
+            token {string|None} -- A token from entitlement_token.
+
+        Returns:
+            bool -- Whether the token was accepted. If not issue a new one with entitlement_token.
+        """
+        entitlement = self._entitlements.verify(token, self.id)
+        self._remember(_entitlement=entitlement)
+
+        return entitlement is not None
+
+    def _get_subscription(self, refresh=False):
+        """Gets the primary subscription from the subcriptions table.
+
+        Keyword Arguments:
+            refresh {bool} -- Whether to skip the loaded subscriptions and query them again. (default: {False})
 
         Returns:
             billing.models.Subscription - The billing subscription model.
         """
-        return Subscription.where("user_id", self.id).first()
+        return self._get_subscriptions(refresh).primary
+
+    def _get_subscriptions(self, refresh=False):
+        """Gets every subscription of the user from the subcriptions table.
+
+        The rows are loaded with one query per user instance and reused by every check
+        until a subscription changes or forget_subscription is called.
+
+        Keyword Arguments:
+            refresh {bool} -- Whether to skip the loaded subscriptions and query them again. (default: {False})
+
+        Returns:
+            billing.models.SubscriptionSet
+        """
+        if refresh or not self._subscription_loaded:
+            with timed("query", "subscriptions.select"):
+                rows = Subscription.where("user_id", self.id).order_by("id").get()
+            self._load_subscription(SubscriptionSet.of(rows, self._primary_id()))
+
+        return self._subscriptions
+
+    def preload_subscription(self, token=None):
+        """Loads what the subscription checks read so the checks that follow need no queries.
+
+        A valid entitlement token is used instead of the database. Otherwise the subscription
+        is read with one query.
+
+        Keyword Arguments:
+            token {string|None} -- An entitlement token kept in the session or a cookie. (default: {None})
+
+        Returns:
+            string|None -- A new entitlement token to keep when the given one was refused
+                           and tokens are configured, else None.
+        """
+        if token and self.use_entitlement(token):
+            return None
+
+        subscriptions = self._get_subscriptions()
+        if self._entitlements.secret:
+            return self._entitlements.issue(self.id, subscriptions)
+
+        return None
+
+    def subscription_state(self):
+        """Gets a compact snapshot of the subscriptions, like for a template.
+
+        Returns:
+            billing.models.SubscriptionState
+        """
+        return self._checked_subscriptions().state()
+
+    def _checked_subscriptions(self):
+        """Gets what the subscription checks read, the entitlement or else the subscriptions.
+
+        Returns:
+            billing.models.SubscriptionSet
+        """
+        entitlement = self._entitlement
+        if entitlement is not None and not entitlement.expired():
+            return SubscriptionSet(entitlement.subscriptions)
+
+        return self._get_subscriptions()
+
+    def _subscription_id(self, plan=None):
+        """Gets the processor identifier of a subscription.
+
+        Keyword Arguments:
+            plan {string|None} -- The plan of the subscription. If None the primary subscription is used. (default: {None})
+
+        Returns:
+            string|None
+        """
+        if plan is None:
+            return self._primary_id()
+
+        subscription = self._get_subscriptions().get(plan)
+        return subscription.plan_id if subscription else None
+
+    def _load_subscription(self, subscriptions):
+        """Keeps the subscriptions on this user instance.
+
+        Arguments:
+            subscriptions {billing.models.SubscriptionSet} -- The billing subscriptions.
+        """
+        self._remember(_subscriptions=subscriptions, _subscription_loaded=True)
+
+    def _remember(self, **values):
+        """Sets what the user keeps between checks.
+
+        The attributes are set on the instance itself so models that store unknown
+        attributes as columns do not save them. A BillableBuilder sets them on its user
+        so checks made on the user afterwards see them.
+        """
+        billable = vars(self).get("_billable", self)
+        for name, value in values.items():
+            object.__setattr__(billable, name, value)
+
+    @staticmethod
+    def _load_subscriptions(user_ids, chunk_size=500):
+        """Loads the subscriptions of many users using one where in query per chunk.
+
+        Arguments:
+            user_ids {list} -- The user identifiers to look up.
+
+        Keyword Arguments:
+            chunk_size {int} -- How many users are looked up per query. (default: {500})
+
+        Returns:
+            dict -- The user identifiers mapped to their billing.models.Subscription rows, oldest first.
+        """
+        user_ids = list(user_ids)
+        subscriptions = {}
+
+        for index in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[index:index + chunk_size]
+            # Rows are ordered like _get_subscriptions orders them
+            with timed("query", "subscriptions.select_many"):
+                rows = Subscription.where_in("user_id", chunk).order_by("id").get()
+            for subscription in rows:
+                subscriptions.setdefault(subscription.user_id, []).append(subscription)
+
+        return subscriptions
+
+    def _run_async(self, method, *args):
+        """Runs a blocking method like a database query on the default executor.
+
+        Arguments:
+            method {callable} -- The blocking method.
+
+        Returns:
+            asyncio.Future
+        """
+        return asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(method, *args)
+        )
+
+    def _charge_arguments(self, kwargs):
+        """Fills in the customer, source and description of a charge.
+
+        Arguments:
+            kwargs {dict} -- The charge arguments.
+
+        Returns:
+            dict
+        """
+        if not kwargs.get("token"):
+            kwargs.update({"customer": self.customer_id})
+        else:
+            kwargs.update({"source": kwargs.get("token")})
+            del kwargs["token"]
+
+        if not kwargs.get("description"):
+            kwargs.update({"description": "Charge For {0}".format(self.email)})
+
+        return kwargs
+
+    @staticmethod
+    def _prepare_charge(item):
+        """Turns a (user, amount, kwargs) tuple into the processor charge arguments.
+
+        Arguments:
+            item {tuple} -- The user, the amount in cents and the charge arguments or None.
+
+        Returns:
+            tuple -- The amount and the charge arguments.
+        """
+        user, amount, kwargs = item
+        return amount, user._charge_arguments(dict(kwargs or {}))
+
+    def _record_subscription(self, processor_plan, subscription_object):
+        """Saves a new processor subscription to the user and the subscription model.
+
+        Arguments:
+            processor_plan {string} -- The plan name.
+            subscription_object {object} -- The subscription returned by the processor.
+
+        Returns:
+            billing.models.Subscription -- The billing subscription model.
+        """
+        self._record_primary(subscription_object["id"])
+
+        self.forget_subscription()
+
+        return self._save_subscription_model(processor_plan, subscription_object)
+
+    def _record_primary(self, subscription_id):
+        """Points the user at a new subscription unless the primary one is still active.
+
+        A subscription to another plan next to an active primary subscription is an add-on
+        and leaves the plan_id of the user alone.
+
+        Arguments:
+            subscription_id {string} -- The processor identifier of the subscription.
+
+        Returns:
+            bool -- Whether the subscription became the primary one.
+        """
+        primary_id = self._primary_id()
+        if primary_id and primary_id != subscription_id:
+            primary = self._get_subscription()
+            if primary and primary.plan_id == primary_id and primary.is_active():
+                return False
+
+        if primary_id != subscription_id:
+            self.plan_id = subscription_id
+            self.save()
+
+        return True
+
+    def _primary_id(self):
+        """Gets the processor identifier of the primary subscription.
+
+        Returns:
+            string|None -- None when the user never subscribed.
+        """
+        # Users created without a plan_id have no such attribute until they are read again
+        return getattr(self, "plan_id", None)
+
+    def _record_cancel(self, cancel, now, subscription):
+        """Saves the cancellation to the subscription model.
+
+        Arguments:
+            cancel {object} -- The subscription returned by the processor.
+            now {bool} -- Whether the user was cancelled now or when the pay period ends.
+            subscription {billing.models.Subscription} -- The billing subscription model.
+
+        Returns:
+            bool
+        """
+        if now:
+            # delete it now
+            subscription.ends_at = pendulum.now()
+            subscription.trial_ends_at = None
+        else:
+            # update the ended at date
+            subscription.ends_at = pendulum.from_timestamp(cancel["current_period_end"])
+
+        subscription.fill(self._processor.subscription_item(cancel))
+        with timed("query", "subscriptions.update"):
+            subscription.save()
+        return True
+
+    def _record_swap(self, swapped_subscription, subscription):
+        """Saves the swapped plan to the subscription model.
+
+        Arguments:
+            swapped_subscription {object} -- The subscription returned by the processor.
+            subscription {billing.models.Subscription} -- The billing subscription model.
+
+        Returns:
+            bool
+        """
+        trial_ends_at = None
+        ends_at = None
+
+        # if swapped_subscription['plan']['trial_end']:
+        #     trial_ends_at = pendulum.from_timestamp(
+        #         swapped_subscription['plan']['trial_end'])
+
+        # if swapped_subscription['current_period_end']:
+        #     ends_at = pendulum.from_timestamp(
+        #         swapped_subscription['current_period_end'])
+
+        subscription.plan = swapped_subscription["plan"]["id"]
+        subscription.plan_name = swapped_subscription["plan"]["id"]
+        subscription.trial_ends_at = trial_ends_at
+        subscription.ends_at = ends_at
+        subscription.fill(self._processor.subscription_item(swapped_subscription))
+        with timed("query", "subscriptions.update"):
+            return subscription.save()
 
     def _save_subscription_model(self, processor_plan, subscription_object):
         """Saves the plan to the subscription model
@@ -364,24 +905,90 @@ class Billable:
         if subscription_object["ended_at"]:
             ends_at = pendulum.from_timestamp(subscription_object["ended_at"])
 
-        subscription = Subscription.where("user_id", self.id).first()
-        # product = self._processor.resubscription_object['plan']['product']
+        attributes = dict(
+            self._processor.subscription_item(subscription_object),
+            plan=processor_plan,
+            plan_id=subscription_object["id"],
+            plan_name=self._processor.plan_name(subscription_object),
+            trial_ends_at=trial_ends_at,
+            ends_at=ends_at,
+        )
+
+        # A subscription to a plan the user already had reuses its row
+        subscriptions = self._get_subscriptions()
+        subscription = subscriptions.get(processor_plan)
         if subscription:
-            subscription.plan = processor_plan
-            subscription.plan_id = subscription_object["id"]
-            subscription.plan_name = self._processor.plan(subscription_object["id"])
-            subscription.trial_ends_at = trial_ends_at
-            subscription.ends_at = ends_at
-            subscription.save()
+            subscription.fill(attributes)
+            with timed("query", "subscriptions.update"):
+                subscription.save()
         else:
             # Create a new plan
-            subscription = Subscription.create(
-                user_id=self.id,
-                plan=processor_plan,
-                plan_id=subscription_object["id"],
-                plan_name=self._processor.plan(subscription_object["id"]),
-                trial_ends_at=trial_ends_at,
-                ends_at=ends_at,
-            )
+            with timed("query", "subscriptions.insert"):
+                subscription = Subscription.store(dict(attributes, user_id=self.id))
+
+        self._load_subscription(subscriptions.adding(subscription, self._primary_id()))
 
         return subscription
+
+
+class BillableBuilder:
+    """A billable user with processor arguments like coupons and trials.
+
+    The arguments only apply to the calls made through the builder so users billed
+    from other threads or tasks never share them. Every method returns a new builder.
+    """
+
+    def __init__(self, billable, processor=None, async_processor=None):
+        object.__setattr__(self, "_billable", billable)
+        object.__setattr__(self, "_processor", processor or billable._processor)
+        object.__setattr__(
+            self, "_async_processor", async_processor or billable._async_processor
+        )
+
+    def coupon(self, coupon_id):
+        """See billing.models.Billable.coupon"""
+        return BillableBuilder(
+            self._billable,
+            self._processor.coupon(coupon_id),
+            self._async_processor.coupon(coupon_id),
+        )
+
+    def trial(self, days=False):
+        """See billing.models.Billable.trial"""
+        return BillableBuilder(
+            self._billable,
+            self._processor.trial(days),
+            self._async_processor.trial(days),
+        )
+
+    def skip_trial(self):
+        """See billing.models.Billable.skip_trial"""
+        return BillableBuilder(
+            self._billable,
+            self._processor.skip_trial(),
+            self._async_processor.skip_trial(),
+        )
+
+    def idempotent(self, token):
+        """See billing.models.Billable.idempotent"""
+        # The user is part of the token so the same token of two users never collides
+        token = "{0}:{1}".format(self._billable.id, token)
+        return BillableBuilder(
+            self._billable,
+            self._processor.idempotent(token),
+            self._async_processor.idempotent(token),
+        )
+
+    def __getattr__(self, name):
+        # Billable methods run against the builder so they use its processor
+        for klass in type(self._billable).__mro__:
+            if name in vars(klass):
+                method = vars(klass)[name]
+                if issubclass(klass, Billable) and isinstance(method, types.FunctionType):
+                    return types.MethodType(method, self)
+                break
+
+        return getattr(self._billable, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._billable, name, value)
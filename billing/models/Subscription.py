@@ -1,5 +1,16 @@
+from collections import namedtuple
+
+from orator.exceptions.query import QueryException
+
+from billing.factories import BillingFactory
 from config.database import Model
 
+SubscriptionState = namedtuple(
+    "SubscriptionState", ["subscribed", "on_trial", "canceled", "plan"]
+)
+
+NO_SUBSCRIPTION = SubscriptionState(False, False, False, None)
+
 
 class Subscription(Model):
     __fillable__ = [
@@ -9,6 +20,184 @@ class Subscription(Model):
         "plan_name",
         "trial_ends_at",
         "ends_at",
+        "item_id",
+        "price",
+        "current_period_end",
     ]
 
-    __dates__ = ["trial_ends_at", "ends_at"]
+    __dates__ = ["trial_ends_at", "ends_at", "current_period_end"]
+
+    def is_active(self, plan=None):
+        """Whether the subscription has not ended yet.
+
+        Keyword Arguments:
+            plan {string|None} -- Only count the subscription if it is for this plan. (default: {None})
+
+        Returns:
+            bool
+        """
+        # If the subscription does not expire OR the subscription ends at a time in the future
+        if not self.ends_at or self.ends_at.is_future():
+            return not plan or self.plan == plan
+
+        return False
+
+    def is_on_trial(self, plan=None):
+        """Whether the trial of the subscription has not ended yet.
+
+        Keyword Arguments:
+            plan {string|None} -- Only count the trial if it is for this plan. (default: {None})
+
+        Returns:
+            bool
+        """
+        if self.trial_ends_at and self.trial_ends_at.is_future():
+            return not plan or self.plan == plan
+
+        return False
+
+    def is_canceled(self):
+        """Whether the subscription was cancelled but is still within its paid period.
+
+        Returns:
+            bool
+        """
+        return bool(self.ends_at and self.ends_at.is_future())
+
+    def has_ended(self, plan=None):
+        """Whether the subscription ended in the past.
+
+        Keyword Arguments:
+            plan {string|None} -- Only count the subscription if it was for this plan. (default: {None})
+
+        Returns:
+            bool
+        """
+        if self.ends_at and self.ends_at.is_past():
+            return not plan or self.plan == plan
+
+        return False
+
+    def state(self):
+        """Gets a compact snapshot of the subscription state.
+
+        Returns:
+            billing.models.SubscriptionState
+        """
+        return SubscriptionState(
+            self.is_active(), self.is_on_trial(), self.is_canceled(), self.plan
+        )
+
+    @classmethod
+    def reconcile(cls, rows):
+        """Inserts or updates many subscriptions by their processor identifier in one transaction.
+
+        Arguments:
+            rows {list} -- Dictionaries of subscription attributes with the user_id.
+
+        Returns:
+            tuple -- The inserted rows and the number of updated subscriptions.
+        """
+        if not rows:
+            return [], 0
+
+        with cls.resolve_connection().transaction():
+            existing = {
+                subscription.plan_id: subscription
+                for subscription in cls.where_in(
+                    "plan_id", [row["plan_id"] for row in rows]
+                ).get()
+            }
+
+            inserted = []
+            updated = 0
+            for row in rows:
+                subscription = existing.get(row["plan_id"])
+                if subscription is None:
+                    inserted.append(row)
+                elif subscription.differs(row):
+                    subscription.fill(row)
+                    subscription.save()
+                    updated += 1
+
+            if inserted:
+                cls.insert([cls._storable(row) for row in inserted])
+
+        # Bulk inserts skip the model events
+        for row in inserted:
+            _revoke_entitlement(row["user_id"])
+
+        return inserted, updated
+
+    @classmethod
+    def store(cls, attributes):
+        """Creates a subscription or updates the one stored with the same processor identifier.
+
+        The unique plan_id index decides between the two, so a webhook and a subscribe call
+        storing the same subscription at once leave a single row.
+
+        Arguments:
+            attributes {dict} -- The subscription attributes with the user_id.
+
+        Returns:
+            billing.models.Subscription
+        """
+        try:
+            return cls.create(**attributes)
+        except QueryException:
+            subscription = cls.where("plan_id", attributes["plan_id"]).first()
+            if subscription is None:
+                raise
+
+        subscription.fill(attributes)
+        subscription.save()
+        return subscription
+
+    def differs(self, attributes):
+        """Whether any of the attributes has another value than the subscription.
+
+        Arguments:
+            attributes {dict} -- The attributes to compare.
+
+        Returns:
+            bool
+        """
+        return any(
+            getattr(self, key) != value for key, value in attributes.items()
+        )
+
+    @classmethod
+    def _storable(cls, row):
+        """Formats a row for a bulk insert, which skips the model attribute casting.
+
+        Arguments:
+            row {dict} -- The subscription attributes.
+
+        Returns:
+            dict
+        """
+        model = cls()
+        now = model.fresh_timestamp()
+        row = dict(row, created_at=now, updated_at=now)
+
+        return {
+            key: model.from_datetime(value)
+            if value is not None and key in cls.__dates__ + ["created_at", "updated_at"]
+            else value
+            for key, value in row.items()
+        }
+
+
+def _revoke_entitlement(user_id):
+    """Refuses the entitlement tokens of a user whose subscription changed.
+
+    Arguments:
+        user_id {int} -- The user identifier.
+    """
+    if user_id is not None:
+        BillingFactory.entitlements().revoke(user_id)
+
+
+# Every saved or deleted subscription, like a webhook update, revokes the user tokens
+Subscription.saved(lambda subscription: _revoke_entitlement(subscription.user_id))
+Subscription.deleted(lambda subscription: _revoke_entitlement(subscription.user_id))
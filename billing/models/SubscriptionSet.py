@@ -0,0 +1,147 @@
+from .Subscription import NO_SUBSCRIPTION, SubscriptionState
+
+
+class SubscriptionSet:
+    """Every subscription of a user indexed by plan.
+
+    The primary subscription is the one the user plan_id points at, like the main plan
+    next to add-ons. Checks for a plan read the subscription of that plan. Checks for
+    access without a plan, is_active and is_on_trial, hold when any subscription does.
+    Checks describing the subscription itself, is_canceled and has_ended, read the primary.
+    """
+
+    __slots__ = ("subscriptions", "primary", "by_plan")
+
+    def __init__(self, subscriptions, primary=None):
+        """
+        Arguments:
+            subscriptions {iterable} -- Subscriptions, oldest first.
+
+        Keyword Arguments:
+            primary {billing.models.Subscription|None} -- The primary subscription.
+                                    If None the first subscription is used. (default: {None})
+        """
+        self.subscriptions = tuple(subscriptions)
+        self.by_plan = {}
+
+        for subscription in self.subscriptions:
+            if primary is None:
+                primary = subscription
+
+            # A newer subscription of a plan replaces an older one unless only the older is active
+            current = self.by_plan.get(subscription.plan)
+            if current is None or subscription.is_active() or not current.is_active():
+                self.by_plan[subscription.plan] = subscription
+
+        self.primary = primary
+
+    @classmethod
+    def of(cls, subscriptions, primary_id=None):
+        """Indexes the subscription rows of a user.
+
+        Arguments:
+            subscriptions {list} -- The billing.models.Subscription rows, oldest first.
+
+        Keyword Arguments:
+            primary_id {string|None} -- The processor identifier of the primary subscription. (default: {None})
+
+        Returns:
+            SubscriptionSet
+        """
+        primary = None
+        for subscription in subscriptions:
+            if subscription.plan_id == primary_id:
+                primary = subscription
+
+        return cls(subscriptions, primary)
+
+    def adding(self, subscription, primary_id=None):
+        """Indexes the subscriptions again with a new or changed subscription.
+
+        Arguments:
+            subscription {billing.models.Subscription} -- The subscription.
+
+        Keyword Arguments:
+            primary_id {string|None} -- The processor identifier of the primary subscription. (default: {None})
+
+        Returns:
+            SubscriptionSet
+        """
+        subscriptions = list(self.subscriptions)
+        if not any(row is subscription for row in subscriptions):
+            subscriptions.append(subscription)
+
+        return self.of(subscriptions, primary_id)
+
+    def get(self, plan=None):
+        """Gets the subscription of a plan.
+
+        Keyword Arguments:
+            plan {string|None} -- The plan. If None the primary subscription is returned. (default: {None})
+
+        Returns:
+            billing.models.Subscription|None
+        """
+        if plan is None:
+            return self.primary
+
+        return self.by_plan.get(plan)
+
+    def is_active(self, plan=None):
+        """See billing.models.Subscription.is_active"""
+        if plan is None:
+            return any(subscription.is_active() for subscription in self)
+
+        subscription = self.by_plan.get(plan)
+        return bool(subscription and subscription.is_active())
+
+    def is_on_trial(self, plan=None):
+        """See billing.models.Subscription.is_on_trial"""
+        if plan is None:
+            return any(subscription.is_on_trial() for subscription in self)
+
+        subscription = self.by_plan.get(plan)
+        return bool(subscription and subscription.is_on_trial())
+
+    def is_canceled(self, plan=None):
+        """See billing.models.Subscription.is_canceled"""
+        subscription = self.get(plan)
+        return bool(subscription and subscription.is_canceled())
+
+    def has_ended(self, plan=None):
+        """See billing.models.Subscription.has_ended"""
+        subscription = self.get(plan)
+        return bool(subscription and subscription.has_ended())
+
+    @property
+    def plan_name(self):
+        """The plan name of the primary subscription."""
+        return self.primary.plan_name if self.primary else None
+
+    def state(self):
+        """Gets a compact snapshot of the subscriptions.
+
+        Returns:
+            billing.models.SubscriptionState
+        """
+        if self.primary is None:
+            return NO_SUBSCRIPTION
+
+        return SubscriptionState(
+            self.is_active(), self.is_on_trial(), self.is_canceled(), self.primary.plan
+        )
+
+    def __iter__(self):
+        """Iterates the primary subscription first and then the subscription of every other plan."""
+        if self.primary is not None:
+            yield self.primary
+
+        for subscription in self.by_plan.values():
+            if subscription is not self.primary:
+                yield subscription
+
+    def __len__(self):
+        return len(self.by_plan)
+
+    def __bool__(self):
+        return self.primary is not None
@@ -0,0 +1,22 @@
+import pendulum
+from config.database import Model
+
+
+class WebhookEvent(Model):
+    __table__ = "billing_webhook_events"
+
+    __fillable__ = ["event_id", "type"]
+
+    @classmethod
+    def prune(cls, days=30):
+        """Deletes the events received before the retention period.
+
+        Keyword Arguments:
+            days {int} -- How many days of events to keep. (default: {30})
+
+        Returns:
+            int -- The number of deleted events.
+        """
+        return cls.where(
+            "created_at", "<", pendulum.now().subtract(days=days).to_datetime_string()
+        ).delete()
@@ -1,2 +1,4 @@
-from .Billable import Billable
-from .Subscription import Subscription
+from .Billable import Billable, BillableBuilder
+from .Subscription import Subscription, SubscriptionState
+from .SubscriptionSet import SubscriptionSet
+from .WebhookEvent import WebhookEvent
@@ -1,6 +1,15 @@
 """ A BillingProvider Service Provider """
 from masonite.provider import ServiceProvider
+from billing.commands.ExpireSubscriptionsCommand import ExpireSubscriptionsCommand
+from billing.commands.ExportCommand import ExportCommand
 from billing.commands.InstallCommand import InstallCommand
+from billing.commands.PruneWebhookEventsCommand import PruneWebhookEventsCommand
+from billing.commands.SyncSubscriptionsCommand import SyncSubscriptionsCommand
+from billing.middleware import (
+    LoadSubscriptionMiddleware,
+    OnTrialMiddleware,
+    SubscribedMiddleware,
+)
 
 
 class BillingProvider(ServiceProvider):
@@ -9,6 +18,19 @@ class BillingProvider(ServiceProvider):
 
     def register(self):
         self.app.bind("BillingInstallCommand", InstallCommand())
+        self.app.bind("BillingPruneWebhooksCommand", PruneWebhookEventsCommand())
+        self.app.bind("BillingSyncCommand", SyncSubscriptionsCommand())
+        self.app.bind("BillingExportCommand", ExportCommand())
+        self.app.bind("BillingExpireCommand", ExpireSubscriptionsCommand())
+
+        # Only the routes that check subscriptions load them, after the auth middleware
+        self.route_middleware(
+            {
+                "billing": LoadSubscriptionMiddleware,
+                "subscribed": SubscribedMiddleware,
+                "on_trial": OnTrialMiddleware,
+            }
+        )
 
     def boot(self):
         pass
@@ -0,0 +1,70 @@
+""" Stripe Objects
+
+Maps Stripe subscriptions onto the attributes of the subscription model. The Stripe
+driver and the in memory driver share these functions so the tests running on the
+fake driver cover the mapping the real driver uses.
+
+    from billing import stripe_objects
+
+    stripe_objects.subscription_attributes(subscription, "Masonite Test")
+"""
+
+import pendulum
+
+# Statuses of subscriptions Stripe keeps while waiting for a payment, without access
+UNPAID_STATUSES = ("past_due", "unpaid", "incomplete_expired")
+
+
+def subscription_attributes(subscription, plan_name):
+    """Gets the subscription model attributes from a Stripe subscription.
+
+    Arguments:
+        subscription {dict} -- The Stripe subscription.
+        plan_name {string} -- The name of the subscribed plan.
+
+    Returns:
+        dict -- The plan, plan_id, plan_name, trial_ends_at, ends_at, item_id, price
+                and current_period_end attributes.
+    """
+    trial_ends_at = None
+    ends_at = None
+
+    if subscription["trial_end"]:
+        trial_ends_at = pendulum.from_timestamp(subscription["trial_end"])
+
+    if subscription["ended_at"]:
+        ends_at = pendulum.from_timestamp(subscription["ended_at"])
+    elif subscription.get("status") in UNPAID_STATUSES:
+        # Access ended with the period that was not paid for
+        ends_at = pendulum.from_timestamp(subscription["current_period_start"])
+    elif subscription["cancel_at_period_end"]:
+        ends_at = pendulum.from_timestamp(subscription["current_period_end"])
+
+    return dict(
+        subscription_item(subscription),
+        plan=subscription["plan"]["id"],
+        plan_id=subscription["id"],
+        plan_name=plan_name,
+        trial_ends_at=trial_ends_at,
+        ends_at=ends_at,
+    )
+
+
+def subscription_item(subscription):
+    """Gets what plan changes need from a Stripe subscription without another request.
+
+    Arguments:
+        subscription {dict} -- The Stripe subscription.
+
+    Returns:
+        dict -- The item_id, price and current_period_end attributes of the subscription model.
+    """
+    current_period_end = None
+    if subscription["current_period_end"]:
+        current_period_end = pendulum.from_timestamp(subscription["current_period_end"])
+
+    return {
+        "item_id": subscription["items"]["data"][0]["id"],
+        "price": subscription["plan"]["amount"],
+        "current_period_end": current_period_end,
+    }
@@ -0,0 +1,408 @@
+""" A Local Stand In For The Stripe API """
+
+import copy
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, urlsplit
+
+import stripe
+
+from billing.drivers.BillingFakeDriver import BillingFakeDriver
+
+INTEGERS = ("amount", "amount_off", "limit", "trial_period_days")
+
+ERROR_TYPES = {402: "card_error", 429: "rate_limit_error", 500: "api_error"}
+
+
+class StripeError(Exception):
+    def __init__(self, message, status=400, headers=None):
+        super(StripeError, self).__init__(message)
+        self.message = message
+        self.status = status
+        self.headers = headers or {}
+
+
+class StripeStandIn:
+    """HTTP server answering the Stripe endpoints the billing driver uses.
+
+    Data lives in a BillingFakeDriver so the same plans, coupons and clock can be
+    used with and without the HTTP layer. Starting the stand in points the stripe
+    SDK at it until it is stopped.
+
+        with StripeStandIn(BillingFakeDriver(plans={...})) as stand_in:
+            BillingStripeDriver().subscribe(...)
+    """
+
+    def __init__(self, driver=None):
+        """
+        Keyword Arguments:
+            driver {billing.drivers.BillingFakeDriver|None} -- Holds the Stripe data. (default: {None})
+        """
+        self.driver = driver or BillingFakeDriver()
+        self.requests = []
+        self.failures = []
+        self.idempotent_responses = {}
+        self._server = None
+        self._previous = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return "http://{0}:{1}".format(*self._server.server_address)
+
+    def start(self):
+        """Starts the server and points the stripe SDK at it.
+
+        Returns:
+            self
+        """
+        handler = type("Handler", (StripeRequestHandler,), {"stand_in": self})
+        self._server = StripeServer(("127.0.0.1", 0), handler)
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+        self._previous = (stripe.api_base, stripe.api_key)
+        stripe.api_base = self.url
+        stripe.api_key = stripe.api_key or "sk_test_stand_in"
+        return self
+
+    def stop(self):
+        """Stops the server and points the stripe SDK back where it was."""
+        self._server.shutdown()
+        self._server.server_close()
+        stripe.api_base, stripe.api_key = self._previous
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def request_count(self, method=None, path=None):
+        """Counts the requests received.
+
+        Keyword Arguments:
+            method {string|None} -- Only count requests with this HTTP method. (default: {None})
+            path {string|None} -- Only count requests whose path starts with this. (default: {None})
+
+        Returns:
+            int
+        """
+        return len(
+            [
+                request
+                for request in self.requests
+                if (not method or request[0] == method)
+                and (not path or request[1].startswith(path))
+            ]
+        )
+
+    def fail(self, status=429, message="Too many requests", times=1, headers=None):
+        """Answers the next requests with an error.
+
+        Keyword Arguments:
+            status {int} -- The HTTP status. (default: {429})
+            message {string} -- The error message. (default: {"Too many requests"})
+            times {int} -- How many requests fail. (default: {1})
+            headers {dict|None} -- Extra response headers like Retry-After. (default: {None})
+
+        Returns:
+            self
+        """
+        with self._lock:
+            self.failures.extend([(status, message, headers or {})] * times)
+        return self
+
+    def respond(self, method, path, params, idempotency_key=None):
+        """Answers a request, replaying the first answer of a repeated idempotency key.
+
+        Arguments:
+            method {string} -- The HTTP method.
+            path {string} -- The request path.
+            params {dict} -- The decoded form or query parameters.
+
+        Keyword Arguments:
+            idempotency_key {string|None} -- The Idempotency-Key header. (default: {None})
+
+        Returns:
+            dict -- The Stripe object.
+        """
+        if method != "POST" or not idempotency_key:
+            return self.dispatch(method, path, params)
+
+        with self._lock:
+            if idempotency_key in self.idempotent_responses:
+                self.requests.append((method, path))
+                return self.idempotent_responses[idempotency_key]
+
+        response = self.dispatch(method, path, params)
+        with self._lock:
+            self.idempotent_responses[idempotency_key] = response
+        return response
+
+    def dispatch(self, method, path, params):
+        """Answers a Stripe API request.
+
+        Arguments:
+            method {string} -- The HTTP method.
+            path {string} -- The request path.
+            params {dict} -- The decoded form or query parameters.
+
+        Raises:
+            StripeError -- Raised when Stripe would answer with an error.
+
+        Returns:
+            dict -- The Stripe object.
+        """
+        with self._lock:
+            self.requests.append((method, path))
+            failure = self.failures.pop(0) if self.failures else None
+
+        if failure:
+            status, message, headers = failure
+            raise StripeError(message, status, headers)
+
+        for route_method, pattern, name in ROUTES:
+            match = re.match(pattern + "$", path)
+            if route_method == method and match:
+                return getattr(self, name)(params, *match.groups())
+
+        raise StripeError("Unrecognized request URL ({0}: {1})".format(method, path), 404)
+
+    def create_customer(self, params):
+        return self.driver._new_customer(**params)
+
+    def update_customer(self, params, customer_id):
+        customer = self.driver._modify_customer(customer_id, **params)
+        if not customer:
+            raise StripeError("No such customer: {0}".format(customer_id), 404)
+        return customer
+
+    def create_subscription(self, params):
+        plan = params.get("plan") or params.get("items", [{}])[0].get("plan")
+
+        if params.get("customer") not in self.driver.customers:
+            raise StripeError("No such customer: {0}".format(params.get("customer")))
+        if plan not in self.driver.plans:
+            raise StripeError("No such plan: {0}".format(plan))
+
+        subscription = self.driver._new_subscription(
+            params["customer"],
+            plan,
+            trial_period_days=params.get("trial_period_days"),
+            coupon=params.get("coupon"),
+        )
+        return self._expand(subscription, params.get("expand", []))
+
+    def retrieve_subscription(self, params, subscription_id):
+        return self._expand(
+            self._subscription(subscription_id), params.get("expand", [])
+        )
+
+    def update_subscription(self, params, subscription_id):
+        self._subscription(subscription_id)
+        items = params.get("items") or [{}]
+
+        if items[0].get("plan") and items[0]["plan"] not in self.driver.plans:
+            raise StripeError("No such plan: {0}".format(items[0]["plan"]))
+
+        subscription = self.driver._modify_subscription(
+            subscription_id,
+            plan=items[0].get("plan"),
+            cancel_at_period_end=params.get("cancel_at_period_end"),
+        )
+        return self._expand(subscription, params.get("expand", []))
+
+    def delete_subscription(self, params, subscription_id):
+        self._subscription(subscription_id)
+        return self._expand(
+            self.driver._delete_subscription(subscription_id), params.get("expand", [])
+        )
+
+    def list_subscriptions(self, params):
+        subscriptions = [
+            self._expand(self.driver._find_subscription(subscription_id), params.get("expand", []), "data.")
+            for subscription_id in list(self.driver.subscriptions)
+        ]
+        return self._list("/v1/subscriptions", subscriptions, params)
+
+    def retrieve_product(self, params, product_id):
+        product = self.driver._find_product(product_id)
+        if not product:
+            raise StripeError("No such product: {0}".format(product_id), 404)
+        return product
+
+    def retrieve_coupon(self, params, coupon_id):
+        if coupon_id not in self.driver.coupons:
+            raise StripeError("No such coupon: {0}".format(coupon_id), 404)
+        return self.driver.coupons[coupon_id]
+
+    def list_coupons(self, params):
+        return self._list("/v1/coupons", list(self.driver.coupons.values()), params)
+
+    def list_plans(self, params):
+        plans = [
+            self._expand_plan(plan, params.get("expand", []), "data.")
+            for plan in self.driver.plans.values()
+        ]
+        return self._list("/v1/plans", plans, params)
+
+    def create_charge(self, params):
+        params = dict(params)
+        if "amount" not in params:
+            raise StripeError("Missing required param: amount.")
+        return self.driver._new_charge(params.pop("amount"), **params)
+
+    def list_charges(self, params):
+        # Stripe lists charges newest first
+        charges = [
+            charge
+            for charge in reversed(self.driver.charges)
+            if not params.get("customer") or charge.get("customer") == params["customer"]
+        ]
+        return self._list("/v1/charges", charges, params)
+
+    def _subscription(self, subscription_id):
+        subscription = self.driver._find_subscription(subscription_id)
+        if not subscription:
+            raise StripeError("No such subscription: {0}".format(subscription_id), 404)
+        return subscription
+
+    def _expand(self, subscription, expand, prefix=""):
+        subscription = copy.deepcopy(subscription)
+        subscription["plan"] = self._expand_plan(subscription["plan"], expand, prefix + "plan.")
+        for item in subscription["items"]["data"]:
+            item["plan"] = self._expand_plan(item["plan"], [], "")
+        return subscription
+
+    def _expand_plan(self, plan, expand, prefix):
+        plan = copy.deepcopy(plan)
+        # Stripe only returns the product identifier unless it is expanded
+        if prefix + "product" not in expand and prefix.rstrip(".") + ".product" not in expand:
+            plan["product"] = plan["product"]["id"]
+        return plan
+
+    def _list(self, url, objects, params):
+        if params.get("starting_after"):
+            identifiers = [stripe_object["id"] for stripe_object in objects]
+            if params["starting_after"] in identifiers:
+                objects = objects[identifiers.index(params["starting_after"]) + 1:]
+
+        limit = params.get("limit", 10)
+        return {
+            "object": "list",
+            "url": url,
+            "has_more": len(objects) > limit,
+            "data": objects[:limit],
+        }
+
+
+ROUTES = [
+    ("POST", r"/v1/customers", "create_customer"),
+    ("POST", r"/v1/customers/([^/]+)", "update_customer"),
+    ("POST", r"/v1/subscriptions", "create_subscription"),
+    ("GET", r"/v1/subscriptions", "list_subscriptions"),
+    ("GET", r"/v1/subscriptions/([^/]+)", "retrieve_subscription"),
+    ("POST", r"/v1/subscriptions/([^/]+)", "update_subscription"),
+    ("DELETE", r"/v1/subscriptions/([^/]+)", "delete_subscription"),
+    ("GET", r"/v1/products/([^/]+)", "retrieve_product"),
+    ("GET", r"/v1/coupons", "list_coupons"),
+    ("GET", r"/v1/coupons/([^/]+)", "retrieve_coupon"),
+    ("GET", r"/v1/plans", "list_plans"),
+    ("POST", r"/v1/charges", "create_charge"),
+    ("GET", r"/v1/charges", "list_charges"),
+]
+
+
+class StripeServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StripeRequestHandler(BaseHTTPRequestHandler):
+
+    # Keep connections alive like api.stripe.com does
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    stand_in = None
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        self._respond()
+
+    def do_DELETE(self):
+        self._respond()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        params = decode(url.query + "&" + body.decode())
+
+        headers = {}
+        try:
+            status, payload = 200, self.stand_in.respond(
+                self.command, url.path, params, self.headers.get("Idempotency-Key")
+            )
+        except StripeError as e:
+            status, headers = e.status, e.headers
+            payload = {"error": {"type": ERROR_TYPES.get(status, "invalid_request_error"), "message": e.message}}
+
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def decode(query):
+    """Decodes Stripe form parameters like items[0][plan]=basic into nested values.
+
+    Arguments:
+        query {string} -- The url encoded parameters.
+
+    Returns:
+        dict
+    """
+    params = {}
+
+    for key, value in parse_qsl(query):
+        parts = re.findall(r"[^\[\]]+|\[\]", key)
+        target = params
+        for part, following in zip(parts, parts[1:]):
+            target = target.setdefault(part, [] if following == "[]" else {})
+        if isinstance(target, list):
+            target.append(convert(parts[-1], value))
+        else:
+            target[parts[-1]] = convert(parts[-1], value)
+
+    return listify(params)
+
+
+def convert(key, value):
+    # Older SDKs send booleans as True and False
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    if key in INTEGERS:
+        return int(value)
+    return value
+
+
+def listify(value):
+    # Dictionaries keyed by indexes like items[0] are lists in Stripe
+    if isinstance(value, dict):
+        value = {key: listify(item) for key, item in value.items()}
+        if value and all(key.isdigit() for key in value):
+            return [value[key] for key in sorted(value, key=int)]
+    return value
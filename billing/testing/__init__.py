@@ -0,0 +1 @@
+from .StripeStandIn import StripeStandIn
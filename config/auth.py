@@ -1,3 +1,15 @@
 AUTH = {
-    'model': object
-}
\ No newline at end of file
+    'model': object,
+    'defaults': {
+        'guard': 'web',
+    },
+    'guards': {
+        'web': {
+            'driver': 'cookie',
+            'model': object,
+            'drivers': {
+                'cookie': {},
+            },
+        },
+    },
+}
@@ -12,5 +12,39 @@ DRIVERS = {
         'client': os.getenv('STRIPE_CLIENT'),
         'secret': os.getenv('STRIPE_SECRET'),
         'currency': 'usd',
+        'http': {
+            'pool_size': 10,
+            'keep_alive': True,
+            'connect_timeout': 5,
+            'read_timeout': 30,
+            'max_retries': 2,
+        },
+        'cache': {
+            'driver': 'memory',
+            'size': 1024,
+            'ttl': {'subscription': 60, 'product': 3600},
+        },
+        # Requests per second for this API key. Use the redis driver to share it between workers.
+        'rate_limit': {
+            'driver': 'memory',
+            'rate': 25,
+            'burst': 25,
+        },
+        # Every coupon is kept locally and listed again after ttl seconds.
+        'coupons': {
+            'ttl': 3600,
+        },
     }
-}
\ No newline at end of file
+}
+
+# Signed subscription snapshots kept in the session or a cookie so checks skip the database.
+# Use the redis cache driver so a webhook handled by one worker revokes tokens on every worker.
+ENTITLEMENTS = {
+    'secret': os.getenv('APP_KEY'),
+    'ttl': 3600,
+    'cache': {
+        'driver': 'memory',
+        'size': 100000,
+        'ttl': 86400,
+    },
+}
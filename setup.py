@@ -6,13 +6,17 @@ setup(
     version='3.0.2',
     packages=[
         'billing',
+        'billing.cache',
         'billing.commands',
         'billing.contracts',
         'billing.controllers',
         'billing.drivers',
         'billing.factories',
+        'billing.limiters',
+        'billing.middleware',
         'billing.models',
         'billing.snippets',
+        'billing.testing',
     ],
     install_requires=[
         'masonite>=2.2',
@@ -0,0 +1,119 @@
+import os
+import uuid
+
+import pytest
+from orator import DatabaseManager, Model
+from orator.migrations import DatabaseMigrationRepository, Migrator
+
+from billing import instrumentation
+from billing.drivers import BillingFakeDriver, BillingHttpClient, BillingStripeDriver
+from billing.factories import BillingFactory
+from billing.models import Billable
+from billing.testing import StripeStandIn
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+PLANS = {
+    'masonite-test': {'name': 'Masonite Test', 'amount': 1000, 'trial_period_days': 7},
+    'masonite-flash': {'name': 'Masonite Flash', 'amount': 2000},
+}
+
+
+class User(Billable, Model):
+
+    __table__ = 'users'
+    __fillable__ = ['email', 'customer_id', 'plan_id']
+
+
+class WebhookRequest:
+    """The parts of a Masonite request the webhook controller reads."""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def input(self, key):
+        return self.payload.get(key)
+
+    def all(self):
+        return self.payload
+
+
+class BillingApp:
+    """An in-memory SQLite database with the billing tables and the Stripe stand in.
+
+    The models and the billing factory use them until the app is left, then the previous
+    connection resolver and processor are restored.
+    """
+
+    def __enter__(self):
+        self.db = DatabaseManager({'sqlite': {'driver': 'sqlite', 'database': ':memory:'}})
+        self.resolver = Model.get_connection_resolver()
+        Model.set_connection_resolver(self.db)
+
+        with self.db.connection().get_schema_builder().create('users') as table:
+            table.increments('id')
+            table.string('email')
+            table.string('customer_id').nullable()
+            table.string('plan_id').nullable()
+            table.timestamps()
+
+        repository = DatabaseMigrationRepository(self.db, 'migrations')
+        repository.create_repository()
+        Migrator(repository, self.db).run(MIGRATIONS)
+
+        self.stripe = StripeStandIn(BillingFakeDriver(plans=PLANS))
+        self.stripe.start()
+
+        # Measure the calls themselves without the configured rate limit
+        from config.billing import DRIVERS
+
+        BillingFactory.use(BillingStripeDriver(http_client=BillingHttpClient(**DRIVERS['stripe']['http'])))
+        return self
+
+    def __exit__(self, *args):
+        self.stripe.stop()
+        BillingFactory.use()
+        Model.set_connection_resolver(self.resolver)
+        self.db.disconnect()
+
+    def customer(self):
+        user = User.create(email='{0}@email.com'.format(uuid.uuid4().hex))
+        user.customer_id = self.stripe.driver._new_customer(email=user.email)['id']
+        user.save()
+        return user
+
+    def subscribed_user(self):
+        user = self.customer()
+        user.skip_trial().subscribe('masonite-test', 'tok_amex')
+
+        # Start every check from a freshly loaded user
+        return User.find(user.id)
+
+
+@pytest.fixture
+def app():
+    with BillingApp() as app:
+        yield app
+
+
+@pytest.fixture
+def stripe_api():
+    with StripeStandIn(BillingFakeDriver(plans=PLANS)) as stripe_api:
+        yield stripe_api
+
+
+@pytest.fixture
+def queries():
+    """Runs a check and gives its result with the names of the subscription queries it made."""
+
+    def run(check):
+        events = []
+        instrumentation.observe(events.append)
+        try:
+            result = check()
+        finally:
+            instrumentation.unobserve(events.append)
+
+        return result, [event.operation for event in events if event.kind == 'query']
+
+    return run
@@ -0,0 +1,21 @@
+from orator.migrations import Migration
+
+
+class MakeBillingWebhookEventsTable(Migration):
+
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.create('billing_webhook_events') as table:
+            table.increments('id')
+            table.string('event_id').unique()
+            table.string('type')
+            table.timestamps()
+            table.index('created_at')
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        self.schema.drop('billing_webhook_events')
@@ -0,0 +1,36 @@
+from orator.migrations import Migration
+
+
+class AddLookupIndexesToSubscriptionsTable(Migration):
+
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.table('subscriptions') as table:
+            # Billable looks subscriptions up by user and checks ends_at
+            table.index(['user_id', 'ends_at'], 'subscriptions_user_id_ends_at_index')
+            # Webhooks look subscriptions up by the Stripe subscription id
+            table.index('plan_id', 'subscriptions_plan_id_index')
+            # Expiry scans walk ends_at and trial_ends_at ranges in id order
+            table.index(['ends_at', 'id'], 'subscriptions_ends_at_id_index')
+            table.index(['trial_ends_at', 'id'], 'subscriptions_trial_ends_at_id_index')
+
+        # Webhooks look users up by the Stripe customer id
+        if self.schema.has_column('users', 'customer_id'):
+            with self.schema.table('users') as table:
+                table.index('customer_id', 'users_customer_id_index')
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        with self.schema.table('subscriptions') as table:
+            table.drop_index('subscriptions_user_id_ends_at_index')
+            table.drop_index('subscriptions_plan_id_index')
+            table.drop_index('subscriptions_ends_at_id_index')
+            table.drop_index('subscriptions_trial_ends_at_id_index')
+
+        if self.schema.has_column('users', 'customer_id'):
+            with self.schema.table('users') as table:
+                table.drop_index('users_customer_id_index')
@@ -0,0 +1,21 @@
+from orator.migrations import Migration
+
+
+class AddItemColumnsToSubscriptionsTable(Migration):
+
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.table('subscriptions') as table:
+            # Plan changes send the subscription item without retrieving the subscription
+            table.string('item_id', 50).nullable()
+            table.integer('price').nullable()
+            table.timestamp('current_period_end').nullable()
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        with self.schema.table('subscriptions') as table:
+            table.drop_column('item_id', 'price', 'current_period_end')
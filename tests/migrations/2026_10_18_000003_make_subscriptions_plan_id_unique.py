@@ -0,0 +1,21 @@
+from orator.migrations import Migration
+
+
+class MakeSubscriptionsPlanIdUnique(Migration):
+
+    def up(self):
+        """
+        Run the migrations.
+        """
+        with self.schema.table('subscriptions') as table:
+            # A webhook and a subscribe call storing the same Stripe subscription leave one row
+            table.drop_index('subscriptions_plan_id_index')
+            table.unique('plan_id', 'subscriptions_plan_id_unique')
+
+    def down(self):
+        """
+        Revert the migrations.
+        """
+        with self.schema.table('subscriptions') as table:
+            table.drop_unique('subscriptions_plan_id_unique')
+            table.index('plan_id', 'subscriptions_plan_id_index')
@@ -0,0 +1,28 @@
+import json
+
+from benchmarks.run import BASELINE, Benchmarks, compare, slower
+
+
+def test_hot_paths_make_no_more_calls_than_the_baseline():
+    with open(BASELINE) as baseline:
+        baseline = json.load(baseline)
+
+    with Benchmarks() as benchmarks:
+        results = benchmarks.run(2)
+
+    for name, result in results.items():
+        assert result['queries'] <= baseline[name]['queries'], name
+        assert result['stripe_calls'] <= baseline[name]['stripe_calls'], name
+
+
+def test_only_the_call_counts_are_compared():
+    baseline = {'swap': {'ms': 1.0, 'queries': 2.0, 'stripe_calls': 1.0}}
+
+    assert compare({'swap': {'ms': 10.0, 'queries': 2.0, 'stripe_calls': 1.0}}, baseline) == []
+    assert compare({'swap': {'ms': 1.0, 'queries': 3.0, 'stripe_calls': 2.0}}, baseline) == [
+        'swap makes 3.0 queries per call instead of 2.0',
+        'swap makes 2.0 stripe calls per call instead of 1.0',
+    ]
+    assert slower({'swap': {'ms': 10.0, 'queries': 2.0, 'stripe_calls': 1.0}}, baseline) == [
+        'swap takes 10.0ms per call instead of 1.0ms',
+    ]
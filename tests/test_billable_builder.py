@@ -0,0 +1,66 @@
+import threading
+from unittest import mock
+
+from billing.models import Billable
+
+
+class User(Billable):
+    plan_id = None
+    customer_id = 'cus_1'
+    email = 'test@email.com'
+
+    def save(self):
+        pass
+
+
+def test_builder_does_not_change_the_user():
+    user = User()
+    builder = user.coupon(100).skip_trial()
+
+    assert builder._processor._subscription_args == {'coupon': 100, 'trial_period_days': 0}
+    assert user._processor._subscription_args == {}
+    assert user.coupon(100)._processor._apply_coupon(1000) == 900
+    assert user._processor._apply_coupon(1000) == 1000
+
+
+def test_builder_writes_through_to_the_user():
+    user = User()
+    user.coupon(100).customer_id = 'cus_2'
+
+    assert user.customer_id == 'cus_2'
+
+
+def test_charges_with_coupons_from_many_threads():
+    charged = {}
+
+    def create(amount, **kwargs):
+        charged[kwargs['description']] = amount
+        return {'status': 'succeeded'}
+
+    def charge(number):
+        user = User()
+        if number % 2:
+            user.coupon(number).charge(1000, description=str(number))
+        else:
+            user.charge(1000, description=str(number))
+
+    with mock.patch('stripe.Charge.create', side_effect=create):
+        threads = [threading.Thread(target=charge, args=(number,)) for number in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    for number in range(50):
+        assert charged[str(number)] == (1000 - number if number % 2 else 1000)
+
+
+def test_checks_after_a_builder_chain_see_its_changes(app):
+    user = app.customer()
+    assert user.is_subscribed('masonite-test') is False
+
+    user.skip_trial().subscribe('masonite-test', 'tok_amex')
+    assert user.is_subscribed('masonite-test') is True
+
+    user.idempotent('cancel-1').cancel(now=True)
+    assert user.is_subscribed() is False
@@ -0,0 +1,53 @@
+import time
+
+from billing.cache import BillingMemoryCache
+from billing.drivers import BillingStripeDriver
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = BillingMemoryCache(size=2)
+    cache.put('subscription', 'sub_1', {'id': 'sub_1'})
+    cache.put('subscription', 'sub_2', {'id': 'sub_2'})
+    cache.get('subscription', 'sub_1')
+    cache.put('subscription', 'sub_3', {'id': 'sub_3'})
+
+    assert cache.get('subscription', 'sub_1') == {'id': 'sub_1'}
+    assert cache.get('subscription', 'sub_2') is None
+    assert cache.get('subscription', 'sub_3') == {'id': 'sub_3'}
+
+
+def test_memory_cache_expires_per_object_type():
+    cache = BillingMemoryCache(ttl={'subscription': 0.01, 'default': 60})
+    cache.put('subscription', 'sub_1', {'id': 'sub_1'})
+    cache.put('product', 'prod_1', {'id': 'prod_1'})
+    time.sleep(0.02)
+
+    assert cache.get('subscription', 'sub_1') is None
+    assert cache.get('product', 'prod_1') == {'id': 'prod_1'}
+
+
+def test_memory_cache_flushes_one_object_type():
+    cache = BillingMemoryCache()
+    cache.put('coupon', '5-off', {'id': '5-off'})
+    cache.put('product', 'prod_1', {'id': 'prod_1'})
+    cache.flush('coupon')
+
+    assert cache.get('coupon', '5-off') is None
+    assert cache.get('product', 'prod_1') == {'id': 'prod_1'}
+
+
+def test_driver_reads_through_the_cache():
+    calls = []
+
+    def retrieve(object_id):
+        calls.append(object_id)
+        return {'id': object_id}
+
+    driver = BillingStripeDriver(cache=BillingMemoryCache())
+    assert driver._remember('product', 'prod_1', retrieve) == {'id': 'prod_1'}
+    assert driver._remember('product', 'prod_1', retrieve) == {'id': 'prod_1'}
+    assert calls == ['prod_1']
+
+    driver.forget('product', 'prod_1')
+    driver._remember('product', 'prod_1', retrieve)
+    assert calls == ['prod_1', 'prod_1']
@@ -0,0 +1,42 @@
+from conftest import User
+
+
+def test_subscription_map_checks_many_users(app, queries):
+    subscribed = [app.subscribed_user() for _ in range(5)]
+    customer = app.customer()
+    user_ids = [user.id for user in subscribed] + [customer.id, 0]
+
+    states, names = queries(lambda: User.subscription_map(user_ids, chunk_size=3))
+
+    # The subscriptions and the primary plans of every chunk
+    assert len(names) == 6
+    assert all(states[user.id].subscribed for user in subscribed)
+    assert states[subscribed[0].id].plan == 'masonite-test'
+    assert states[subscribed[0].id].on_trial is subscribed[0].on_trial()
+    assert states[customer.id].subscribed is False
+    assert states[0].plan is None
+
+
+def test_subscribed_many_keeps_the_subscriptions_on_the_users(app, queries):
+    users = [User.find(app.subscribed_user().id), User.find(app.customer().id)]
+
+    subscribed, names = queries(lambda: User.subscribed_many(users, plan='masonite-test'))
+    assert subscribed == {users[0].id: True, users[1].id: False}
+    assert len(names) == 1
+
+    answers, names = queries(lambda: [user.is_subscribed('masonite-flash') for user in users])
+    assert answers == [False, False]
+    assert names == []
+
+
+def test_subscription_map_reports_the_primary_plan(app):
+    user = app.subscribed_user()
+    user.cancel(now=True)
+    user.subscribe('masonite-flash', 'tok_amex')
+    user = User.find(user.id)
+
+    state = User.subscription_map([user.id])[user.id]
+
+    assert state == user.subscription_state()
+    assert state.plan == 'masonite-flash'
+    assert state.subscribed is True
@@ -0,0 +1,56 @@
+import threading
+
+from billing.drivers import BillingFakeDriver
+from conftest import User
+
+
+def test_charge_many_streams_results_and_continues_after_failures(app):
+    users = [app.customer() for _ in range(4)]
+    charges = [
+        (users[0], 1000, None),
+        (users[1], 2000, {'token': 'tok_chargeDeclined'}),
+        (users[2], None, None),
+        (users[3], 3000, {'description': 'Overage'}),
+    ]
+
+    batch = User.charge_many(charges, concurrency=2, key='2026-10')
+    results = sorted(batch, key=lambda result: result.index)
+
+    charged = app.stripe.driver.charges
+
+    assert [result.charged for result in results] == [True, False, False, True]
+    assert results[2].error is not None
+    assert results[3].item[0] is users[3]
+    assert batch.summary() == {'total': 4, 'succeeded': 2, 'declined': 1, 'failed': 1, 'amount': 4000}
+    assert {charge['customer'] for charge in charged if charge['status'] == 'succeeded'} == {
+        users[0].customer_id, users[3].customer_id}
+
+
+def test_charge_batch_is_bounded_and_keyed_per_item():
+    driver = BillingFakeDriver()
+    active = []
+    peak = []
+    lock = threading.Lock()
+    # Every charge waits until four are in flight, which fails unless they run at once
+    together = threading.Barrier(4, timeout=5)
+    create_charge = driver._create_charge
+
+    def charge(amount, **kwargs):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        try:
+            together.wait()
+            return create_charge(amount, **kwargs)
+        finally:
+            with lock:
+                active.pop()
+
+    driver._create_charge = charge
+
+    summary = driver.charge_batch(((100, {}) for _ in range(40)), concurrency=4, key='batch').run()
+
+    assert summary['succeeded'] == 40
+    assert max(peak) == 4
+    assert driver.calls['charge'] == 40
+    assert len({charge['idempotency_key'] for charge in driver.charges}) == 40
@@ -0,0 +1,92 @@
+import pytest
+
+from billing import discounts
+from billing.cache import BillingMemoryCache
+from billing.drivers import BillingFakeDriver, BillingHttpClient, BillingStripeDriver, CouponCatalog
+from billing.exceptions import CouponNotValid
+from billing.testing import StripeStandIn
+
+
+def test_discounts_are_whole_cents():
+    ten_percent = discounts.Coupon('10-percent-off', percent_off=10)
+
+    assert discounts.apply(1499, ten_percent) == 1349
+    assert discounts.apply(1495, ten_percent) == 1345
+    assert discounts.apply(1499, .10) == 1349
+    assert discounts.apply(999, discounts.Coupon('12.5-off', percent_off=12.5)) == 874
+    assert discounts.apply(1000, 100) == 900
+    assert discounts.apply(1000, None) == 1000
+    assert discounts.apply(300, discounts.Coupon('5-off', amount_off=500)) == 0
+
+
+def test_expired_and_foreign_coupons_are_not_applied():
+    expired = discounts.Coupon('old', percent_off=10, redeem_by=1000)
+    euros = discounts.Coupon('5-euro', amount_off=500, currency='eur')
+
+    assert discounts.apply(1000, expired, now=999) == 900
+    with pytest.raises(CouponNotValid):
+        discounts.apply(1000, expired, now=1000)
+    with pytest.raises(CouponNotValid):
+        discounts.apply(1000, discounts.Coupon('deleted', percent_off=10, valid=False))
+    with pytest.raises(CouponNotValid):
+        discounts.apply(1000, euros, currency='usd')
+
+
+def test_price_looks_every_coupon_up_once():
+    lookups = []
+
+    def lookup(coupon_id):
+        lookups.append(coupon_id)
+        return discounts.Coupon(coupon_id, percent_off=10)
+
+    items = [(1499, '10-percent-off'), (1000, 100), (2000, '10-percent-off'), (500, None)]
+
+    assert discounts.price(items, lookup) == [1349, 900, 1800, 500]
+    assert lookups == ['10-percent-off']
+
+
+def test_catalog_lists_coupons_once_until_it_is_stale():
+    now = [0]
+    listed = []
+
+    def fetch():
+        listed.append(now[0])
+        return [{'id': '5-off', 'amount_off': 500}]
+
+    catalog = CouponCatalog(fetch, lambda coupon_id: {'id': coupon_id, 'percent_off': 20}, ttl=60, clock=lambda: now[0])
+
+    assert catalog.get('5-off').amount_off == 500
+    assert catalog.get('5-off').amount_off == 500
+    assert catalog.get('new').percent_off == 20
+    assert len(catalog) == 2
+    assert listed == [0]
+
+    now[0] = 60
+    catalog.get('5-off')
+    catalog.forget()
+    catalog.get('5-off')
+
+    assert listed == [0, 60, 60]
+
+
+def test_stripe_driver_charges_with_coupons_without_retrieving_them():
+    driver = BillingFakeDriver(coupons={
+        '10-percent-off': {'percent_off': 10},
+        '5-off': {'amount_off': 500},
+    })
+
+    with StripeStandIn(driver) as stripe_api:
+        billing = BillingStripeDriver(cache=BillingMemoryCache(), http_client=BillingHttpClient())
+
+        assert billing.coupon('10-percent-off').charge(1499, source='tok_amex')
+        assert billing.charge(1000, source='tok_visa', coupon='5-off')
+        assert billing.price([(1499, '10-percent-off'), (1000, '5-off'), (1000, .5)]) == [1349, 500, 500]
+
+        driver.add_coupon('expired', percent_off=50, redeem_by=driver.now() - 1)
+        with pytest.raises(CouponNotValid):
+            billing.coupon('expired').charge(1000, source='tok_amex')
+
+        assert [charge['amount'] for charge in driver.charges] == [1349, 500]
+        assert stripe_api.request_count('GET', '/v1/coupons') == 2
+        assert stripe_api.request_count('GET', '/v1/coupons/expired') == 1
+        assert stripe_api.request_count('GET', '/v1/coupons/10-percent-off') == 0
@@ -0,0 +1,154 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pendulum
+import pytest
+
+from billing import instrumentation
+from billing.entitlements import Entitlements
+from billing.factories import BillingFactory
+from billing.models import Subscription
+from conftest import User
+
+
+@pytest.fixture
+def entitlements(monkeypatch):
+    entitlements = BillingFactory.entitlements()
+    monkeypatch.setattr(entitlements, 'secret', b'testing-secret')
+    return entitlements
+
+
+def test_token_answers_subscription_checks(entitlements, app):
+    subscribed = app.subscribed_user()
+    token = subscribed.entitlement_token()
+    user = User.find(subscribed.id)
+
+    def checks(user):
+        return [
+            user.is_subscribed(), user.is_subscribed('masonite-test'), user.is_subscribed('masonite-flash'),
+            user.on_trial(), user.on_trial('masonite-flash'), user.is_canceled(), user.was_subscribed(),
+            user.plan(),
+        ]
+
+    events = []
+    instrumentation.observe(events.append)
+    try:
+        assert user.use_entitlement(token) is True
+        answers = checks(user)
+    finally:
+        instrumentation.unobserve(events.append)
+
+    assert answers == checks(subscribed)
+    assert answers[:3] == [True, True, False]
+    assert [event for event in events if event.kind == 'query'] == []
+
+    unsubscribed = app.customer()
+    assert unsubscribed.use_entitlement(unsubscribed.entitlement_token()) is True
+    assert unsubscribed.is_subscribed() is False
+    assert unsubscribed.was_subscribed() is False
+
+
+def test_tokens_of_other_users_forged_or_expired_tokens_are_refused(entitlements, app):
+    user = app.subscribed_user()
+    other = app.customer()
+    token = user.entitlement_token()
+    payload, signature = token.split('.')
+
+    assert other.use_entitlement(token) is False
+    assert user.use_entitlement(payload + '.' + signature[::-1]) is False
+    assert user.use_entitlement('not-a-token') is False
+    assert user.use_entitlement(None) is False
+    assert entitlements.verify(token, user.id, now=pendulum.now().int_timestamp + 3600) is None
+
+
+def test_saving_the_subscription_revokes_issued_tokens(entitlements, app):
+    user = app.subscribed_user()
+    token = user.entitlement_token()
+
+    # Like a webhook cancelling the subscription
+    subscription = Subscription.where('user_id', user.id).first()
+    subscription.ends_at = pendulum.now().subtract(days=1)
+    subscription.save()
+
+    fresh = User.find(user.id)
+    assert fresh.use_entitlement(token) is False
+    assert fresh.use_entitlement(fresh.entitlement_token()) is True
+    assert fresh.is_subscribed() is False
+    assert fresh.was_subscribed('masonite-test') is True
+
+
+def test_tokens_need_a_secret():
+    entitlements = Entitlements(None)
+
+    with pytest.raises(ValueError):
+        entitlements.issue(1, [])
+
+    assert entitlements.verify('payload.signature') is None
+    assert entitlements.revoke(1) == entitlements.version(1)
+
+
+def test_preloading_issues_a_token_once_the_old_one_is_refused(entitlements, app):
+    user = User.find(app.subscribed_user().id)
+
+    token = user.preload_subscription('not-a-token')
+    state = user.subscription_state()
+
+    again = User.find(user.id)
+    assert again.preload_subscription(token) is None
+    assert again.subscription_state() == state
+    assert state.subscribed is True
+
+
+def test_tokens_whose_version_was_evicted_are_refused():
+    entitlements = Entitlements('testing-secret', cache={'size': 2})
+    token = entitlements.issue(1, [])
+    entitlements.revoke(1)
+
+    # Other users push the revoked version out of the cache
+    entitlements.issue(2, [])
+    entitlements.issue(3, [])
+
+    assert entitlements.version(1) is None
+    assert entitlements.verify(token, 1) is None
+    assert entitlements.verify(entitlements.issue(1, []), 1) is not None
+
+
+def test_tokens_issued_before_a_restart_are_refused():
+    token = Entitlements('testing-secret').issue(1, [])
+    restarted = Entitlements('testing-secret')
+
+    assert restarted.verify(token, 1) is None
+    assert restarted.verify(restarted.issue(1, []), 1) is not None
+
+
+class InlineExecutor(ThreadPoolExecutor):
+    """Runs the blocking calls on the loop thread, which owns the in-memory database."""
+
+    def submit(self, method, *args, **kwargs):
+        future = Future()
+        future.set_result(method(*args, **kwargs))
+        return future
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(InlineExecutor())
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_async_changes_drop_the_token_in_use(entitlements, app):
+    user = app.subscribed_user()
+
+    assert user.use_entitlement(user.entitlement_token()) is True
+    assert run(user.acancel(now=True)) is True
+    assert user.is_subscribed() is False
+
+    user = app.subscribed_user()
+    run(user.acancel())
+    assert user.use_entitlement(user.entitlement_token()) is True
+    assert user.is_canceled() is True
+    run(user.aresume())
+    assert user.is_canceled() is False
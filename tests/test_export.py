@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+
+from cleo import Application, CommandTester
+
+from billing import export
+from billing.commands.ExportCommand import ExportCommand
+
+
+def test_subscriptions_are_read_in_chunks(app):
+    users = [app.subscribed_user() for _ in range(5)]
+
+    rows = list(export.subscriptions(chunk_size=2))
+
+    assert [row['plan_id'] for row in rows] == [user.plan_id for user in users]
+    assert [row['id'] for row in export.subscriptions(chunk_size=2, after_id=rows[2]['id'])] == [
+        row['id'] for row in rows[3:]]
+
+
+def test_charges_are_written_as_csv_and_ndjson(app):
+    app.stripe.driver.charge(1000, customer='cus_1', source='tok_amex')
+    app.stripe.driver.charge(2500, customer='cus_2', source='tok_amex')
+
+    stream = io.StringIO()
+    assert export.write(export.charges(), stream, 'csv', export.CHARGE_FIELDS) == 2
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert [row['amount'] for row in rows] == ['2500', '1000']
+
+    stream = io.StringIO()
+    export.write(export.charges(customer='cus_1'), stream, 'ndjson')
+    assert [json.loads(line)['customer'] for line in stream.getvalue().splitlines()] == ['cus_1']
+
+
+def test_export_command_writes_a_file(tmpdir, app):
+    output = tmpdir.join('subscriptions.ndjson')
+
+    app.subscribed_user()
+    app.subscribed_user()
+
+    application = Application()
+    application.add(ExportCommand())
+    tester = CommandTester(application.find('billing:export'))
+    tester.execute([('command', 'billing:export'), ('type', 'subscriptions'),
+                    ('--format', 'ndjson'), ('--output', str(output))])
+
+    assert 'Exported 2 subscriptions' in tester.get_display()
+    assert len(output.readlines()) == 2
+
+
+def test_export_command_keeps_the_file_on_an_unknown_format(tmpdir):
+    output = tmpdir.join('subscriptions.csv')
+    output.write('previous export\n')
+
+    application = Application()
+    application.add(ExportCommand())
+    tester = CommandTester(application.find('billing:export'))
+    status = tester.execute([('command', 'billing:export'), ('type', 'subscriptions'),
+                             ('--format', 'xml'), ('--output', str(output))])
+
+    assert status == 1
+    assert 'Unknown export format xml' in tester.get_display()
+    assert output.read() == 'previous export\n'
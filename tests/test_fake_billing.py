@@ -0,0 +1,86 @@
+import pytest
+
+from billing.cache import BillingMemoryCache
+from billing.drivers import BillingFakeDriver, BillingStripeDriver
+from billing.exceptions import PlanNotFound
+from billing.testing import StripeStandIn
+
+
+def fake_driver():
+    return BillingFakeDriver(
+        plans={
+            'masonite-test': {'name': 'Masonite Test', 'trial_period_days': 7},
+            'masonite-flash': {'name': 'Masonite Flash'},
+        },
+        coupons={
+            '5-off': {'amount_off': 500},
+            '10-percent-off': {'percent_off': 10},
+        },
+    )
+
+
+def test_fake_driver_trial_ends_after_travelling():
+    driver = fake_driver()
+    customer = driver.create_customer('Joe', 'tok_amex')
+    subscription = driver.subscribe('masonite-test', 'tok_amex', customer=customer['id'])
+
+    assert driver.on_trial(subscription['id'])
+    assert driver.plan(subscription['id']) == 'Masonite Test'
+
+    driver.travel(days=8)
+
+    assert not driver.on_trial(subscription['id'])
+    assert driver.is_subscribed(subscription['id'])
+
+
+def test_fake_driver_cancel_swap_and_resume():
+    driver = fake_driver()
+    customer = driver.create_customer('Joe', 'tok_amex')
+    subscription = driver.skip_trial().subscribe('masonite-test', 'tok_amex', customer=customer['id'])
+
+    assert not driver.on_trial(subscription['id'])
+    assert driver.swap(subscription['id'], 'masonite-flash')['plan']['id'] == 'masonite-flash'
+
+    driver.cancel(subscription['id'])
+    assert driver.is_canceled(subscription['id'])
+    assert driver.is_subscribed(subscription['id'])
+
+    driver.resume(subscription['id'])
+    assert not driver.is_canceled(subscription['id'])
+
+    driver.cancel(subscription['id'], now=True)
+    assert not driver.is_subscribed(subscription['id'])
+
+
+def test_fake_driver_charges_and_coupons():
+    driver = fake_driver()
+
+    assert driver.coupon('10-percent-off').charge(1000, source='tok_amex')
+    assert driver.coupon('5-off').charge(1000, source='tok_amex')
+    assert not driver.charge(1000, source='tok_chargeDeclined')
+    assert [charge['amount'] for charge in driver.charges if charge['status'] == 'succeeded'] == [900, 500]
+    assert driver.calls['charge'] == 3
+
+    with pytest.raises(PlanNotFound):
+        driver.subscribe('masonite-missing', 'tok_amex')
+
+
+def test_stripe_driver_against_stand_in():
+    with StripeStandIn(fake_driver()) as stand_in:
+        driver = BillingStripeDriver(cache=BillingMemoryCache())
+        customer = driver.create_customer('Joe', 'tok_amex')
+        subscription = driver.subscribe('masonite-test', 'tok_amex', customer=customer['id'])
+
+        assert driver.plan_name(subscription) == 'Masonite Test'
+        assert driver.on_trial(subscription['id'])
+
+        subscription = driver.skip_trial().subscribe('masonite-flash', 'tok_amex', customer=customer['id'])
+        assert driver.cancel(subscription['id'])
+        assert driver.is_canceled(subscription['id'])
+        assert driver.charge(999, customer=customer['id'])
+
+        with pytest.raises(PlanNotFound):
+            driver.subscribe('masonite-missing', 'tok_amex', customer=customer['id'])
+
+    assert stand_in.request_count('POST', '/v1/subscriptions') == 4
+    assert stand_in.request_count(path='/v1/products') == 0
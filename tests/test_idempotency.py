@@ -0,0 +1,47 @@
+from billing.cache import BillingMemoryCache
+from billing.drivers import BillingHttpClient, BillingStripeDriver
+
+
+def driver():
+    return BillingStripeDriver(cache=BillingMemoryCache(), http_client=BillingHttpClient())
+
+
+def test_repeated_calls_with_a_token_run_once(stripe_api):
+    billing = driver()
+    customer = billing.create_customer('Joe', 'tok_amex')['id']
+
+    first = billing.idempotent('order-1').subscribe('masonite-test', 'tok_amex', customer=customer)
+    again = billing.idempotent('order-1').subscribe('masonite-test', 'tok_amex', customer=customer)
+    other = billing.idempotent('order-2').subscribe('masonite-test', 'tok_amex', customer=customer)
+
+    assert first['id'] == again['id'] != other['id']
+
+    billing.idempotent('overage-1').charge(1000, customer=customer)
+    billing.idempotent('overage-1').charge(1000, customer=customer)
+    billing.charge(1000, customer=customer)
+    billing.charge(1000, customer=customer)
+
+    assert len(stripe_api.driver.subscriptions) == 2
+    assert len(stripe_api.driver.charges) == 3
+
+
+def test_single_use_payment_tokens_are_keys_on_their_own(stripe_api):
+    billing = driver()
+
+    assert billing.create_customer('Joe', 'tok_1')['id'] == billing.create_customer('Joe', 'tok_1')['id']
+    billing.charge(500, source='tok_2')
+    billing.charge(500, source='tok_2')
+
+    assert len(stripe_api.driver.customers) == 1
+    assert len(stripe_api.driver.charges) == 1
+
+
+def test_keys_depend_on_the_operation_and_arguments():
+    billing = driver().idempotent('job-1')
+
+    assert billing._idempotency_key('swap', 'sub_1', 'masonite-flash') == \
+        billing._idempotency_key('swap', 'sub_1', 'masonite-flash')
+    assert billing._idempotency_key('swap', 'sub_1', 'masonite-flash') != \
+        billing._idempotency_key('swap', 'sub_1', 'masonite-test')
+    assert billing._idempotency_key('swap', 'sub_1') != billing._idempotency_key('resume', 'sub_1')
+    assert driver()._idempotency_key('swap', 'sub_1') is None
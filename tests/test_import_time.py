@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+
+MEASURE = """
+import json, sys
+import config.database
+loaded = set(sys.modules)
+import billing.models
+print(json.dumps({
+    'stripe': 'stripe' in sys.modules,
+    'drivers': 'billing.drivers' in sys.modules,
+    'packages': sorted(
+        name for name in set(sys.modules) - loaded
+        if 'site-packages' in (getattr(sys.modules[name], '__file__', None) or '')
+    ),
+}))
+"""
+
+
+def measure_import():
+    output = subprocess.check_output([sys.executable, '-c', MEASURE])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def test_importing_billing_does_not_load_the_driver():
+    measured = measure_import()
+
+    assert measured['stripe'] is False
+    assert measured['drivers'] is False
+
+
+def test_importing_billing_loads_no_other_packages():
+    # Installed packages are what made the import slow, the standard library is cheap
+    assert measure_import()['packages'] == []
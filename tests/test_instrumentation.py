@@ -0,0 +1,40 @@
+from billing import instrumentation
+from billing.instrumentation import PrometheusExporter
+
+
+def test_events_are_tagged_with_the_billable_method(app):
+    events = []
+
+    user = app.customer()
+
+    instrumentation.observe(events.append)
+    try:
+        user.subscribe('masonite-test', 'tok_amex')
+    finally:
+        instrumentation.unobserve(events.append)
+
+    user.is_subscribed()
+
+    assert [(event.kind, event.operation) for event in events] == [
+        ('query', 'subscriptions.select'),
+        ('stripe', 'Subscription.create'),
+        ('query', 'subscriptions.select'),
+        ('query', 'subscriptions.insert'),
+    ]
+    assert {event.method for event in events} == {'subscribe'}
+    assert {event.outcome for event in events} == {'ok'}
+
+
+def test_prometheus_exporter_renders_a_histogram():
+    exporter = PrometheusExporter(buckets=(0.1, 1))
+    exporter(instrumentation.BillingEvent('stripe', 'Charge.create', 'charge', 0.05, 'ok'))
+    exporter(instrumentation.BillingEvent('stripe', 'Charge.create', 'charge', 0.5, 'ok'))
+
+    labels = 'kind="stripe",operation="Charge.create",method="charge",outcome="ok"'
+    metrics = exporter.render()
+
+    assert '# TYPE billing_operation_seconds histogram' in metrics
+    assert 'billing_operation_seconds_bucket{%s,le="0.1"} 1' % labels in metrics
+    assert 'billing_operation_seconds_bucket{%s,le="1"} 2' % labels in metrics
+    assert 'billing_operation_seconds_bucket{%s,le="+Inf"} 2' % labels in metrics
+    assert 'billing_operation_seconds_count{%s} 2' % labels in metrics
@@ -0,0 +1,112 @@
+import json
+
+import pendulum
+from cleo import Application, CommandTester
+
+from billing import lifecycle
+from billing.commands.ExpireSubscriptionsCommand import ExpireSubscriptionsCommand
+from billing.models import Subscription
+
+NOW = pendulum.datetime(2026, 10, 18, 12)
+
+
+def subscription(user_id, plan='masonite-test', **dates):
+    return Subscription.create(
+        user_id=user_id, plan=plan, plan_id='sub_{0}'.format(user_id), plan_name='Masonite Test', **dates)
+
+
+def collect(since, until, **kwargs):
+    events = []
+    lifecycle.listen(events.append)
+    try:
+        sent = lifecycle.expire(since, until, **kwargs)
+    finally:
+        lifecycle.unlisten(events.append)
+
+    return sent, events
+
+
+def test_transitions_are_sent_once_per_window(app):
+    ended = [subscription(user_id, ends_at=NOW.subtract(hours=user_id)) for user_id in range(1, 6)]
+    trial = subscription(6, trial_ends_at=NOW.subtract(minutes=5))
+    ending = subscription(7, ends_at=NOW.add(days=2))
+    subscription(8, ends_at=NOW.subtract(days=2))
+
+    sent, events = collect(NOW.subtract(days=1), NOW, ahead=3 * 24 * 60 * 60, chunk_size=2)
+
+    assert sent == {lifecycle.TRIAL_ENDED: 1, lifecycle.SUBSCRIPTION_ENDED: 5, lifecycle.SUBSCRIPTION_ENDING: 1}
+    assert events[0] == lifecycle.LifecycleEvent(
+        lifecycle.TRIAL_ENDED, trial.id, 6, 'masonite-test', NOW.subtract(minutes=5))
+    assert [event.subscription_id for event in events[1:6]] == [row.id for row in reversed(ended)]
+    assert events[-1].subscription_id == ending.id
+
+    # The next window starts where this one stopped
+    assert collect(NOW, NOW.add(hours=1))[0] == {}
+
+
+def test_rows_sharing_a_date_are_read_across_chunks(app):
+    rows = [subscription(user_id, ends_at=NOW.subtract(hours=1)) for user_id in range(1, 8)]
+
+    _, events = collect(NOW.subtract(days=1), NOW, chunk_size=3)
+
+    assert [event.subscription_id for event in events] == [row.id for row in rows]
+
+
+def test_workers_split_the_subscriptions(app):
+    for user_id in range(1, 11):
+        subscription(user_id, ends_at=NOW.subtract(hours=1))
+
+    seen = []
+    for worker in range(1, 4):
+        seen += [event.subscription_id for event in collect(NOW.subtract(days=1), NOW, partition=(worker, 3))[1]]
+
+    assert sorted(seen) == [row.id for row in Subscription.order_by('id').get()]
+
+
+def test_rows_stored_between_worker_runs_keep_their_worker(tmpdir, app):
+    checkpoint = str(tmpdir.join('expire.json'))
+    window = [('--since', NOW.subtract(days=1).to_iso8601_string()), ('--until', NOW.to_iso8601_string())]
+
+    def run(worker):
+        events = []
+        lifecycle.listen(events.append)
+        try:
+            expire(checkpoint, ('--worker', str(worker)), ('--workers', '2'), *window)
+        finally:
+            lifecycle.unlisten(events.append)
+        return {event.subscription_id for event in events}
+
+    first = [subscription(user_id, ends_at=NOW.subtract(hours=1)).id for user_id in range(1, 11)]
+    sent_first = run(1)
+    later = [subscription(user_id, ends_at=NOW.subtract(hours=1)).id for user_id in range(11, 21)]
+    sent_second = run(2)
+
+    # Every row the second worker owns is sent, wherever the table ended when the first ran
+    assert sent_first == {id for id in first if id % 2 == 0}
+    assert sent_second == {id for id in first + later if id % 2 == 1}
+
+
+def expire(checkpoint, *options):
+    application = Application()
+    application.add(ExpireSubscriptionsCommand())
+
+    tester = CommandTester(application.find('billing:expire'))
+    tester.execute([('command', 'billing:expire'), ('--checkpoint', checkpoint)] + list(options))
+    return tester.get_display()
+
+
+def test_expire_command_resumes_from_the_last_window(tmpdir, app):
+    checkpoint = str(tmpdir.join('expire.json'))
+
+    subscription(1, ends_at=NOW.subtract(hours=2))
+    subscription(2, ends_at=NOW.add(hours=2))
+
+    display = expire(checkpoint, ('--since', NOW.subtract(days=1).to_iso8601_string()),
+                     ('--until', NOW.to_iso8601_string()))
+    assert 'subscription_ended: 1' in display
+    assert json.load(open(checkpoint)) == {'until': NOW.to_iso8601_string()}
+
+    display = expire(checkpoint, ('--until', NOW.add(hours=3).to_iso8601_string()))
+    assert 'Sent 1 lifecycle events' in display
+
+    assert 'The worker must be' in expire(checkpoint, ('--worker', '3'), ('--workers', '2'))
@@ -0,0 +1,96 @@
+from masonite.app import App
+
+from billing.factories import BillingFactory
+from billing.middleware import LoadSubscriptionMiddleware, OnTrialMiddleware, SubscribedMiddleware
+from billing.models import Subscription
+from billing.providers import BillingProvider
+from conftest import User
+
+
+class Request:
+    """The parts of a Masonite request the billing middleware use."""
+
+    def __init__(self, user=None, cookies=None):
+        self._user = user
+        self.cookies = dict(cookies or {})
+        self.status_code = None
+        self.redirected_to = None
+
+    def user(self):
+        return self._user
+
+    def get_cookie(self, name, decrypt=True):
+        return self.cookies.get(name)
+
+    def cookie(self, name, value, encrypt=True, expires=''):
+        self.cookies[name] = value
+
+    def status(self, status):
+        self.status_code = status
+
+    def redirect(self, url):
+        self.redirected_to = url
+
+
+def test_a_dashboard_request_makes_one_billing_query(app, queries):
+    request = Request(User.find(app.subscribed_user().id))
+
+    def dashboard():
+        LoadSubscriptionMiddleware(request).before()
+        SubscribedMiddleware(request).before('masonite-test')
+        request.user().is_subscribed()
+        request.user().on_trial()
+        request.user().plan()
+
+    assert queries(dashboard)[1] == ['subscriptions.select']
+    assert request.subscription == Subscription.where('user_id', request.user().id).first().state()
+    assert request.status_code is None
+
+
+def test_guards_refuse_users_without_the_plan(app):
+    request = Request(app.customer())
+    LoadSubscriptionMiddleware(request).before()
+
+    SubscribedMiddleware(request).before()
+    assert request.status_code == 402
+
+    guard = OnTrialMiddleware(request)
+    guard.redirect_url = '/billing'
+    guard.before('masonite-test', 'masonite-flash')
+    assert request.redirected_to == '/billing'
+
+    anonymous = Request()
+    LoadSubscriptionMiddleware(anonymous).before()
+    SubscribedMiddleware(anonymous).before()
+    assert anonymous.subscription.subscribed is False
+    assert anonymous.status_code == 402
+
+
+def test_entitlement_cookie_replaces_the_query(monkeypatch, app, queries):
+    monkeypatch.setattr(BillingFactory.entitlements(), 'secret', b'testing-secret')
+
+    user_id = app.subscribed_user().id
+    first = Request(User.find(user_id))
+    LoadSubscriptionMiddleware(first).before()
+
+    second = Request(User.find(user_id), first.cookies)
+    assert queries(lambda: LoadSubscriptionMiddleware(second).before())[1] == []
+    assert second.subscription == first.subscription
+    assert second.subscription.subscribed is True
+
+
+def test_subscriptions_are_only_loaded_on_the_routes_asking_for_them():
+    app = App()
+    app.bind('HttpMiddleware', [])
+    app.bind('RouteMiddleware', {})
+
+    provider = BillingProvider()
+    provider.load_app(app)
+    provider.register()
+
+    assert app.make('HttpMiddleware') == []
+    assert app.make('RouteMiddleware') == {
+        'billing': LoadSubscriptionMiddleware,
+        'subscribed': SubscribedMiddleware,
+        'on_trial': OnTrialMiddleware,
+    }
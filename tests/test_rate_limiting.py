@@ -0,0 +1,93 @@
+import time
+
+import pytest
+import stripe
+
+from billing.cache import BillingMemoryCache
+from billing.drivers import BillingHttpClient, BillingStripeDriver
+from billing.factories import BillingRateLimiterFactory
+from billing.limiters import BillingMemoryRateLimiter
+
+
+class Clock:
+    now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_goes_into_debt_and_refills():
+    clock = Clock()
+    limiter = BillingMemoryRateLimiter(rate=10, burst=2, clock=clock)
+
+    assert [limiter.reserve('key') for _ in range(4)] == [0, 0, pytest.approx(0.1), pytest.approx(0.2)]
+    assert limiter.reserve('other') == 0
+
+    clock.now += 1
+    assert limiter.reserve('key') == 0
+
+
+def test_rate_limiter_factory():
+    assert BillingRateLimiterFactory.make() is None
+    assert BillingRateLimiterFactory.make({'driver': None}) is None
+    assert BillingRateLimiterFactory.make({'rate': 5}).burst == 5
+
+    with pytest.raises(ValueError):
+        BillingRateLimiterFactory.make({'driver': 'memcached'})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(time, 'sleep', slept.append)
+    return slept
+
+
+def test_rate_limited_requests_are_retried_with_backoff(sleeps, stripe_api):
+    client = BillingHttpClient(max_retries=3, backoff_base=0.01, backoff_max=0.05)
+
+    driver = BillingStripeDriver(cache=BillingMemoryCache(), http_client=client)
+    customer = driver.create_customer('Joe', 'tok_amex')
+
+    stripe_api.fail(429, times=2)
+    assert driver.subscribe('masonite-test', 'tok_amex', customer=customer['id'])
+
+    stripe_api.fail(429, times=4)
+    with pytest.raises(stripe.error.RateLimitError):
+        driver.subscribe('masonite-test', 'tok_amex', customer=customer['id'])
+
+    stats = client.stats()
+    assert stats['rate_limited'] == 6
+    assert stats['retries'] == 5
+    assert len(sleeps) == 5
+    assert all(0 <= seconds <= 0.05 for seconds in sleeps)
+    assert stats['throttled_seconds'] == pytest.approx(sum(sleeps), abs=0.001)
+
+
+def test_requests_wait_on_the_rate_limiter(monkeypatch, stripe_api):
+    clock = Clock()
+    limiter = BillingMemoryRateLimiter(rate=50, burst=1, clock=clock)
+    client = BillingHttpClient(rate_limiter=limiter)
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(time, 'sleep', sleep)
+
+    driver = BillingStripeDriver(cache=None, http_client=client)
+    for _ in range(3):
+        driver.create_customer('Joe', 'tok_amex')
+
+    assert sleeps == [pytest.approx(0.02), pytest.approx(0.02)]
+    assert client.stats()['throttled_seconds'] == pytest.approx(0.04)
+
+
+def test_subscribe_raises_unexpected_stripe_errors(stripe_api):
+    driver = BillingStripeDriver(cache=None, http_client=BillingHttpClient())
+    customer = driver.create_customer('Joe', 'tok_amex')
+
+    stripe_api.fail(400, 'Invalid trial_period_days')
+    with pytest.raises(stripe.error.InvalidRequestError):
+        driver.subscribe('masonite-test', 'tok_amex', customer=customer['id'])
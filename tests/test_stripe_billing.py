@@ -227,8 +227,8 @@ def test_can_use_coupon_on_charge():
     assert user._processor._apply_coupon(1000) == 1000
     assert user.coupon('5-off')._processor._apply_coupon(500) == 400
     assert user.coupon('10-percent-off')._processor._apply_coupon(1000) == 900
-    assert user.coupon('10-percent-off')._processor._apply_coupon(1499) == 1349.1
-    assert user.coupon(.10)._processor._apply_coupon(1499) == 1349.1
+    assert user.coupon('10-percent-off')._processor._apply_coupon(1499) == 1349
+    assert user.coupon(.10)._processor._apply_coupon(1499) == 1349
     assert user.coupon(100)._processor._apply_coupon(1000) == 900
 
 
@@ -240,3 +240,33 @@ def test_can_use_coupon_on_subscription():
 
     user.cancel(now=True)
 
+
+
+def test_subscription_is_loaded_once_per_user():
+    user.skip_trial().subscribe('masonite-test', 'tok_amex')
+
+    subscription = user._get_subscription()
+    assert user._get_subscription() is subscription
+    assert user._get_subscription(refresh=True) is not subscription
+
+    user.cancel(now=True)
+    assert user.is_subscribed() is False
+    if os.environ.get('TEST_ENVIRONMENT') == 'travis':
+        time.sleep(2)
+
+
+def test_subscription_map_checks_many_users():
+    user.skip_trial().subscribe('masonite-test', 'tok_amex')
+
+    states = User.subscription_map([user.id, 0])
+    assert states[user.id].subscribed is True
+    assert states[user.id].on_trial is user.on_trial()
+    assert states[user.id].plan == 'masonite-test'
+    assert states[0].subscribed is False
+
+    assert User.subscribed_many([user], plan='masonite-test') == {user.id: True}
+    assert User.subscribed_many([user], plan='masonite-flash') == {user.id: False}
+
+    user.cancel(now=True)
+    if os.environ.get('TEST_ENVIRONMENT') == 'travis':
+        time.sleep(2)
@@ -0,0 +1,216 @@
+from unittest import mock
+
+import pendulum
+import stripe
+
+from billing.cache import BillingMemoryCache
+from billing.drivers import BillingStripeDriver
+
+
+def stripe_subscription(subscription_id='sub_1', plan='masonite-test'):
+    return stripe.util.convert_to_stripe_object({
+        'id': subscription_id,
+        'object': 'subscription',
+        'status': 'active',
+        'ended_at': None,
+        'current_period_end': 1700000000,
+        'plan': {
+            'id': plan,
+            'object': 'plan',
+            'amount': 1000,
+            'trial_period_days': None,
+            'product': {'id': 'prod_1', 'object': 'product', 'name': 'Masonite Test'},
+        },
+        'items': {
+            'object': 'list',
+            'data': [{'id': 'si_1', 'object': 'subscription_item'}],
+        },
+    })
+
+
+def test_subscribe_and_plan_name_make_one_stripe_call():
+    driver = BillingStripeDriver(cache=BillingMemoryCache())
+
+    with mock.patch('stripe.Subscription.create', return_value=stripe_subscription()) as create, \
+            mock.patch('stripe.Subscription.retrieve') as retrieve, \
+            mock.patch('stripe.Product.retrieve') as product:
+        subscription = driver.subscribe('masonite-test', 'tok_amex', customer='cus_1')
+
+        assert driver.plan_name(subscription) == 'Masonite Test'
+        assert driver.plan('sub_1') == 'Masonite Test'
+
+    assert create.call_count == 1
+    assert create.call_args[1]['expand'] == ['plan.product']
+    assert retrieve.call_count == 0
+    assert product.call_count == 0
+
+
+def test_async_driver_runs_stripe_calls_concurrently():
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from billing.drivers import AsyncBillingStripeDriver
+
+    # Every call waits until all five are in flight, which only happens when they run concurrently
+    in_flight = threading.Barrier(5, timeout=5)
+
+    class SlowDriver:
+        def plan(self, plan_id):
+            in_flight.wait()
+            return 'Plan {0}'.format(plan_id)
+
+    driver = AsyncBillingStripeDriver(SlowDriver(), ThreadPoolExecutor(5))
+    loop = asyncio.new_event_loop()
+    names = loop.run_until_complete(driver.plans(['1', '2', '3', '4', '5']))
+    loop.close()
+
+    assert names == ['Plan 1', 'Plan 2', 'Plan 3', 'Plan 4', 'Plan 5']
+
+
+def test_driver_shares_a_pooled_http_client():
+    from billing.drivers.BillingHttpClient import BillingHttpClient
+
+    client = BillingHttpClient(pool_size=4, connect_timeout=1, read_timeout=2, max_retries=3)
+    driver = BillingStripeDriver(cache=None, http_client=client)
+
+    assert stripe.default_http_client is client
+    assert client._timeout == (1, 2)
+    assert client._max_network_retries() == 3
+    assert driver.pool_stats() == {
+        'pool_size': 4, 'active': 0, 'requests': 0, 'connections': 0, 'idle': 0,
+        'rate_limited': 0, 'retries': 0, 'throttled_seconds': 0.0,
+    }
+
+
+def test_drivers_made_from_the_configuration_share_one_client():
+    first = BillingStripeDriver(cache=None)
+    second = BillingStripeDriver(cache=None)
+
+    assert first.http_client is second.http_client
+    assert stripe.default_http_client is first.http_client
+
+
+def test_subscription_attributes_mirror_the_stripe_subscription():
+    subscription = stripe_subscription()
+    subscription.update({
+        'trial_end': 1600000000,
+        'cancel_at_period_end': True,
+        'current_period_end': 1700000000,
+    })
+
+    attributes = BillingStripeDriver(cache=None).subscription_attributes(subscription)
+
+    assert attributes['plan'] == 'masonite-test'
+    assert attributes['plan_id'] == 'sub_1'
+    assert attributes['plan_name'] == 'Masonite Test'
+    assert attributes['trial_ends_at'].int_timestamp == 1600000000
+    assert attributes['ends_at'].int_timestamp == 1700000000
+    assert attributes['item_id'] == 'si_1'
+    assert attributes['price'] == 1000
+    assert attributes['current_period_end'] == pendulum.from_timestamp(1700000000)
+
+
+def test_plan_changes_make_one_stripe_call():
+    driver = BillingStripeDriver(cache=None)
+
+    with mock.patch('stripe.Subscription.retrieve') as retrieve, \
+            mock.patch('stripe.Subscription.modify', return_value=stripe_subscription()) as modify, \
+            mock.patch('stripe.Subscription.delete', return_value=stripe_subscription()) as delete:
+        driver.swap('sub_1', 'masonite-flash', item_id='si_1')
+        driver.resume('sub_1')
+        assert driver.cancel('sub_1')['current_period_end'] == 1700000000
+        driver.cancel('sub_1', now=True)
+
+    assert retrieve.call_count == 0
+    assert modify.call_count == 3
+    assert delete.call_count == 1
+    assert modify.call_args_list[0][1]['items'] == [{'id': 'si_1', 'plan': 'masonite-flash'}]
+
+
+def test_swap_retrieves_the_item_of_subscriptions_stored_without_one():
+    driver = BillingStripeDriver(cache=None)
+
+    with mock.patch('stripe.Subscription.retrieve', return_value=stripe_subscription()) as retrieve, \
+            mock.patch('stripe.Subscription.modify', return_value=stripe_subscription()) as modify:
+        driver.swap('sub_1', 'masonite-flash')
+
+    assert retrieve.call_count == 1
+    assert modify.call_args[1]['items'] == [{'id': 'si_1', 'plan': 'masonite-flash'}]
+
+
+def test_subscription_arguments_do_not_leak_between_threads():
+    import random
+    import threading
+    import time
+
+    driver = BillingStripeDriver(cache=None)
+    created = {}
+
+    def create(**kwargs):
+        time.sleep(random.random() / 100)
+        created[kwargs['customer']] = (kwargs.get('coupon'), kwargs.get('trial_period_days'))
+        return stripe_subscription(kwargs['customer'])
+
+    def subscribe(number):
+        customer = 'cus_{0}'.format(number)
+        if number % 2:
+            driver.coupon('coupon-{0}'.format(number)).trial(number).subscribe(
+                'masonite-test', 'tok_amex', customer=customer)
+        else:
+            driver.subscribe('masonite-test', 'tok_amex', customer=customer)
+
+    with mock.patch('stripe.Subscription.create', side_effect=create):
+        threads = [threading.Thread(target=subscribe, args=(number,)) for number in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert driver._subscription_args == {}
+    for number in range(50):
+        if number % 2:
+            assert created['cus_{0}'.format(number)] == ('coupon-{0}'.format(number), number)
+        else:
+            assert created['cus_{0}'.format(number)] == (None, None)
+
+
+def test_asubscribe_does_not_share_the_user_between_executor_threads():
+    import asyncio
+
+    from billing.models import Billable
+
+    calls = []
+
+    class User(Billable):
+        customer_id = None
+        email = 'test@email.com'
+
+        async def acreate_customer(self, description, token):
+            calls.append('create_customer')
+            await asyncio.sleep(0)
+            self.customer_id = 'cus_1'
+            calls.append('created_customer')
+
+        async def ais_subscribed(self, plan_name=None):
+            calls.append('is_subscribed')
+            return True
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(User().asubscribe('masonite-test', 'tok_amex')) is True
+    finally:
+        loop.close()
+
+    assert calls == ['create_customer', 'created_customer', 'is_subscribed']
+
+
+def test_unpaid_subscriptions_have_ended():
+    driver = BillingStripeDriver(cache=None)
+    subscription = stripe_subscription()
+    subscription.update({
+        'status': 'past_due', 'trial_end': None, 'cancel_at_period_end': False, 'current_period_start': 1690000000,
+    })
+
+    assert driver.subscription_attributes(subscription)['ends_at'].int_timestamp == 1690000000
+    assert driver.subscription_attributes(dict(subscription, status='active'))['ends_at'] is None
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+from orator import DatabaseManager
+from orator.migrations import DatabaseMigrationRepository, Migrator
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), 'migrations')
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager({'sqlite': {'driver': 'sqlite', 'database': ':memory:'}})
+
+    with db.connection().get_schema_builder().create('users') as table:
+        table.increments('id')
+        table.string('customer_id').nullable()
+
+    repository = DatabaseMigrationRepository(db, 'migrations')
+    repository.create_repository()
+    Migrator(repository, db).run(MIGRATIONS)
+
+    return db
+
+
+def query_plan(db, query):
+    rows = db.select('EXPLAIN QUERY PLAN ' + query.to_sql(), query.get_bindings())
+    return ' '.join(row['detail'] for row in rows)
+
+
+def test_subscription_lookups_use_indexes(db):
+    assert 'INDEX subscriptions_user_id_ends_at_index' in query_plan(
+        db, db.table('subscriptions').where('user_id', 1))
+    assert 'INDEX subscriptions_user_id_ends_at_index' in query_plan(
+        db, db.table('subscriptions').where_in('user_id', [1, 2, 3]))
+    assert 'INDEX subscriptions_plan_id_unique' in query_plan(
+        db, db.table('subscriptions').where('plan_id', 'sub_1'))
+    assert 'INDEX subscriptions_ends_at_id_index' in query_plan(
+        db, db.table('subscriptions').where_between('ends_at', ['2020-01-01', '2020-02-01']))
+    assert 'INDEX subscriptions_trial_ends_at_id_index' in query_plan(
+        db, db.table('subscriptions').where_between('trial_ends_at', ['2020-01-01', '2020-02-01']))
+
+
+def test_customer_lookup_uses_index(db):
+    assert 'INDEX users_customer_id_index' in query_plan(
+        db, db.table('users').where('customer_id', 'cus_1'))
@@ -0,0 +1,31 @@
+from conftest import User
+
+
+def test_subscription_is_loaded_once_per_user(app, queries):
+    user = User.find(app.subscribed_user().id)
+
+    answers, names = queries(lambda: [
+        user.is_subscribed(), user.is_subscribed('masonite-test'), user.on_trial(),
+        user.is_canceled(), user.was_subscribed(), user.plan(),
+    ])
+
+    assert answers[:2] == [True, True]
+    assert names == ['subscriptions.select']
+
+    subscription = user._get_subscription()
+    assert user._get_subscription() is subscription
+    assert user._get_subscription(refresh=True) is not subscription
+
+
+def test_changes_and_forget_read_the_subscription_again(app):
+    user = app.subscribed_user()
+    assert user.is_subscribed() is True
+
+    user.cancel(now=True)
+    assert user.is_subscribed() is False
+
+    other = User.find(user.id)
+    assert other.was_subscribed() is True
+    other._get_subscription().delete()
+    assert other.was_subscribed() is True
+    assert other.forget_subscription().was_subscribed() is False
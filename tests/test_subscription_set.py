@@ -0,0 +1,103 @@
+from billing.factories import BillingFactory
+from billing.models import Subscription
+from conftest import User
+
+
+def test_add_on_subscription_keeps_the_primary_plan(app):
+    user = app.subscribed_user()
+    primary_id = user.plan_id
+
+    user.subscribe('masonite-flash', 'tok_amex')
+
+    assert user.plan_id == primary_id
+    assert User.find(user.id).plan_id == primary_id
+    assert Subscription.where('user_id', user.id).count() == 2
+    assert user.plan() == 'Masonite Test'
+
+
+def test_every_plan_is_checked_with_one_query(app, queries):
+    subscribed = app.subscribed_user()
+    subscribed.subscribe('masonite-flash', 'tok_amex')
+    user = User.find(subscribed.id)
+
+    answers, names = queries(lambda: [
+        user.is_subscribed('masonite-test'), user.is_subscribed('masonite-flash'),
+        user.is_subscribed('masonite-other'), user.is_subscribed(),
+    ])
+
+    assert answers == [True, True, False, True]
+    assert names == ['subscriptions.select']
+
+    states = User.subscription_map([user.id])
+    assert states[user.id].plan == 'masonite-test'
+    assert User.subscribed_many([User.find(user.id)], 'masonite-flash') == {user.id: True}
+
+
+def test_cancelling_a_plan_leaves_the_other_subscriptions_alone(app):
+    user = app.subscribed_user()
+    user.subscribe('masonite-flash', 'tok_amex')
+
+    assert user.cancel(now=True, plan='masonite-flash') is True
+    assert user.is_subscribed('masonite-flash') is False
+    assert user.is_subscribed('masonite-test') is True
+    assert user.is_canceled() is False
+    assert user.cancel(plan='masonite-other') is False
+
+    assert user.cancel() is True
+    assert user.is_canceled() is True
+    assert user.is_canceled('masonite-flash') is False
+    assert user.resume() is True
+    assert user.is_canceled() is False
+
+
+def test_subscribing_after_the_primary_ended_makes_a_new_primary(app):
+    user = app.subscribed_user()
+    user.cancel(now=True)
+
+    user.subscribe('masonite-flash', 'tok_amex')
+
+    assert user.plan() == 'Masonite Flash'
+    assert user.was_subscribed('masonite-test') is True
+    assert user.is_subscribed() is True
+
+
+def test_tokens_carry_every_plan(monkeypatch, app, queries):
+    monkeypatch.setattr(BillingFactory.entitlements(), 'secret', b'testing-secret')
+
+    subscribed = app.subscribed_user()
+    subscribed.subscribe('masonite-flash', 'tok_amex')
+    token = subscribed.entitlement_token()
+    user = User.find(subscribed.id)
+
+    def checks(user):
+        return [
+            user.is_subscribed('masonite-test'), user.is_subscribed('masonite-flash'),
+            user.on_trial('masonite-flash'), user.is_canceled(), user.plan(), user.subscription_state(),
+        ]
+
+    assert user.use_entitlement(token) is True
+    answers, names = queries(lambda: checks(user))
+
+    assert answers == checks(subscribed)
+    assert answers[:2] == [True, True]
+    assert names == []
+
+
+def test_plan_changes_use_the_stored_subscription_item(app):
+    user = app.subscribed_user()
+    subscription = user._get_subscription()
+
+    assert subscription.item_id.startswith('si_')
+    assert subscription.price == 1000
+    assert subscription.current_period_end.is_future()
+
+    requests = app.stripe.request_count()
+    user.swap('masonite-flash')
+    assert app.stripe.request_count() - requests == 1
+    assert user._get_subscription().price == 2000
+
+    requests = app.stripe.request_count()
+    user.cancel()
+    user.resume()
+    assert app.stripe.request_count() - requests == 2
+    assert app.stripe.request_count('GET', '/v1/subscriptions') == 0
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from cleo import Application, CommandTester
+
+from billing.commands.SyncSubscriptionsCommand import SyncSubscriptionsCommand
+from billing.models import Subscription
+from conftest import User
+
+
+def sync(checkpoint, *options):
+    application = Application()
+    command = SyncSubscriptionsCommand()
+    command.model = User
+    application.add(command)
+
+    tester = CommandTester(application.find('billing:sync'))
+    tester.execute([('command', 'billing:sync'), ('--batch', '2'), ('--checkpoint', checkpoint)]
+                   + [(option, True) for option in options])
+    return tester.get_display()
+
+
+def test_sync_reconciles_missing_and_stale_subscriptions(tmpdir, app):
+    checkpoint = str(tmpdir.join('sync.json'))
+
+    subscribed = app.subscribed_user()
+    stripe = app.stripe.driver
+    stripe._modify_subscription(subscribed.plan_id, cancel_at_period_end=True)
+
+    missing = app.customer()
+    subscription_id = stripe._new_subscription(missing.customer_id, 'masonite-flash')['id']
+    stripe._new_subscription('cus_unknown', 'masonite-flash')
+
+    display = sync(checkpoint)
+
+    assert Subscription.where('plan_id', subscribed.plan_id).first().ends_at
+    assert Subscription.where('plan_id', subscription_id).first().user_id == missing.id
+    assert User.find(missing.id).plan_id == subscription_id
+    assert '1 inserted, 1 updated, 1 without a user' in display
+    assert not tmpdir.join('sync.json').exists()
+
+
+def test_sync_resumes_from_the_checkpoint(tmpdir, app):
+    checkpoint = tmpdir.join('sync.json')
+
+    stripe = app.stripe.driver
+    first = app.customer()
+    second = app.customer()
+    skipped = stripe._new_subscription(first.customer_id, 'masonite-flash')['id']
+    synced = stripe._new_subscription(second.customer_id, 'masonite-flash')['id']
+
+    checkpoint.write(json.dumps({'starting_after': skipped, 'synced': 1}))
+    display = sync(str(checkpoint))
+
+    assert not Subscription.where('plan_id', skipped).first()
+    assert Subscription.where('plan_id', synced).first()
+    assert 'Resuming after {0}'.format(skipped) in display
+
+    sync(str(checkpoint), '--restart')
+    assert Subscription.where('plan_id', skipped).first()
+
+
+def test_a_failed_batch_leaves_no_subscriptions_without_their_user(tmpdir, monkeypatch, app):
+    customer = app.customer()
+    subscription_id = app.stripe.driver._new_subscription(customer.customer_id, 'masonite-flash')['id']
+
+    def unavailable(self, *args, **values):
+        raise RuntimeError('users table is locked')
+
+    monkeypatch.setattr(type(User.where('id', customer.id)), 'update', unavailable)
+    with pytest.raises(RuntimeError):
+        sync(str(tmpdir.join('sync.json')))
+
+    assert not Subscription.where('plan_id', subscription_id).first()
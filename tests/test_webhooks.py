@@ -0,0 +1,150 @@
+import uuid
+
+import pendulum
+import pytest
+from orator.exceptions.query import QueryException
+
+from billing.controllers.WebhookController import WebhookController
+from billing.models import Subscription, WebhookEvent
+from conftest import User, WebhookRequest
+
+
+@pytest.fixture
+def webhooks(monkeypatch):
+    # Every test starts with an empty cache of handled events
+    monkeypatch.setattr(WebhookController, 'handled_events', type(WebhookController.handled_events)(ttl=60))
+    controller = WebhookController()
+    controller.model = User
+    return controller
+
+
+def event(event_type='ping', **data):
+    return WebhookRequest({
+        'id': 'evt_{0}'.format(uuid.uuid4().hex[:14]),
+        'type': event_type,
+        'data': {'object': data},
+    })
+
+
+def test_duplicate_deliveries_are_handled_once(webhooks, app):
+    request = event()
+
+    assert webhooks.handle(request) == 'Webhook Not Supported'
+    assert webhooks.handle(request) == 'Webhook Already Handled'
+    assert WebhookEvent.where('event_id', request.input('id')).count() == 1
+
+    # Another process only has the database row to go by
+    webhooks.handled_events.forget('webhook_event', request.input('id'))
+    assert webhooks.handle(request) == 'Webhook Already Handled'
+
+
+def test_failed_handlers_release_the_event(webhooks, monkeypatch, app):
+    request = event('customer.subscription.updated', id='sub_1', customer='cus_1')
+
+    def fail(self, payload):
+        raise RuntimeError('handler failed')
+
+    monkeypatch.setitem(WebhookController.handlers, 'customer_subscription_updated', fail)
+    with pytest.raises(RuntimeError):
+        webhooks.handle(request)
+
+    assert not WebhookEvent.where('event_id', request.input('id')).exists()
+    assert webhooks.claim_event(request.input('id'), request.input('type')) is True
+
+
+def test_database_errors_are_not_taken_for_duplicates(webhooks, monkeypatch, app):
+    def unavailable(**attributes):
+        raise QueryException('INSERT', [], Exception('database is locked'))
+
+    monkeypatch.setattr(WebhookEvent, 'create', unavailable)
+
+    with pytest.raises(QueryException):
+        webhooks.handle(event())
+
+
+def test_events_without_an_id_are_always_handled(webhooks, app):
+    assert webhooks.claim_event(None, 'ping') is True
+    assert webhooks.claim_event(None, 'ping') is True
+    assert WebhookEvent.count() == 0
+
+
+def subscription_event(app, event_type, subscription):
+    return event(event_type, **app.stripe.driver._find_subscription(subscription.plan_id))
+
+
+def test_created_subscriptions_racing_the_subscribe_call_leave_one_row(webhooks, monkeypatch, app):
+    user = app.customer()
+    save = User._save_subscription_model
+
+    def delivered_first(self, processor_plan, subscription_object):
+        # The webhook stores the subscription between the Stripe call and the local insert
+        webhooks.handle(event('customer.subscription.created', **subscription_object))
+        return save(self, processor_plan, subscription_object)
+
+    monkeypatch.setattr(User, '_save_subscription_model', delivered_first)
+    user.subscribe('masonite-test', 'tok_amex')
+
+    assert Subscription.where('user_id', user.id).count() == 1
+    assert User.find(user.id).plan_id == user.plan_id
+
+    # A late delivery updates the row the subscribe call stored
+    webhooks.handle(subscription_event(app, 'customer.subscription.created', user._get_subscription()))
+    assert Subscription.where('user_id', user.id).count() == 1
+
+
+def test_updated_subscriptions_are_synced(webhooks, app):
+    user = app.subscribed_user()
+    app.stripe.driver._modify_subscription(user.plan_id, cancel_at_period_end=True)
+
+    request = subscription_event(app, 'customer.subscription.updated', user._get_subscription())
+    assert webhooks.handle(request) == 'Webhook Handled'
+    assert User.find(user.id).is_canceled() is True
+
+    request = event('customer.subscription.updated', **dict(request.input('data')['object'], customer='cus_none'))
+    assert webhooks.handle(request) == 'User or Subscription does not exist'
+
+
+def test_deleted_subscriptions_end(webhooks, app):
+    user = app.subscribed_user()
+    request = subscription_event(app, 'customer.subscription.deleted', user._get_subscription())
+
+    assert webhooks.handle(request) == 'Webhook Handled'
+    assert User.find(user.id).is_subscribed() is False
+
+
+def test_invoices_sync_the_subscription_from_stripe(webhooks, app):
+    user = app.subscribed_user()
+
+    def invoice(event_type):
+        return event(event_type, id='in_1', subscription=user.plan_id, next_payment_attempt=None)
+
+    # The subscription is still active in Stripe whatever the event says
+    assert webhooks.handle(invoice('invoice.payment_failed')) == 'Webhook Handled'
+    assert User.find(user.id).is_subscribed() is True
+
+    Subscription.where('plan_id', user.plan_id).update(ends_at=pendulum.now().subtract(minutes=1))
+    assert webhooks.handle(invoice('invoice.paid')) == 'Webhook Handled'
+    assert User.find(user.id).is_subscribed() is True
+
+    assert webhooks.handle(event('invoice.paid', id='in_2', subscription=None)) == 'User or Subscription does not exist'
+    assert webhooks.handle(event('invoice.paid', id='in_3', subscription='sub_unknown')) == \
+        'User or Subscription does not exist'
+
+
+def test_late_invoices_do_not_bring_back_deleted_subscriptions(webhooks, app):
+    user = app.subscribed_user()
+    deleted = app.stripe.driver._delete_subscription(user.plan_id)
+
+    assert webhooks.handle(event('customer.subscription.deleted', **deleted)) == 'Webhook Handled'
+    assert webhooks.handle(event('invoice.paid', id='in_1', subscription=user.plan_id)) == 'Webhook Handled'
+
+    assert User.find(user.id).is_subscribed() is False
+
+
+def test_storing_a_subscription_twice_updates_it(app):
+    user = app.subscribed_user()
+    attributes = user._processor.subscription_attributes(app.stripe.driver._find_subscription(user.plan_id))
+    attributes.update(user_id=user.id, plan_name='Renamed')
+
+    assert Subscription.store(attributes).plan_name == 'Renamed'
+    assert Subscription.where('user_id', user.id).count() == 1
@@ -13,8 +13,24 @@ CREATE TABLE IF NOT EXISTS `subscriptions` (
   `plan_name` varchar(150) DEFAULT NULL,
   `trial_ends_at` timestamp NULL DEFAULT NULL,
   `ends_at` timestamp NULL DEFAULT NULL,
+  `item_id` varchar(50) DEFAULT NULL,
+  `price` int(11) DEFAULT NULL,
+  `current_period_end` timestamp NULL DEFAULT NULL,
   `created_at` timestamp NULL DEFAULT NULL,
   `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
-# Add Data
\ No newline at end of file
+# Add Data
+CREATE TABLE IF NOT EXISTS `billing_webhook_events` (
+  `id` int(11) NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  `event_id` varchar(255) NOT NULL UNIQUE,
+  `type` varchar(255) NOT NULL,
+  `created_at` timestamp NULL DEFAULT NULL,
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  KEY `billing_webhook_events_created_at_index` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+CREATE INDEX `subscriptions_user_id_ends_at_index` ON `subscriptions` (`user_id`, `ends_at`);
+CREATE UNIQUE INDEX `subscriptions_plan_id_unique` ON `subscriptions` (`plan_id`);
+CREATE INDEX `subscriptions_ends_at_id_index` ON `subscriptions` (`ends_at`, `id`);
+CREATE INDEX `subscriptions_trial_ends_at_id_index` ON `subscriptions` (`trial_ends_at`, `id`);